@@ -13,10 +13,23 @@ from sqlalchemy.ext.asyncio import (
     create_async_engine,
 )
 
-from karpo_backend.db.dependencies import get_db_session
+from karpo_backend.db.dependencies import (
+    SharedReadSessions,
+    get_db_read_sessions,
+    get_db_session,
+)
 from karpo_backend.db.utils import create_database, drop_database
+from karpo_backend.services.matching.lifetime import (
+    init_matching_executor,
+    shutdown_matching_executor,
+)
 from karpo_backend.services.redis.dependency import get_redis_pool
+from karpo_backend.services.redis.pubsub import PubSubHub
 from karpo_backend.settings import settings
+from karpo_backend.tests.data_fixtures.city_data_fixtures import (  # noqa: F401
+    city_request,
+    city_rides,
+)
 from karpo_backend.tests.data_fixtures.request_data_fixtures import (  # noqa: F401
     match_ride_data_1_request_datas,
     request_data_1,
@@ -121,21 +134,29 @@ async def fake_redis_pool() -> AsyncGenerator[ConnectionPool, None]:
 async def fastapi_app(
     dbsession: AsyncSession,
     fake_redis_pool: ConnectionPool,
-) -> FastAPI:
+) -> AsyncGenerator[FastAPI, None]:
     """
     Fixture for creating FastAPI app.
 
-    :return: fastapi app with mocked dependencies.
+    :yield: fastapi app with mocked dependencies.
     """
     application = get_app()
     application.state.redis_pool = fake_redis_pool
+    application.state.pubsub_hub = PubSubHub(fake_redis_pool)
     application.dependency_overrides[get_db_session] = lambda: dbsession
+    application.dependency_overrides[get_db_read_sessions] = lambda: SharedReadSessions(
+        dbsession,
+    )
     application.dependency_overrides[get_redis_pool] = lambda: fake_redis_pool
 
     setup_db(application)
+    init_matching_executor(application)
     await setup_test_users(application)
 
-    return application  # noqa: WPS331
+    yield application
+
+    await application.state.pubsub_hub.close()
+    shutdown_matching_executor(application)
 
 
 @pytest.fixture
@@ -0,0 +1,8 @@
+import datetime
+
+
+def as_utc(time: datetime.datetime) -> datetime.datetime:
+    """:return: `time`, taken as UTC if it is naive."""
+    if time.tzinfo is None:
+        return time.replace(tzinfo=datetime.timezone.utc)
+    return time
@@ -0,0 +1,30 @@
+import uuid
+from typing import List, Sequence
+
+from fastapi import Depends
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from karpo_backend.db.dependencies import get_db_session
+from karpo_backend.db.models.join_events import JoinEventsModel
+
+
+class JoinEventsDAO:
+    """Class for accessing join_events table."""
+
+    def __init__(self, session: AsyncSession = Depends(get_db_session)):
+        self.session = session
+
+    async def get_oldest_join_event_models(self, limit: int) -> List[JoinEventsModel]:
+        """:return: the first `limit` events in the order they were added."""
+        result = await self.session.scalars(
+            select(JoinEventsModel).order_by(JoinEventsModel.seq).limit(limit),
+        )
+        return list(result.all())
+
+    async def delete_by_ids(self, event_ids: Sequence[uuid.UUID]) -> None:
+        if not event_ids:
+            return
+        await self.session.execute(
+            delete(JoinEventsModel).where(JoinEventsModel.id.in_(event_ids)),
+        )
@@ -1,24 +1,58 @@
 import datetime
 import uuid
-from typing import List, Literal, Optional
+from typing import Any, List, Literal, Optional, Sequence
 
 from fastapi import Depends
 from loguru import logger
 from shapely import LineString, Point, within, wkb
-from sqlalchemy import delete, select, update
+from sqlalchemy import delete, insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from karpo_backend.db.dependencies import get_db_session
+from karpo_backend.db.models.join_events import JoinEventsModel
 from karpo_backend.db.models.joins import JoinsModel
 from karpo_backend.web.api.utils import LocationWithDescDTO
 
+# what a join event records of its join
+_EVENT_COLUMNS = (
+    JoinsModel.id,
+    JoinsModel.ride_id,
+    JoinsModel.request_id,
+    JoinsModel.request_user_id,
+    JoinsModel.ride_user_id,
+)
+
 
 class JoinsDAO:
-    """Class for accessing joins table."""
+    """
+    Class for accessing joins table.
+
+    Every change of the status or the progress of a join is recorded in
+    `join_events` in the same transaction, to be pushed to its users.
+    """
 
     def __init__(self, session: AsyncSession = Depends(get_db_session)):
         self.session = session
 
+    async def _add_events(self, event: str, joins: Sequence[Sequence[Any]]) -> None:
+        if not joins:
+            return
+        await self.session.execute(
+            insert(JoinEventsModel).values(
+                [
+                    {
+                        "join_id": join_id,
+                        "ride_id": ride_id,
+                        "request_id": request_id,
+                        "request_user_id": request_user_id,
+                        "ride_user_id": ride_user_id,
+                        "event": event,
+                    }
+                    for join_id, ride_id, request_id, request_user_id, ride_user_id in joins
+                ],
+            ),
+        )
+
     async def create_joins_model(
         self,
         request_id: uuid.UUID,
@@ -58,6 +92,10 @@ class JoinsDAO:
         )
         self.session.add(join)
         await self.session.flush()
+        await self._add_events(
+            "created",
+            [(join.id, ride_id, request_id, request_user_id, ride_user_id)],
+        )
         return join.id
 
     async def get_joins_model_by_id(
@@ -86,22 +124,30 @@ class JoinsDAO:
                 .with_for_update()
                 .where(JoinsModel.request_id == request_id)
             )
-            await self.session.execute(
+            accepted = await self.session.execute(
                 update(JoinsModel)
                 .where((JoinsModel.id == join_id) & (JoinsModel.status == "pending"))
                 .values(status=status)
+                .returning(*_EVENT_COLUMNS)
             )
-            await self.session.execute(
+            await self._add_events(status, accepted.all())
+            canceled = await self.session.execute(
                 update(JoinsModel)
                 .where(
                     (JoinsModel.status == "pending") & (JoinsModel.request_id == request_id)
                 )
                 .values(status="canceled")
+                .returning(*_EVENT_COLUMNS)
             )
+            await self._add_events("canceled", canceled.all())
         else:
-            await self.session.execute(
-                update(JoinsModel).where(JoinsModel.id == join_id).values(status=status)
+            updated = await self.session.execute(
+                update(JoinsModel)
+                .where(JoinsModel.id == join_id)
+                .values(status=status)
+                .returning(*_EVENT_COLUMNS)
             )
+            await self._add_events(status, updated.all())
 
     async def delete_all_by_user_id(
         self,
@@ -117,9 +163,15 @@ class JoinsDAO:
     async def put_joins_model_progress_by_id(
         self, join_id: uuid.UUID, progress: Literal["onboard", "fulfilled", "canceled"]
     ) -> None:
-        await self.session.execute(
-            update(JoinsModel).where(JoinsModel.id == join_id).values(progress=progress)
+        updated = await self.session.execute(
+            update(JoinsModel)
+            .where(JoinsModel.id == join_id)
+            .values(progress=progress)
+            .returning(*_EVENT_COLUMNS)
         )
+        # a canceled progress comes with a canceled status, which has its event
+        if progress != "canceled":
+            await self._add_events(progress, updated.all())
 
     async def get_accepted_joins_model_by_ride_id(
         self,
@@ -136,6 +188,21 @@ class JoinsDAO:
             self.session.expunge(result_instance)
         return result_instances
 
+    async def get_accepted_joins_models_by_ride_ids(
+        self,
+        ride_ids: Sequence[uuid.UUID],
+    ) -> List[JoinsModel]:
+        result = await self.session.scalars(
+            select(JoinsModel).where(
+                (JoinsModel.ride_id.in_(ride_ids)) & (JoinsModel.status == "accepted")
+            )
+        )
+
+        result_instances = result.all()
+        for result_instance in result_instances:
+            self.session.expunge(result_instance)
+        return list(result_instances)
+
     async def get_joins_model_by_ride_id_and_status(
         self,
         ride_id: uuid.UUID,
@@ -0,0 +1,387 @@
+import datetime
+import uuid
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import Depends
+from shapely import wkb
+from sqlalchemy import Row, Select, delete, exists, false, func, select, true, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
+
+from karpo_backend.db.dependencies import get_db_session
+from karpo_backend.db.models.joins import JoinsModel
+from karpo_backend.db.models.matches import MatchesModel
+from karpo_backend.db.models.requests import RequestsModel
+from karpo_backend.db.models.rides import RidesModel
+from karpo_backend.matching import Match
+from karpo_backend.settings import settings
+
+
+def _to_match(match_model: MatchesModel) -> Match:
+    return Match(
+        pick_up_location=wkb.loads(bytes(match_model.pick_up_location.data)),
+        drop_off_location=wkb.loads(bytes(match_model.drop_off_location.data)),
+        pick_up_time=match_model.pick_up_time,
+        drop_off_time=match_model.drop_off_time,
+        pick_up_distance=match_model.pick_up_distance,
+        drop_off_distance=match_model.drop_off_distance,
+        estimated_passenger_walking_time=match_model.estimated_passenger_walking_time,
+        estimated_travel_time=match_model.estimated_travel_time,
+        fare=match_model.fare,
+    )
+
+
+def _to_row(request_id: uuid.UUID, ride_id: uuid.UUID, match: Match) -> Dict[str, Any]:
+    pick_up, drop_off = match.pick_up_location, match.drop_off_location
+    return {
+        "request_id": request_id,
+        "ride_id": ride_id,
+        "pick_up_location": f"POINT({pick_up.x} {pick_up.y})",
+        "drop_off_location": f"POINT({drop_off.x} {drop_off.y})",
+        "pick_up_time": match.pick_up_time,
+        "drop_off_time": match.drop_off_time,
+        "pick_up_distance": match.pick_up_distance,
+        "drop_off_distance": match.drop_off_distance,
+        "estimated_passenger_walking_time": match.estimated_passenger_walking_time,
+        "estimated_travel_time": match.estimated_travel_time,
+        "fare": match.fare,
+    }
+
+
+def _to_model(request_id: uuid.UUID, ride_id: uuid.UUID, match: Match) -> MatchesModel:
+    return MatchesModel(**_to_row(request_id, ride_id, match))
+
+
+def _live_request_matches(
+    query: Select[Any],
+    requests_model: RequestsModel,
+) -> Select[Any]:
+    """
+    Keep the stored matches of a request with rides it can still join.
+
+    Rides that departed, ran out of seats or were already asked to join are
+    skipped.
+    """
+    return query.join(RidesModel, RidesModel.id == MatchesModel.ride_id).where(
+        (MatchesModel.request_id == requests_model.id)
+        & (RidesModel.phase < 0)
+        & (RidesModel.num_seats_left >= requests_model.num_passengers)
+        & (
+            ~(
+                exists(
+                    select(JoinsModel.id).where(
+                        (JoinsModel.ride_id == RidesModel.id)
+                        & (JoinsModel.request_id == requests_model.id)
+                    ),
+                )
+            )
+        )
+    )
+
+
+def _display_route_columns() -> Tuple[Any, ...]:
+    """:return: the columns `route_dto_from_ride` shows the route of a ride from."""
+    if settings.route_keep_full:
+        return (RidesModel.route, RidesModel.route_timestamps)
+    return ()
+
+
+class MatchesDAO:
+    """Class for accessing matches table."""
+
+    def __init__(self, session: AsyncSession = Depends(get_db_session)):
+        self.session = session
+
+    async def put_request_matches(
+        self,
+        request_id: uuid.UUID,
+        matches: Sequence[Tuple[uuid.UUID, Match]],
+    ) -> None:
+        """
+        Replace the matches of a request.
+
+        :param request_id: id of the request.
+        :param matches: ride ids and their matches.
+        """
+        await self.session.execute(
+            delete(MatchesModel).where(MatchesModel.request_id == request_id),
+        )
+        self.session.add_all(
+            [_to_model(request_id, ride_id, match) for ride_id, match in matches],
+        )
+        await self.session.flush()
+
+    async def put_ride_matches(
+        self,
+        ride_id: uuid.UUID,
+        matches: Sequence[Tuple[uuid.UUID, Match]],
+    ) -> None:
+        """
+        Replace the matches of a ride.
+
+        :param ride_id: id of the ride.
+        :param matches: request ids and their matches.
+        """
+        await self.session.execute(
+            delete(MatchesModel).where(MatchesModel.ride_id == ride_id),
+        )
+        self.session.add_all(
+            [_to_model(request_id, ride_id, match) for request_id, match in matches],
+        )
+        await self.session.flush()
+
+    async def upsert_ride_matches(
+        self,
+        ride_id: uuid.UUID,
+        matches: Sequence[Tuple[uuid.UUID, Match]],
+    ) -> None:
+        """
+        Add or refresh matches of a ride, keeping its other matches.
+
+        Refreshed matches keep the rank the batch matcher gave them.
+
+        :param ride_id: id of the ride.
+        :param matches: request ids and their matches.
+        """
+        if not matches:
+            return
+        rows = [_to_row(request_id, ride_id, match) for request_id, match in matches]
+        statement = insert(MatchesModel).values(rows)
+        await self.session.execute(
+            statement.on_conflict_do_update(
+                index_elements=[MatchesModel.request_id, MatchesModel.ride_id],
+                set_={
+                    column: statement.excluded[column]
+                    for column in rows[0]
+                    if column not in {"request_id", "ride_id"}
+                },
+            ),
+        )
+
+    async def add_request_matches(
+        self,
+        request_id: uuid.UUID,
+        matches: Sequence[Tuple[uuid.UUID, Match]],
+    ) -> None:
+        """
+        Store the matches of a request with rides it has no match stored for.
+
+        :param request_id: id of the request.
+        :param matches: ride ids and their matches.
+        """
+        if not matches:
+            return
+        await self.session.execute(
+            insert(MatchesModel)
+            .values([_to_row(request_id, ride_id, match) for ride_id, match in matches])
+            .on_conflict_do_nothing(
+                index_elements=[MatchesModel.request_id, MatchesModel.ride_id],
+            ),
+        )
+
+    async def count_request_matches(
+        self,
+        requests_model: RequestsModel,
+        limit: int,
+    ) -> int:
+        """:return: how many of `limit` matches `get_request_matches` would read."""
+        result = await self.session.scalars(
+            select(func.count()).select_from(
+                _live_request_matches(select(MatchesModel.ride_id), requests_model)
+                .limit(limit)
+                .subquery(),
+            ),
+        )
+        return int(result.one())
+
+    async def delete_by_request_id(
+        self,
+        request_id: uuid.UUID,
+    ) -> None:
+        await self.session.execute(
+            delete(MatchesModel).where(MatchesModel.request_id == request_id),
+        )
+
+    async def delete_stale(
+        self,
+        now: datetime.datetime,
+    ) -> None:
+        """Delete matches of inactive requests and of rides that can take no one anymore."""
+        await self.session.execute(
+            delete(MatchesModel).where(
+                MatchesModel.request_id.in_(
+                    select(RequestsModel.id).where(RequestsModel.is_active == false()),
+                )
+                | MatchesModel.ride_id.in_(
+                    select(RidesModel.id).where(
+                        (RidesModel.route_end_time < now) | (RidesModel.phase >= 0),
+                    ),
+                )
+            ),
+        )
+
+    async def delete_by_ride_id(
+        self,
+        ride_id: uuid.UUID,
+    ) -> None:
+        await self.session.execute(
+            delete(MatchesModel).where(MatchesModel.ride_id == ride_id),
+        )
+
+    async def delete_over_capacity_by_ride_id(
+        self,
+        ride_id: uuid.UUID,
+        num_seats_left: int,
+    ) -> None:
+        """Delete matches of a ride with requests for more than `num_seats_left`."""
+        await self.session.execute(
+            delete(MatchesModel).where(
+                (MatchesModel.ride_id == ride_id)
+                & MatchesModel.request_id.in_(
+                    select(RequestsModel.id).where(
+                        RequestsModel.num_passengers > num_seats_left,
+                    ),
+                )
+            ),
+        )
+
+    async def delete_all_by_user_id(
+        self,
+        user_id: uuid.UUID,
+    ) -> None:
+        await self.session.execute(
+            delete(MatchesModel).where(
+                MatchesModel.request_id.in_(
+                    select(RequestsModel.id).where(RequestsModel.user_id == user_id),
+                )
+                | MatchesModel.ride_id.in_(
+                    select(RidesModel.id).where(RidesModel.user_id == user_id),
+                )
+            ),
+        )
+
+    async def get_match(
+        self,
+        request_id: uuid.UUID,
+        ride_id: uuid.UUID,
+    ) -> Optional[Match]:
+        result = await self.session.scalars(
+            select(MatchesModel).where(
+                (MatchesModel.request_id == request_id)
+                & (MatchesModel.ride_id == ride_id)
+            ),
+        )
+        result_instance = result.one_or_none()
+        if result_instance is None:
+            return None
+        return _to_match(result_instance)
+
+    async def get_request_matches(
+        self,
+        requests_model: RequestsModel,
+        limit: int,
+    ) -> List[Tuple[RidesModel, Match]]:
+        """
+        Read the `limit` best stored matches of a request.
+
+        Matches are ordered by the rank the batch matcher gave them, then by
+        travel time.
+
+        Rides that departed, ran out of seats or were already asked to join
+        are skipped.
+        """
+        result = await self.session.execute(
+            _live_request_matches(select(RidesModel, MatchesModel), requests_model)
+            # what the match listing shows, matching decodes route_data
+            .options(
+                load_only(
+                    RidesModel.user_id,
+                    RidesModel.origin,
+                    RidesModel.origin_description,
+                    RidesModel.destination,
+                    RidesModel.destination_description,
+                    RidesModel.num_seats,
+                    RidesModel.route_data,
+                    RidesModel.last_update_time,
+                    *_display_route_columns(),
+                ),
+            )
+            .order_by(
+                MatchesModel.rank,
+                MatchesModel.estimated_travel_time,
+                MatchesModel.ride_id,
+            )
+            .limit(limit),
+        )
+        matches: List[Tuple[RidesModel, Match]] = []
+        for ride, match_model in result.all():
+            self.session.expunge(ride)
+            matches.append((ride, _to_match(match_model)))
+        return matches
+
+    async def get_batch_candidates(
+        self,
+        created_after: datetime.datetime,
+    ) -> List[Row[Any]]:
+        """
+        Read the stored matches of active requests created after `created_after`.
+
+        Requests with an accepted join and rides they already asked to join
+        are skipped.
+
+        :return: rows of request_id, ride_id, estimated_travel_time,
+            num_passengers and num_seats_left, grouped by request and ordered
+            by travel time.
+        """
+        result = await self.session.execute(
+            select(
+                MatchesModel.request_id,
+                MatchesModel.ride_id,
+                MatchesModel.estimated_travel_time,
+                RequestsModel.num_passengers,
+                RidesModel.num_seats_left,
+            )
+            .join(RequestsModel, RequestsModel.id == MatchesModel.request_id)
+            .join(RidesModel, RidesModel.id == MatchesModel.ride_id)
+            .where(
+                (RequestsModel.is_active == true())
+                & (RequestsModel.created_at >= created_after)
+                & (RidesModel.phase < 0)
+                & (RidesModel.num_seats_left >= RequestsModel.num_passengers)
+                & (
+                    ~(
+                        exists(
+                            select(JoinsModel.id).where(
+                                (JoinsModel.request_id == RequestsModel.id)
+                                & (
+                                    (JoinsModel.ride_id == RidesModel.id)
+                                    | (JoinsModel.status == "accepted")
+                                )
+                            ),
+                        )
+                    )
+                )
+            )
+            .order_by(MatchesModel.request_id, MatchesModel.estimated_travel_time),
+        )
+        return list(result.all())
+
+    async def put_ranks(
+        self,
+        ranks: Sequence[Tuple[uuid.UUID, uuid.UUID, int]],
+    ) -> None:
+        """
+        Update the rank of many matches at once.
+
+        :param ranks: request id, ride id and the new rank of each match.
+        """
+        if not ranks:
+            return
+        await self.session.execute(
+            update(MatchesModel),
+            [
+                {"request_id": request_id, "ride_id": ride_id, "rank": rank}
+                for request_id, ride_id, rank in ranks
+            ],
+        )
@@ -1,10 +1,10 @@
 import datetime
-import json
 import uuid
-from typing import List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Sequence
 
 from fastapi import Depends
-from sqlalchemy import select, update
+from sqlalchemy import literal, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from karpo_backend.db.dependencies import get_db_session
@@ -17,37 +17,53 @@ class MessagesDAO:
     def __init__(self, session: AsyncSession = Depends(get_db_session)):
         self.session = session
 
-    async def create_message_model(
+    async def create_message_models(
         self,
-        user_id: uuid.UUID,
-        join_id: uuid.UUID,
-        content: str,
-        created_at: datetime.datetime,
-    ) -> MessagesModel:
-        message = MessagesModel(
-            user_id=user_id,
-            join_id=join_id,
-            content=content,
-            created_at=created_at,
+        messages: Sequence[Dict[str, Any]],
+    ) -> None:
+        """
+        Insert messages, skipping those already inserted.
+
+        :param messages: `id`, `user_id`, `join_id`, `content` and
+            `created_at` of each message.
+        """
+        if not messages:
+            return
+        await self.session.execute(
+            insert(MessagesModel).values(list(messages)).on_conflict_do_nothing(),
         )
-        self.session.add(message)
-        await self.session.flush()
-        return message
 
-    async def get_message_model_by_join_id(
+    async def get_message_models_by_join_id(
         self,
         join_id: uuid.UUID,
         from_time: datetime.datetime,
-    ) -> Optional[MessagesModel]:
+        after_id: Optional[uuid.UUID],
+        limit: Optional[int],
+    ) -> List[MessagesModel]:
+        """
+        Read a page of the history of a chat, oldest first.
+
+        :param join_id: id of the join.
+        :param from_time: time of the first message of the page.
+        :param after_id: if set, the page starts right after the message
+            (`from_time`, `after_id`), i.e. the last one of the previous page.
+        :param limit: max number of messages, None for all of them.
+        """
+        if after_id is None:
+            after = MessagesModel.created_at >= from_time
+        else:
+            after = tuple_(MessagesModel.created_at, MessagesModel.id) > tuple_(
+                literal(from_time),
+                literal(after_id),
+            )
         result = await self.session.scalars(
             select(MessagesModel)
-            .where(
-                MessagesModel.join_id == join_id, MessagesModel.created_at >= from_time
-            )
-            .order_by(MessagesModel.created_at),
+            .where((MessagesModel.join_id == join_id) & after)
+            .order_by(MessagesModel.created_at, MessagesModel.id)
+            .limit(limit),
         )
 
         result_instances = result.all()
         for result_instance in result_instances:
             self.session.expunge(result_instance)
-        return result_instances
+        return list(result_instances)
@@ -1,11 +1,16 @@
+import asyncio
 import datetime
+import heapq
 import uuid
-from typing import List, Optional, Tuple
+from concurrent.futures import Executor
+from typing import Any, AsyncIterator, List, Optional, Sequence, Tuple
 
 from fastapi import Depends
 from geoalchemy2 import Geography
 from geoalchemy2.shape import to_shape  # noqa: WPS347
+from loguru import logger
 from sqlalchemy import (
+    Row,
     delete,
     exists,
     func,
@@ -19,14 +24,35 @@ from sqlalchemy import (
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql.expression import true
 
+from karpo_backend.db.dao.rides_dao import CANDIDATE_RIDE_COLUMNS
 from karpo_backend.db.dependencies import get_db_session
 from karpo_backend.db.models.joins import JoinsModel
+from karpo_backend.db.models.matches import MatchesModel
 from karpo_backend.db.models.requests import RequestsModel
 from karpo_backend.db.models.rides import RidesModel
-from karpo_backend.matching import Match, evaluate_match
+from karpo_backend.db.models.users import User  # type: ignore
+from karpo_backend.matching import (
+    MAX_WALKING_DISTANCE,
+    MAX_WALKING_TIME,
+    CandidateRide,
+    Match,
+    travel_time_lower_bound,
+)
+from karpo_backend.services.matching.executor import evaluate_matches_in_executor
+from karpo_backend.services.matching.memo import MatchMemo
+from karpo_backend.settings import settings
 from karpo_backend.web.api.utils import LocationWithDescDTO
 
 
+async def _next_partition(
+    partitions: AsyncIterator[Sequence[Row[Any]]],
+) -> Optional[Sequence[Row[Any]]]:
+    try:
+        return await partitions.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
 class RequestsDAO:
     """Class for accessing requests table."""
 
@@ -85,6 +111,11 @@ class RequestsDAO:
         result_instance = result.one_or_none()
         if result_instance is not None:
             self.session.expunge(result_instance)
+            await self.session.execute(
+                update(User)
+                .where(User.id == user_id)
+                .values(num_requests=User.num_requests + 1),
+            )
         return result_instance
 
     async def get_requests_model_by_id(
@@ -107,11 +138,15 @@ class RequestsDAO:
         await self.session.execute(
             delete(RequestsModel).where(RequestsModel.user_id == user_id),
         )
+        await self.session.execute(
+            update(User).where(User.id == user_id).values(num_requests=0),
+        )
 
     async def inactivate_request_by_id(
         self,
         request_id: uuid.UUID,
     ) -> None:
+        """Inactivate a request and drop its stored matches with it."""
         await self.session.execute(
             update(RequestsModel)
             .where(RequestsModel.id == request_id)
@@ -119,6 +154,9 @@ class RequestsDAO:
                 is_active=False,
             ),
         )
+        await self.session.execute(
+            delete(MatchesModel).where(MatchesModel.request_id == request_id),
+        )
 
     async def get_active_request_by_user_id(
         self,
@@ -136,6 +174,48 @@ class RequestsDAO:
             self.session.expunge(result_instance)
         return result_instance
 
+    async def get_active_requests_near_ride(
+        self,
+        ride_id: uuid.UUID,
+    ) -> List[RequestsModel]:
+        """
+        Find active requests within walking range of a ride's route.
+
+        Requests that already asked to join the ride, need more seats than
+        it has left or start after it ends are skipped.
+        """
+        walking_radius = MAX_WALKING_DISTANCE + 1
+        result = await self.session.scalars(
+            select(RequestsModel)
+            .join(RidesModel, RidesModel.id == ride_id)
+            .where(
+                func.ST_DWithin(RequestsModel.origin, RidesModel.route, walking_radius)
+                & func.ST_DWithin(
+                    RequestsModel.destination,
+                    RidesModel.route,
+                    walking_radius,
+                )
+                & (RequestsModel.is_active == true())
+                & (RequestsModel.start_time < RidesModel.route_end_time)
+                & (RequestsModel.num_passengers <= RidesModel.num_seats_left)
+                & (
+                    ~(
+                        exists(
+                            select(JoinsModel.id).where(
+                                (JoinsModel.ride_id == ride_id)
+                                & (JoinsModel.request_id == RequestsModel.id)
+                            ),
+                        )
+                    )
+                )
+            ),
+        )
+
+        result_instances = result.all()
+        for result_instance in result_instances:
+            self.session.expunge(result_instance)
+        return list(result_instances)
+
     async def get_saved_request_by_user_id(
         self,
         user_id: uuid.UUID,
@@ -169,24 +249,57 @@ class RequestsDAO:
         self,
         requests_model: RequestsModel,
         limit: int,
-    ) -> List[Tuple[RidesModel, Match]]:
+        executor: Optional[Executor] = None,
+        memo: Optional[MatchMemo] = None,
+    ) -> List[Tuple[CandidateRide, Match]]:
+        """
+        Find the `limit` rides with the lowest estimated travel time.
+
+        Candidates are scanned in ascending order of their walking distance
+        (origin plus destination distance to the route), which bounds their
+        travel time from below. The scan stops once no remaining candidate can
+        beat the current k-th best match.
+
+        With a `memo`, rides evaluated by earlier calls for the same request
+        are only evaluated again after they change.
+        """
+        if limit <= 0:
+            return []
+
         origin = requests_model.origin
         destination = requests_model.destination
         if not isinstance(origin, str):
             origin = to_shape(origin).wkt
             destination = to_shape(destination).wkt
 
+        # rides out of walking range on either end can never match, checking
+        # that first lets the database use the spatial index on routes
+        # (one meter of slack for the difference between PostGIS and pyproj)
+        walking_radius = MAX_WALKING_DISTANCE + 1
+        walking_distance = func.ST_Distance(
+            type_coerce(origin, Geography),
+            RidesModel.route,
+        ) + func.ST_Distance(
+            type_coerce(destination, Geography),
+            RidesModel.route,
+        )
         query = (
-            select(RidesModel)
+            # plain rows of what matching reads, no ORM instances to build
+            select(*CANDIDATE_RIDE_COLUMNS, walking_distance)
             .where(
-                (RidesModel.phase < 0)
-                & (RidesModel.num_seats >= requests_model.num_passengers)
-                & (
-                    RidesModel.route_timestamps[
-                        func.array_length(RidesModel.route_timestamps, 1)
-                    ]
-                    > requests_model.start_time
+                func.ST_DWithin(
+                    RidesModel.route,
+                    type_coerce(origin, Geography),
+                    walking_radius,
+                )
+                & func.ST_DWithin(
+                    RidesModel.route,
+                    type_coerce(destination, Geography),
+                    walking_radius,
                 )
+                & (RidesModel.phase < 0)
+                & (RidesModel.num_seats >= requests_model.num_passengers)
+                & (RidesModel.route_end_time > requests_model.start_time)
                 & (
                     ~(
                         exists(
@@ -198,30 +311,70 @@ class RequestsDAO:
                     )
                 )
             )
-            .order_by(
-                func.ST_Distance(type_coerce(origin, Geography), RidesModel.route)
-                + func.ST_Distance(
-                    type_coerce(destination, Geography),
-                    RidesModel.route,
-                ),
-            )
+            .order_by(walking_distance)
+        )
+        # a server-side cursor keeps memory bounded by the batch size
+        candidates = await self.session.stream(
+            query.execution_options(yield_per=settings.matching_batch_size),
+        )
+        partitions = candidates.partitions()
+
+        # max-heap of the best matches so far, the worst one on top
+        top: List[Tuple[float, int, CandidateRide, Match]] = []
+        num_evaluated = 0
+        # the next partition is fetched while the current one is evaluated
+        next_partition = asyncio.ensure_future(_next_partition(partitions))
+        try:
+            while True:  # noqa: WPS457
+                partition = await next_partition
+                if partition is None:
+                    break
+                next_partition = asyncio.ensure_future(_next_partition(partitions))
+
+                lower_bounds = [travel_time_lower_bound(row[-1]) for row in partition]
+                if len(top) == limit:
+                    # rows are sorted, so everything from the first hopeless row on is too
+                    worst = -top[0][0]
+                    partition = [
+                        row
+                        for row, lower_bound in zip(partition, lower_bounds)
+                        if lower_bound < worst
+                    ]
+                rides = [CandidateRide(*row[:-1]) for row in partition]
+                if memo is None:
+                    partition_matches = await evaluate_matches_in_executor(
+                        executor,
+                        rides,
+                        requests_model,
+                    )
+                else:
+                    partition_matches = await memo.evaluate_matches(
+                        executor,
+                        rides,
+                        requests_model,
+                    )
+                for ride, match in zip(rides, partition_matches):
+                    num_evaluated += 1
+                    if match is None:
+                        continue
+                    entry = (-match.estimated_travel_time, -num_evaluated, ride, match)
+                    if len(top) < limit:
+                        heapq.heappush(top, entry)
+                    elif entry[:2] > top[0][:2]:
+                        heapq.heapreplace(top, entry)
+
+                next_lower_bound = lower_bounds[-1]
+                if len(top) == limit and next_lower_bound >= -top[0][0]:
+                    break
+                if next_lower_bound > MAX_WALKING_TIME:
+                    break
+        finally:
+            # cancelling a fetch halfway could leave the connection unusable,
+            # so an early exit waits for the prefetched partition
+            await asyncio.wait([next_partition])
+            await candidates.close()
+
+        logger.debug(
+            f"evaluated {num_evaluated} candidates for request {requests_model.id}"
         )
-        candidates = await self.session.scalars(query)
-        results: List[RidesModel] = []
-        for partition in candidates.partitions(size=100):
-            evaled_matches: List[Tuple[RidesModel, Match]] = []
-            for ride in partition:
-                self.session.expunge(ride)
-                match = evaluate_match(ride, requests_model)
-                if match is not None:
-                    evaled_matches.append((ride, match))
-
-            evaled_matches.sort(key=lambda it: it[1].estimated_travel_time)
-            while evaled_matches and len(results) < limit:
-                results.append(evaled_matches[0])
-                evaled_matches.pop(0)
-
-            if len(results) == limit:
-                break
-
-        return results
+        return [(ride, match) for _, _, ride, match in sorted(top, reverse=True)]
@@ -1,17 +1,37 @@
 import datetime
 import json
 import uuid
-from typing import List, Optional, Tuple
+from typing import List, Mapping, Optional, Sequence, Tuple, cast
 
+import numpy as np
+import numpy.typing as npt
 from fastapi import Depends
-from sqlalchemy import delete, func, select, update
+from geoalchemy2.shape import from_shape
+from shapely import LineString
+from sqlalchemy import Table, bindparam, delete, func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
 
 from karpo_backend.db.dependencies import get_db_session
 from karpo_backend.db.models.joins import JoinsModel
 from karpo_backend.db.models.rides import RidesModel
+from karpo_backend.db.models.users import User  # type: ignore
+from karpo_backend.matching import CandidateRide
+from karpo_backend.route.codec import encode_route
+from karpo_backend.route.simplify import simplify_route
+from karpo_backend.settings import settings
 from karpo_backend.web.api.utils import LocationWithDescDTO
 
+# the columns of `CandidateRide`, in the order of its arguments
+CANDIDATE_RIDE_COLUMNS = (
+    RidesModel.id,
+    RidesModel.user_id,
+    RidesModel.route_data,
+    RidesModel.last_update_time,
+    RidesModel.num_seats,
+    RidesModel.num_seats_left,
+)
+
 
 class RidesDAO:
     """Class for accessing rides table."""
@@ -25,9 +45,9 @@ class RidesDAO:
         label: str,
         origin: LocationWithDescDTO,
         destination: LocationWithDescDTO,
-        route: List[Tuple[float, float]],
+        route: npt.NDArray[np.float64],
         intermediates: List[LocationWithDescDTO],
-        route_timestamps: List[datetime.datetime],
+        route_offsets: npt.NDArray[np.float64],
         departure_time: datetime.datetime,
         num_seats: int,
         num_seats_left: int,
@@ -36,11 +56,35 @@ class RidesDAO:
         schedule: List[str] = [],
         phase: int = -2,
     ) -> uuid.UUID:
-        route_str = "LINESTRING("
-        for route_point in route:
-            route_str += f"{route_point[0]} {route_point[1]}, "
-        route_str = route_str[:-2]
-        route_str += ")"
+        """
+        Create a ride.
+
+        Matching reads the route simplified by `simplify_route`, `route` and
+        `route_timestamps` keep every vertex unless `route_keep_full` is off.
+
+        :param route: lon/lat of every vertex.
+        :param route_offsets: seconds from `departure_time` to every vertex.
+        :return: id of the ride.
+        """
+        coords = np.asarray(route, dtype=float)
+        offsets = np.asarray(route_offsets, dtype=float)
+        epochs = departure_time.timestamp() + offsets
+        # what route and route_timestamps store
+        stored_coords, stored_offsets = coords, offsets
+        if settings.route_simplify_tolerance > 0:
+            kept = simplify_route(
+                coords,
+                epochs,
+                settings.route_simplify_tolerance,
+                settings.route_simplify_time_tolerance,
+            )
+            coords, epochs = coords[kept], epochs[kept]
+            if not settings.route_keep_full:
+                stored_coords, stored_offsets = coords, offsets[kept]
+        route_timestamps = [
+            departure_time + datetime.timedelta(seconds=offset)
+            for offset in stored_offsets.tolist()
+        ]
 
         intermediate_list = []
         intermediate_description_list = []
@@ -57,8 +101,11 @@ class RidesDAO:
             destination=f"POINT({destination.longitude} {destination.latitude})",
             origin_description=origin.description,
             destination_description=destination.description,
-            route=route_str,
+            route=from_shape(LineString(stored_coords), srid=4326),
             route_timestamps=route_timestamps,
+            route_data=encode_route(coords, epochs),
+            route_start_time=route_timestamps[0],
+            route_end_time=route_timestamps[-1],
             intermediates=intermediate_list,
             intermediate_descriptions=intermediate_description_list,
             departure_time=departure_time,
@@ -71,6 +118,9 @@ class RidesDAO:
         )
         self.session.add(ride)
         await self.session.flush()
+        await self.session.execute(
+            update(User).where(User.id == user_id).values(num_rides=User.num_rides + 1),
+        )
         return ride.id
 
     async def get_ride_model_by_id(
@@ -85,6 +135,39 @@ class RidesDAO:
             self.session.expunge(result_instance)
         return result_instance
 
+    async def get_last_update_time_by_id(
+        self,
+        ride_id: uuid.UUID,
+    ) -> Optional[datetime.datetime]:
+        """:return: when the ride last changed, None if it does not exist."""
+        result = await self.session.scalars(
+            select(RidesModel.last_update_time).where(RidesModel.id == ride_id),
+        )
+        return result.one_or_none()
+
+    async def get_ride_models_by_ids(
+        self,
+        ride_ids: Sequence[uuid.UUID],
+    ) -> List[RidesModel]:
+        result = await self.session.scalars(
+            select(RidesModel).where(RidesModel.id.in_(ride_ids)),
+        )
+        result_instances = result.all()
+        for result_instance in result_instances:
+            self.session.expunge(result_instance)
+        return list(result_instances)
+
+    async def get_candidate_ride_by_id(
+        self,
+        ride_id: uuid.UUID,
+    ) -> Optional[CandidateRide]:
+        """Read only what matching needs of a ride."""
+        result = await self.session.execute(
+            select(*CANDIDATE_RIDE_COLUMNS).where(RidesModel.id == ride_id),
+        )
+        row = result.one_or_none()
+        return None if row is None else CandidateRide(*row)
+
     async def delete_all_by_user_id(
         self,
         user_id: uuid.UUID,
@@ -92,6 +175,9 @@ class RidesDAO:
         await self.session.execute(
             delete(RidesModel).where(RidesModel.user_id == user_id)
         )
+        await self.session.execute(
+            update(User).where(User.id == user_id).values(num_rides=0),
+        )
 
     async def get_saved_ride_model_by_user_id(
         self,
@@ -100,6 +186,21 @@ class RidesDAO:
     ) -> List[RidesModel]:
         result = await self.session.scalars(
             select(RidesModel)
+            .options(
+                load_only(
+                    RidesModel.label,
+                    RidesModel.origin,
+                    RidesModel.origin_description,
+                    RidesModel.destination,
+                    RidesModel.destination_description,
+                    RidesModel.intermediates,
+                    RidesModel.intermediate_descriptions,
+                    RidesModel.departure_time,
+                    RidesModel.num_seats,
+                    RidesModel.driver_position,
+                    RidesModel.last_update_time,
+                ),
+            )
             .where(RidesModel.user_id == user_id)
             .order_by(RidesModel.last_update_time.desc())
             .limit(limit=limit),
@@ -110,6 +211,20 @@ class RidesDAO:
             self.session.expunge(result_instance)
         return result_instances
 
+    async def get_saved_ride_versions_by_user_id(
+        self,
+        user_id: uuid.UUID,
+        limit: int,
+    ) -> List[Tuple[uuid.UUID, datetime.datetime]]:
+        """:return: id and last update time of each ride `get_saved_ride_model_by_user_id` reads."""
+        result = await self.session.execute(
+            select(RidesModel.id, RidesModel.last_update_time)
+            .where(RidesModel.user_id == user_id)
+            .order_by(RidesModel.last_update_time.desc())
+            .limit(limit=limit),
+        )
+        return [tuple(row) for row in result.all()]
+
     async def get_num_saved_rides_by_user_id(
         self,
         user_id: uuid.UUID,
@@ -139,6 +254,43 @@ class RidesDAO:
             )
         )
 
+    async def put_positions_by_ids(
+        self,
+        positions: Mapping[uuid.UUID, Tuple[float, float, datetime.datetime]],
+    ) -> None:
+        """
+        Update the driver positions of many rides in one statement.
+
+        A ride is left alone if its row was updated later than its position,
+        e.g. by a phase change.
+
+        :param positions: longitude, latitude and time of each ride's position.
+        """
+        if not positions:
+            return
+        # the Core table, so a list of parameters runs as executemany
+        rides = cast(Table, RidesModel.__table__)
+        connection = await self.session.connection()
+        await connection.execute(
+            update(rides)
+            .where(
+                (rides.c.id == bindparam("ride_id"))
+                & (rides.c.last_update_time <= bindparam("position_time"))
+            )
+            .values(
+                driver_position=bindparam("position"),
+                last_update_time=bindparam("position_time"),
+            ),
+            [
+                {
+                    "ride_id": ride_id,
+                    "position": f"POINT({longitude} {latitude})",
+                    "position_time": position_time,
+                }
+                for ride_id, (longitude, latitude, position_time) in positions.items()
+            ],
+        )
+
     async def put_num_seats_left_by_id(
         self,
         ride_id: uuid.UUID,
@@ -159,7 +311,16 @@ class RidesDAO:
         ride_id: uuid.UUID,
     ) -> Optional[RidesModel]:
         result = await self.session.scalars(
-            select(RidesModel).where(RidesModel.id == ride_id),
+            select(RidesModel)
+            .options(
+                load_only(
+                    RidesModel.user_id,
+                    RidesModel.phase,
+                    RidesModel.driver_position,
+                    RidesModel.last_update_time,
+                ),
+            )
+            .where(RidesModel.id == ride_id),
         )
 
         result_instance = result.one_or_none()
@@ -181,7 +342,9 @@ class RidesDAO:
         user_id: uuid.UUID,
     ) -> Optional[RidesModel]:
         result = await self.session.scalars(
-            select(RidesModel).where(
+            select(RidesModel)
+            .options(load_only(RidesModel.phase, RidesModel.schedule))
+            .where(
                 (RidesModel.user_id == user_id)
                 & (RidesModel.phase < func.cardinality(RidesModel.schedule))
             )
@@ -231,5 +394,8 @@ class RidesDAO:
         await self.session.execute(
             update(RidesModel)
             .where(RidesModel.id == ride_id)
-            .values(schedule=schedule_string_list)
+            .values(
+                schedule=schedule_string_list,
+                last_update_time=datetime.datetime.now(),
+            )
         )
@@ -1,7 +1,10 @@
-from typing import AsyncGenerator
+import asyncio
+from typing import Any, AsyncGenerator, Awaitable, Callable, List
 
-from sqlalchemy.ext.asyncio import AsyncSession
-from starlette.requests import Request
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from starlette.requests import HTTPConnection, Request
+
+ReadQuery = Callable[[AsyncSession], Awaitable[Any]]
 
 
 async def get_db_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
@@ -21,3 +24,59 @@ async def get_db_session(request: Request) -> AsyncGenerator[AsyncSession, None]
         raise
     finally:
         await session.close()
+
+
+class ReadSessions:
+    """
+    Runs independent read-only queries concurrently.
+
+    Every query gets a session of its own, hence a pooled connection of its
+    own, which is rolled back and returned to the pool once the query is
+    done. The queries see what is committed, not what the session from
+    `get_db_session` has written but not committed yet.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession]):
+        self.session_factory = session_factory
+
+    async def _run(self, query: ReadQuery) -> Any:
+        async with self.session_factory() as session:
+            return await query(session)
+
+    async def gather(self, *queries: ReadQuery) -> List[Any]:
+        """
+        Run queries at the same time.
+
+        :param queries: functions querying with the session they are given.
+        :return: the result of each query, in order.
+        """
+        return list(await asyncio.gather(*(self._run(query) for query in queries)))
+
+
+class SharedReadSessions(ReadSessions):
+    """Runs the queries of `ReadSessions` one after another on one session."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def gather(self, *queries: ReadQuery) -> List[Any]:
+        """
+        Run queries one after another.
+
+        :param queries: functions querying with the session they are given.
+        :return: the result of each query, in order.
+        """
+        return [await query(self.session) for query in queries]
+
+
+def get_db_read_sessions(connection: HTTPConnection) -> ReadSessions:
+    """
+    Get a runner of concurrent read-only queries.
+
+    Unlike `get_db_session` it can be used by websockets too, it holds no
+    connection between queries.
+
+    :param connection: current request or websocket.
+    :return: `ReadSessions` over the pool of the application.
+    """
+    return ReadSessions(connection.app.state.db_session_factory)
@@ -0,0 +1,32 @@
+"""Add spatial index on rides.route.
+
+Revision ID: 5c1e0a2f7b94
+Revises: 3d51e37d8b82
+Create Date: 2026-10-18 19:30:12.418290
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5c1e0a2f7b94"
+down_revision = "3d51e37d8b82"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CockroachDB builds an inverted index for USING gist and always builds
+    # indexes online, Postgres needs CONCURRENTLY to keep accepting writes
+    concurrently = op.get_bind().dialect.name == "postgresql"
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_rides_route",
+            "rides",
+            ["route"],
+            postgresql_using="gist",
+            postgresql_concurrently=concurrently,
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_rides_route", table_name="rides")
@@ -0,0 +1,48 @@
+"""Add route start and end times to rides.
+
+Revision ID: 9a4d3b61e2c7
+Revises: 5c1e0a2f7b94
+Create Date: 2026-10-18 19:45:37.902114
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "9a4d3b61e2c7"
+down_revision = "5c1e0a2f7b94"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CockroachDB cannot write to a column in the transaction that added it,
+    # so every step is committed on its own
+    with op.get_context().autocommit_block():
+        op.add_column(
+            "rides",
+            sa.Column("route_start_time", sa.DateTime(timezone=True), nullable=True),
+        )
+        op.add_column(
+            "rides",
+            sa.Column("route_end_time", sa.DateTime(timezone=True), nullable=True),
+        )
+        op.execute(
+            "UPDATE rides SET "
+            "route_start_time = route_timestamps[1], "
+            "route_end_time = route_timestamps[array_length(route_timestamps, 1)]",
+        )
+        op.alter_column("rides", "route_start_time", nullable=False)
+        op.alter_column("rides", "route_end_time", nullable=False)
+        op.create_index(
+            "ix_rides_active_route_end_time",
+            "rides",
+            ["route_end_time"],
+            postgresql_where=sa.text("phase < 0"),
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_rides_active_route_end_time", table_name="rides")
+    op.drop_column("rides", "route_end_time")
+    op.drop_column("rides", "route_start_time")
@@ -0,0 +1,67 @@
+"""Add matches table.
+
+Revision ID: d2e8f4a1c093
+Revises: 9a4d3b61e2c7
+Create Date: 2026-10-18 20:10:05.661382
+
+"""
+import sqlalchemy as sa
+from alembic import op
+from geoalchemy2 import Geography
+
+# revision identifiers, used by Alembic.
+revision = "d2e8f4a1c093"
+down_revision = "9a4d3b61e2c7"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "matches",
+        sa.Column("request_id", sa.Uuid(), nullable=False),
+        sa.Column("ride_id", sa.Uuid(), nullable=False),
+        sa.Column(
+            "pick_up_location",
+            Geography(geometry_type="POINT", srid=4326, spatial_index=False),
+            nullable=False,
+        ),
+        sa.Column(
+            "drop_off_location",
+            Geography(geometry_type="POINT", srid=4326, spatial_index=False),
+            nullable=False,
+        ),
+        sa.Column("pick_up_time", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("drop_off_time", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("pick_up_distance", sa.Float(), nullable=False),
+        sa.Column("drop_off_distance", sa.Float(), nullable=False),
+        sa.Column("estimated_passenger_walking_time", sa.Float(), nullable=False),
+        sa.Column("estimated_travel_time", sa.Float(), nullable=False),
+        sa.Column("fare", sa.Integer(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(["request_id"], ["requests.id"]),
+        sa.ForeignKeyConstraint(["ride_id"], ["rides.id"]),
+        sa.PrimaryKeyConstraint("request_id", "ride_id"),
+    )
+    op.create_index(
+        "ix_matches_request_id_travel_time",
+        "matches",
+        ["request_id", "estimated_travel_time"],
+    )
+    op.create_index(
+        "ix_requests_origin",
+        "requests",
+        ["origin"],
+        postgresql_using="gist",
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_requests_origin", table_name="requests")
+    op.drop_index("ix_matches_request_id_travel_time", table_name="matches")
+    op.drop_table("matches")
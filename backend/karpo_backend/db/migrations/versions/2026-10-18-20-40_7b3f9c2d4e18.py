@@ -0,0 +1,38 @@
+"""Add rank to matches.
+
+Revision ID: 7b3f9c2d4e18
+Revises: d2e8f4a1c093
+Create Date: 2026-10-18 20:40:12.318904
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "7b3f9c2d4e18"
+down_revision = "d2e8f4a1c093"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "matches",
+        sa.Column("rank", sa.Integer(), server_default="1", nullable=False),
+    )
+    op.create_index(
+        "ix_matches_request_id_rank_travel_time",
+        "matches",
+        ["request_id", "rank", "estimated_travel_time"],
+    )
+    op.drop_index("ix_matches_request_id_travel_time", table_name="matches")
+
+
+def downgrade() -> None:
+    op.create_index(
+        "ix_matches_request_id_travel_time",
+        "matches",
+        ["request_id", "estimated_travel_time"],
+    )
+    op.drop_index("ix_matches_request_id_rank_travel_time", table_name="matches")
+    op.drop_column("matches", "rank")
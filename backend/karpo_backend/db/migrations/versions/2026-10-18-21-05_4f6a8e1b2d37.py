@@ -0,0 +1,90 @@
+"""Add compact route data to rides.
+
+Revision ID: 4f6a8e1b2d37
+Revises: 7b3f9c2d4e18
+Create Date: 2026-10-18 21:05:44.107256
+
+"""
+import datetime
+import struct
+from typing import Sequence
+
+import numpy as np
+import numpy.typing as npt
+import sqlalchemy as sa
+from alembic import op
+from shapely import get_coordinates, wkb
+
+# revision identifiers, used by Alembic.
+revision = "4f6a8e1b2d37"
+down_revision = "7b3f9c2d4e18"
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 500
+
+
+def _encode_route(
+    coords: npt.NDArray[np.float64],
+    route_timestamps: Sequence[datetime.datetime],
+) -> bytes:
+    """
+    The "KRT1" format of `karpo_backend.route.codec` as of this revision.
+
+    Frozen here so the migration keeps writing what this revision reads,
+    whatever the codec becomes.
+    """
+    epochs = np.fromiter(
+        (t.timestamp() for t in route_timestamps),
+        dtype=float,
+        count=len(route_timestamps),
+    )
+    micro_degrees = np.rint(coords * 1_000_000).astype(np.int64)
+    deltas = np.diff(micro_degrees, axis=0, prepend=0)
+    base_us = int(round(epochs[0] * 1_000_000))
+    offsets = np.rint((epochs - base_us / 1_000_000) * 1000)
+    return b"".join(
+        (
+            struct.pack("<4sIq", b"KRT1", len(epochs), base_us),
+            deltas.astype("<i4").tobytes(),
+            offsets.astype("<i4").tobytes(),
+        ),
+    )
+
+
+def upgrade() -> None:
+    # CockroachDB cannot write to a column in the transaction that added it,
+    # so every step is committed on its own
+    with op.get_context().autocommit_block():
+        op.add_column("rides", sa.Column("route_data", sa.LargeBinary(), nullable=True))
+
+        connection = op.get_bind()
+        while True:
+            rows = connection.execute(
+                sa.text(
+                    "SELECT id, ST_AsBinary(route), route_timestamps FROM rides "
+                    "WHERE route_data IS NULL LIMIT :limit",
+                ),
+                {"limit": BACKFILL_BATCH_SIZE},
+            ).all()
+            if not rows:
+                break
+            connection.execute(
+                sa.text("UPDATE rides SET route_data = :route_data WHERE id = :id"),
+                [
+                    {
+                        "id": ride_id,
+                        "route_data": _encode_route(
+                            get_coordinates(wkb.loads(bytes(route))),
+                            route_timestamps,
+                        ),
+                    }
+                    for ride_id, route, route_timestamps in rows
+                ],
+            )
+
+        op.alter_column("rides", "route_data", nullable=False)
+
+
+def downgrade() -> None:
+    op.drop_column("rides", "route_data")
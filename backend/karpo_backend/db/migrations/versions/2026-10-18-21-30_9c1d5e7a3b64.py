@@ -0,0 +1,39 @@
+"""Add ride and request counters to users.
+
+Revision ID: 9c1d5e7a3b64
+Revises: 4f6a8e1b2d37
+Create Date: 2026-10-18 21:30:27.564193
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "9c1d5e7a3b64"
+down_revision = "4f6a8e1b2d37"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CockroachDB cannot write to a column in the transaction that added it,
+    # so every step is committed on its own
+    with op.get_context().autocommit_block():
+        op.add_column(
+            "user",
+            sa.Column("num_requests", sa.Integer(), server_default="0", nullable=False),
+        )
+        op.add_column(
+            "user",
+            sa.Column("num_rides", sa.Integer(), server_default="0", nullable=False),
+        )
+        op.execute(
+            'UPDATE "user" SET num_requests = '
+            '(SELECT count(*) FROM requests WHERE requests.user_id = "user".id), '
+            'num_rides = (SELECT count(*) FROM rides WHERE rides.user_id = "user".id)',
+        )
+
+
+def downgrade() -> None:
+    op.drop_column("user", "num_rides")
+    op.drop_column("user", "num_requests")
@@ -0,0 +1,26 @@
+"""Add index for paging chat messages.
+
+Revision ID: e5a7c9d1f382
+Revises: 9c1d5e7a3b64
+Create Date: 2026-10-18 21:50:03.842615
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "e5a7c9d1f382"
+down_revision = "9c1d5e7a3b64"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_messages_join_id_created_at_id",
+        "messages",
+        ["join_id", "created_at", "id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_messages_join_id_created_at_id", table_name="messages")
@@ -0,0 +1,46 @@
+"""Add join_events table.
+
+Revision ID: b2d4f6a8c0e1
+Revises: e5a7c9d1f382
+Create Date: 2026-10-18 22:10:27.193548
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "b2d4f6a8c0e1"
+down_revision = "e5a7c9d1f382"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "join_events",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("join_id", sa.Uuid(), nullable=False),
+        sa.Column("ride_id", sa.Uuid(), nullable=False),
+        sa.Column("request_id", sa.Uuid(), nullable=False),
+        sa.Column("request_user_id", sa.Uuid(), nullable=False),
+        sa.Column("ride_user_id", sa.Uuid(), nullable=False),
+        sa.Column("event", sa.String(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_join_events_created_at"),
+        "join_events",
+        ["created_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_join_events_created_at"), table_name="join_events")
+    op.drop_table("join_events")
@@ -0,0 +1,46 @@
+"""Number join events with a sequence.
+
+Revision ID: c7e9a1b3d5f2
+Revises: b2d4f6a8c0e1
+Create Date: 2026-10-18 22:40:09.512873
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c7e9a1b3d5f2"
+down_revision = "b2d4f6a8c0e1"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CockroachDB cannot write to a column in the transaction that added it,
+    # so every step is committed on its own
+    with op.get_context().autocommit_block():
+        op.execute("CREATE SEQUENCE IF NOT EXISTS join_events_seq")
+        op.add_column("join_events", sa.Column("seq", sa.BigInteger(), nullable=True))
+        op.alter_column(
+            "join_events",
+            "seq",
+            server_default=sa.text("nextval('join_events_seq')"),
+        )
+        # events still waiting to be relayed had no order to keep
+        op.execute(
+            "UPDATE join_events SET seq = nextval('join_events_seq') "
+            "WHERE seq IS NULL",
+        )
+        op.alter_column("join_events", "seq", nullable=False)
+        op.create_index(
+            op.f("ix_join_events_seq"),
+            "join_events",
+            ["seq"],
+            unique=False,
+        )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_join_events_seq"), table_name="join_events")
+    op.drop_column("join_events", "seq")
+    op.execute("DROP SEQUENCE IF EXISTS join_events_seq")
@@ -0,0 +1,53 @@
+import datetime
+import uuid
+
+from sqlalchemy import DDL, event, text
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+from sqlalchemy.sql.sqltypes import BigInteger, DateTime
+
+from karpo_backend.db.base import Base
+
+JOIN_EVENTS_SEQUENCE = "join_events_seq"
+
+
+class JoinEventsModel(Base):
+    """Model for a change of a join waiting to be pushed to its users."""
+
+    __tablename__ = "join_events"
+
+    id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
+    # no foreign keys, the event outlives a join deleted meanwhile
+    join_id: Mapped[uuid.UUID]
+    ride_id: Mapped[uuid.UUID]
+    request_id: Mapped[uuid.UUID]
+    request_user_id: Mapped[uuid.UUID]
+    ride_user_id: Mapped[uuid.UUID]
+    # created, accepted, rejected, canceled, onboard or fulfilled
+    event: Mapped[str]
+    created_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        index=True,
+    )
+    # the order the events were added in, also within one statement; a
+    # transaction changing a join waits for the one before it to commit, so
+    # the events of each join are numbered in the order they happened
+    seq: Mapped[int] = mapped_column(
+        BigInteger,
+        server_default=text(f"nextval('{JOIN_EVENTS_SEQUENCE}')"),
+        index=True,
+    )
+
+
+# the CockroachDB dialect does not create sequences itself
+event.listen(
+    JoinEventsModel.__table__,
+    "before_create",
+    DDL(f"CREATE SEQUENCE IF NOT EXISTS {JOIN_EVENTS_SEQUENCE}"),
+)
+event.listen(
+    JoinEventsModel.__table__,
+    "after_drop",
+    DDL(f"DROP SEQUENCE IF EXISTS {JOIN_EVENTS_SEQUENCE}"),
+)
@@ -0,0 +1,56 @@
+import datetime
+import uuid
+
+from geoalchemy2 import Geography, WKBElement
+from sqlalchemy import ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+from sqlalchemy.sql.sqltypes import DateTime
+
+from karpo_backend.db.base import Base
+
+RANK_ASSIGNED = 0  # the ride the batch matcher picked for the request
+RANK_DEFAULT = 1
+RANK_CONTESTED = 2  # the ride's seats went to other requests
+
+
+class MatchesModel(Base):
+    """Model for an evaluated match between a request and a ride."""
+
+    __tablename__ = "matches"
+    __table_args__ = (
+        Index(
+            "ix_matches_request_id_rank_travel_time",
+            "request_id",
+            "rank",
+            "estimated_travel_time",
+        ),
+    )
+
+    request_id: Mapped[uuid.UUID] = mapped_column(
+        ForeignKey("requests.id"),
+        primary_key=True,
+    )
+    ride_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("rides.id"), primary_key=True)
+    pick_up_location: Mapped[WKBElement] = mapped_column(
+        Geography(geometry_type="POINT", srid=4326, spatial_index=False),
+    )
+    drop_off_location: Mapped[WKBElement] = mapped_column(
+        Geography(geometry_type="POINT", srid=4326, spatial_index=False),
+    )
+    pick_up_time: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True))
+    drop_off_time: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True))
+    pick_up_distance: Mapped[float]
+    drop_off_distance: Mapped[float]
+    estimated_passenger_walking_time: Mapped[float]
+    estimated_travel_time: Mapped[float]
+    fare: Mapped[int]
+    # set by the batch matcher, lower ranks are listed first
+    rank: Mapped[int] = mapped_column(
+        default=RANK_DEFAULT,
+        server_default=str(RANK_DEFAULT),
+    )
+    created_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+    )
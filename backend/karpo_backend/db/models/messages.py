@@ -1,7 +1,7 @@
 import datetime
 import uuid
 
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.sql import func
 from sqlalchemy.sql.sqltypes import DateTime
@@ -13,6 +13,10 @@ class MessagesModel(Base):
     """Model for a message in a ride."""
 
     __tablename__ = "messages"
+    __table_args__ = (
+        # history of a chat is paged by (created_at, id)
+        Index("ix_messages_join_id_created_at_id", "join_id", "created_at", "id"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
     user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("user.id"))
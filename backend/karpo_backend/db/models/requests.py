@@ -3,7 +3,7 @@ import uuid
 from typing import Optional
 
 from geoalchemy2 import Geography, WKBElement
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.sql import func
 from sqlalchemy.sql.sqltypes import DateTime
@@ -15,6 +15,11 @@ class RequestsModel(Base):
     """Model for a passenger's request."""
 
     __tablename__ = "requests"
+    __table_args__ = (
+        # CockroachDB builds an inverted index for USING gist
+        Index("ix_requests_origin", "origin", postgresql_using="gist"),
+    )
+
     id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
     user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("user.id"))
     label: Mapped[Optional[str]]
@@ -2,10 +2,10 @@ import datetime
 import uuid
 
 from geoalchemy2 import Geography, WKBElement
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Index, text
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.sql import func
-from sqlalchemy.sql.sqltypes import ARRAY, DateTime, String
+from sqlalchemy.sql.sqltypes import ARRAY, DateTime, LargeBinary, String
 
 from karpo_backend.db.base import Base
 
@@ -14,6 +14,15 @@ class RidesModel(Base):
     """Model for a driver's ride."""
 
     __tablename__ = "rides"
+    __table_args__ = (
+        # CockroachDB builds an inverted index for USING gist
+        Index("ix_rides_route", "route", postgresql_using="gist"),
+        Index(
+            "ix_rides_active_route_end_time",
+            "route_end_time",
+            postgresql_where=text("phase < 0"),
+        ),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
     user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("user.id"))
@@ -32,6 +41,13 @@ class RidesModel(Base):
     route_timestamps = mapped_column(
         ARRAY(DateTime(timezone=True)),
     )
+    # route and route_timestamps packed by `karpo_backend.route.codec`, read by
+    # matching instead of the two columns above, which stay for indexing and
+    # for the API
+    route_data: Mapped[bytes] = mapped_column(LargeBinary)
+    # first and last of route_timestamps, so time windows can use an index
+    route_start_time: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True))
+    route_end_time: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True))
     intermediates = mapped_column(ARRAY(String))
     intermediate_descriptions = mapped_column(ARRAY(String))
     departure_time: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True))
@@ -1,9 +1,9 @@
 # type: ignore
 import datetime
 import uuid
-from typing import Optional
+from typing import Any, Dict, Optional
 
-from fastapi import Depends
+from fastapi import Depends, Request, WebSocket
 from fastapi_users import BaseUserManager, FastAPIUsers, UUIDIDMixin, schemas
 from fastapi_users.authentication import (
     AuthenticationBackend,
@@ -20,8 +20,13 @@ from sqlalchemy.sql.sqltypes import DateTime, String
 from typing_extensions import Annotated
 
 from karpo_backend.db.base import Base
-from karpo_backend.db.dependencies import get_db_session
+from karpo_backend.db.dependencies import (
+    ReadSessions,
+    get_db_read_sessions,
+    get_db_session,
+)
 from karpo_backend.services.redis.dependency import get_redis_pool
+from karpo_backend.services.users.profile_cache import ProfileCache
 from karpo_backend.settings import settings
 
 
@@ -32,6 +37,9 @@ class User(SQLAlchemyBaseUserTableUUID, Base):
     phone_number: Mapped[Optional[str]] = mapped_column(String(length=20))
     rating: Mapped[Optional[float]] = mapped_column(insert_default=None)
     rating_count: Mapped[int] = mapped_column(insert_default=0)
+    # kept by RequestsDAO and RidesDAO along with the rows they count
+    num_requests: Mapped[int] = mapped_column(insert_default=0, server_default="0")
+    num_rides: Mapped[int] = mapped_column(insert_default=0, server_default="0")
     avatar: Mapped[Optional[str]]
     created_at: Mapped[datetime.datetime] = mapped_column(
         DateTime(timezone=True),
@@ -72,6 +80,16 @@ class UserManager(UUIDIDMixin, BaseUserManager[User, uuid.UUID]):
     reset_password_token_secret = settings.users_secret
     verification_token_secret = settings.users_secret
 
+    async def on_after_update(
+        self,
+        user: User,
+        update_dict: Dict[str, Any],
+        request: Optional[Request] = None,
+    ) -> None:
+        """Drop the cached profile of an updated user."""
+        if request is not None:
+            await ProfileCache(request.app.state.redis_pool).invalidate(user.id)
+
 
 async def get_user_db(
     session: AsyncSession = Depends(get_db_session),
@@ -123,3 +141,39 @@ backends = [
 api_users = FastAPIUsers[User, uuid.UUID](get_user_manager, backends)
 
 current_active_user = api_users.current_user(active=True)
+
+
+# offered by a websocket client along with its token, as in
+# `new WebSocket(url, ["bearer", token])`, and chosen by the server
+WEBSOCKET_AUTH_SUBPROTOCOL = "bearer"
+
+
+async def websocket_active_user(
+    websocket: WebSocket,
+    strategy: RedisStrategy = Depends(get_redis_strategy),
+    read_sessions: ReadSessions = Depends(get_db_read_sessions),
+) -> Optional[User]:
+    """
+    Get the active user who opens a websocket.
+
+    Browsers cannot set headers on websockets, but they can offer
+    subprotocols, so the token comes in `Sec-WebSocket-Protocol` after
+    `WEBSOCKET_AUTH_SUBPROTOCOL`. Unlike a query parameter, it stays out of
+    access logs. The websocket must be accepted with
+    `subprotocol=WEBSOCKET_AUTH_SUBPROTOCOL`, or browsers drop it.
+
+    :returns: the user, None if the token is missing or invalid.
+    """
+    subprotocols = websocket.scope.get("subprotocols", [])
+    if len(subprotocols) != 2 or subprotocols[0] != WEBSOCKET_AUTH_SUBPROTOCOL:
+        return None
+    token = subprotocols[1]
+
+    async def read_user(session: AsyncSession) -> Optional[User]:
+        user_manager = UserManager(SQLAlchemyUserDatabase(session, User))
+        return await strategy.read_token(token, user_manager)
+
+    (user,) = await read_sessions.gather(read_user)
+    if user is None or not user.is_active:
+        return None
+    return user
@@ -1,14 +1,27 @@
 import dataclasses
 import datetime
-from typing import List, Optional, Tuple
+import enum
+import uuid
+from collections import Counter
+from typing import List, Optional, Sequence, Tuple, Union
 
+import numpy as np
+import numpy.typing as npt
 from loguru import logger
 from pyproj import Geod
-from shapely import LineString, Point, within, wkb, wkt
+from shapely import LineString, Point, get_coordinates, wkb, wkt
 from shapely.ops import nearest_points
 
 from karpo_backend.db.models.requests import RequestsModel
 from karpo_backend.db.models.rides import RidesModel
+from karpo_backend.route.cache import route_cache
+from karpo_backend.route.timeline import RouteTimeline, locate_on_routes
+
+WALKING_SPEED = 1.2  # meters per second
+MAX_WALKING_TIME = 60 * 30  # seconds
+MAX_WALKING_DISTANCE = WALKING_SPEED * MAX_WALKING_TIME  # meters
+
+_geod = Geod(ellps="WGS84")
 
 
 @dataclasses.dataclass
@@ -24,49 +37,76 @@ class Match:
     fare: int
 
 
+class RejectReason(str, enum.Enum):  # noqa: WPS600
+    """Why a ride cannot take a request."""
+
+    FINISHED = "finished"  # the route ends before the request starts
+    LATE = "late"  # the ride passes by before the passenger can get there
+    LONG_WALK = "long_walk"  # more than MAX_WALKING_TIME of walking
+    WRONG_WAY = "wrong_way"  # the route reaches the drop-off before the pick-up
+
+
+class CandidateRide:
+    """
+    The columns of a ride that matching reads, without an ORM instance.
+
+    The route cache decodes it from `route_data` like a `RidesModel`.
+    """
+
+    __slots__ = (
+        "id",
+        "user_id",
+        "route_data",
+        "last_update_time",
+        "num_seats",
+        "num_seats_left",
+    )
+
+    def __init__(  # noqa: WPS211
+        self,
+        id: uuid.UUID,  # noqa: WPS125
+        user_id: uuid.UUID,
+        route_data: bytes,
+        last_update_time: datetime.datetime,
+        num_seats: int,
+        num_seats_left: int,
+    ):
+        self.id = id
+        self.user_id = user_id
+        self.route_data = route_data
+        self.last_update_time = last_update_time
+        self.num_seats = num_seats
+        self.num_seats_left = num_seats_left
+
+
+# what matching takes as a ride, a full ORM instance or just the columns
+MatchableRide = Union[RidesModel, CandidateRide]
+
+
 def clip_route_by_start_time(
     route: LineString,
     ts: List[datetime.datetime],
     start_time: datetime.datetime,
 ) -> Tuple[LineString, List[datetime.datetime]]:
-    i: int = 0
-    while i < len(ts) and start_time > ts[i]:
-        i += 1
-    if i == len(ts):
-        raise ValueError("start_time higher than route ending time")
-
-    sub_route = LineString()
-    sub_ts = []
-    if i > 0 and start_time != ts[i]:
-        fraction = (start_time.timestamp() - ts[i - 1].timestamp()) / (
-            ts[i].timestamp() - ts[i - 1].timestamp()
-        )
-        p0 = LineString(route.coords[i - 1 : i + 1]).interpolate(  # noqa: WPS221
-            fraction,
-            normalized=True,
-        )
-        sub_route = LineString([p0] + route.coords[i:])
-        sub_ts = [start_time] + ts[i:]
-    else:
-        sub_route = LineString(route.coords[i:])
-        sub_ts = ts[i:]
-
-    return sub_route, sub_ts
+    timeline = RouteTimeline(
+        get_coordinates(route),
+        np.array([t.timestamp() for t in ts]),
+    )
+    i = timeline.index_at_time(start_time.timestamp())
+    sub_coords, _ = timeline.clip(start_time.timestamp())
+    sub_ts = ts[i:] if len(sub_coords) == len(ts) - i else [start_time] + ts[i:]
+    return LineString(sub_coords), sub_ts
 
 
 def find_point_idx_on_linestring(point: Point, line: LineString) -> int:
-    for i in range(len(line.coords) - 1):
-        p1 = Point(line.coords[i])
-        p2 = Point(line.coords[i + 1])
-        segment = LineString([p1, p2])
-        if point == p1 or point == p2:
-            return i
-        _, dist_to_seg = get_rendezvous_point_and_dist(segment, point)
-        if dist_to_seg < 5:
-            return i
-
-    logger.warning("cannot find point on linestring")
-    return 0
+    coords = get_coordinates(line)
+    segments, _ = locate_on_routes(
+        coords,
+        np.zeros(len(coords), dtype=np.intp),
+        np.zeros(1, dtype=np.intp),
+        np.array([[point.x, point.y]]),
+    )
+    return int(segments[0])
 
 
 def calc_distance(p1: Point, p2: Point) -> float:
@@ -84,75 +124,233 @@ def get_rendezvous_point_and_dist(
 
 
 def estimate_walking_time(distance: float) -> datetime.timedelta:
-    return datetime.timedelta(seconds=distance / 1.2)
+    return datetime.timedelta(seconds=distance / WALKING_SPEED)
 
 
-def evaluate_match(  # noqa: WPS210
-    ride: RidesModel,
-    req: RequestsModel,
-) -> Optional[Match]:
-    if req.start_time > ride.route_timestamps[-1]:
-        return None
+def travel_time_lower_bound(walking_distance: float) -> int:
+    """
+    Bound `Match.estimated_travel_time` from below by the passenger's walking distance.
+
+    A match's travel time includes walking to the pick-up location and from
+    the drop-off location. So any ride whose route is at least
+    `walking_distance` meters (origin plus destination distance, as computed
+    by ST_Distance) away cannot be matched faster than this.
+
+    :param walking_distance: lower bound of the total walking distance in meters.
+    :return: lower bound of the travel time in seconds.
+    """
+    # one meter of slack absorbs the difference between PostGIS and pyproj
+    return int(max(walking_distance - 1, 0) // WALKING_SPEED)
 
-    route = wkb.loads(bytes(ride.route.data))
 
+def load_request_points(req: RequestsModel) -> Tuple[Point, Point]:
     if isinstance(req.origin, str):
-        origin: Point = wkt.loads(req.origin)
-        destination: Point = wkt.loads(req.destination)
-    else:
-        origin: Point = wkb.loads(bytes(req.origin.data))
-        destination: Point = wkb.loads(bytes(req.destination.data))
-
-    sub_route, sub_ts = clip_route_by_start_time(
-        route,
-        ride.route_timestamps,
-        req.start_time,
-    )
+        return wkt.loads(req.origin), wkt.loads(req.destination)
+    return wkb.loads(bytes(req.origin.data)), wkb.loads(bytes(req.destination.data))
+
+
+def _geodesic_distances(
+    xy1: npt.NDArray[np.float64],
+    xy2: npt.NDArray[np.float64],
+) -> npt.NDArray[np.float64]:
+    xy1 = np.broadcast_to(xy1, xy2.shape) if xy1.ndim == 1 else xy1
+    xy2 = np.broadcast_to(xy2, xy1.shape) if xy2.ndim == 1 else xy2
+    _, _, dist = _geod.inv(xy1[:, 0], xy1[:, 1], xy2[:, 0], xy2[:, 1])
+    return np.asarray(dist, dtype=float)
 
-    pick_up_loc, dist_origin = get_rendezvous_point_and_dist(sub_route, origin)
-    drop_off_loc, dist_destination = get_rendezvous_point_and_dist(
-        sub_route,
-        destination,
+
+def _judge_pairs(  # noqa: WPS210, WPS213
+    timelines: Sequence[RouteTimeline],
+    reqs: Sequence[RequestsModel],
+    origins_xy: npt.NDArray[np.float64],
+    destinations_xy: npt.NDArray[np.float64],
+) -> List[Union[Match, RejectReason]]:
+    """
+    Evaluate the k-th route against the k-th request, for every k at once.
+
+    After clipping each route by the start time of its request, rendezvous
+    points of all pairs are found by a few NumPy and pyproj array calls
+    instead of one round of calls per pair.
+
+    :param timelines: route of each pair.
+    :param reqs: request of each pair.
+    :param origins_xy: lon/lat of the origin of each request.
+    :param destinations_xy: lon/lat of the destination of each request.
+    :return: a `Match` or the reason of rejection for each pair.
+    """
+    matches: List[Union[Match, RejectReason]] = [RejectReason.FINISHED] * len(reqs)
+    starts = np.array([req.start_time.timestamp() for req in reqs], dtype=float)
+    alive = [
+        i for i, timeline in enumerate(timelines) if starts[i] <= timeline.epochs[-1]
+    ]
+    if not alive:
+        return matches
+
+    clipped = [timelines[i].clip(starts[i]) for i in alive]
+    # a route clipped down to a single vertex has nothing left to ride along
+    live = [k for k, (_, epochs) in enumerate(clipped) if len(epochs) >= 2]
+    if not live:
+        return matches
+    pairs = np.array([alive[k] for k in live])
+
+    coords = np.concatenate([clipped[k][0] for k in live])
+    epochs = np.concatenate([clipped[k][1] for k in live])
+    sizes = np.array([len(clipped[k][1]) for k in live])
+    owner = np.repeat(np.arange(len(live)), sizes)
+    offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+
+    origin_xy = origins_xy[pairs]
+    destination_xy = destinations_xy[pairs]
+    pick_up_idx, pick_up_xy = locate_on_routes(coords, owner, offsets, origin_xy)
+    drop_off_idx, drop_off_xy = locate_on_routes(coords, owner, offsets, destination_xy)
+    dist_origin = _geodesic_distances(origin_xy, pick_up_xy)
+    dist_destination = _geodesic_distances(destination_xy, drop_off_xy)
+
+    pick_up_epochs = epochs[offsets + pick_up_idx]
+    drop_off_epochs = epochs[offsets + drop_off_idx + 1]
+    on_time = pick_up_epochs >= starts[pairs] + dist_origin / WALKING_SPEED
+    short_walk = (dist_origin + dist_destination) / WALKING_SPEED <= MAX_WALKING_TIME
+    # the ride must reach the drop-off location after the pick-up location
+    forward = (drop_off_idx > pick_up_idx) | (
+        (drop_off_idx == pick_up_idx)
+        & (
+            np.hypot(*(drop_off_xy - coords[offsets + drop_off_idx]).T)
+            >= np.hypot(*(pick_up_xy - coords[offsets + pick_up_idx]).T)
+        )
     )
+    accepted = np.flatnonzero(on_time & short_walk & forward)
+    # the last reason written wins, a long walk explains being late as well
+    for k in np.flatnonzero(~forward):
+        matches[pairs[k]] = RejectReason.WRONG_WAY
+    for k in np.flatnonzero(~on_time):
+        matches[pairs[k]] = RejectReason.LATE
+    for k in np.flatnonzero(~short_walk):
+        matches[pairs[k]] = RejectReason.LONG_WALK
+    if not len(accepted):
+        return matches
 
-    pick_up_time_lb = sub_ts[find_point_idx_on_linestring(pick_up_loc, sub_route)]
-    if pick_up_time_lb < req.start_time + estimate_walking_time(dist_origin):
-        logger.debug(
-            f"rejecting the match between request {req.id} "
-            f"and ride {ride.id} because the passenger cannot arrive on time"
+    driving_dist = _geodesic_distances(pick_up_xy[accepted], drop_off_xy[accepted])
+    for k, dist_driving in zip(accepted, driving_dist):
+        req = reqs[pairs[k]]
+        tz = req.start_time.tzinfo
+        pick_up_time_lb = datetime.datetime.fromtimestamp(pick_up_epochs[k], tz=tz)
+        drop_off_time_ub = datetime.datetime.fromtimestamp(drop_off_epochs[k], tz=tz)
+        estimated_arrival_time = drop_off_time_ub + estimate_walking_time(
+            dist_destination[k],
         )
-        return None
+        fare = 50
+        if dist_driving > 1000:
+            fare += int((dist_driving - 1000) * 0.02)
 
-    walking_dist: float = dist_origin + dist_destination
-    estimated_walking_time = estimate_walking_time(walking_dist).total_seconds()
-    if estimated_walking_time > 60 * 30:
-        logger.debug(
-            f"rejecting the match between request {req.id} and ride {ride.id} due to long walking time"
+        matches[pairs[k]] = Match(
+            pick_up_location=Point(pick_up_xy[k]),
+            drop_off_location=Point(drop_off_xy[k]),
+            pick_up_time=pick_up_time_lb,
+            drop_off_time=drop_off_time_ub,
+            pick_up_distance=float(dist_origin[k]),
+            drop_off_distance=float(dist_destination[k]),
+            estimated_passenger_walking_time=estimate_walking_time(
+                dist_origin[k] + dist_destination[k],
+            ).total_seconds(),
+            estimated_travel_time=(estimated_arrival_time - req.start_time).seconds,
+            fare=fare,
         )
-        return None
 
-    drop_off_time_ub = sub_ts[find_point_idx_on_linestring(drop_off_loc, sub_route) + 1]
-    estimated_arrival_time = drop_off_time_ub + estimate_walking_time(dist_destination)
-    driving_dist = calc_distance(pick_up_loc, drop_off_loc)
-    fare = 50
-    if driving_dist > 1000:
-        fare += int((driving_dist - 1000) * 0.02)
+    return matches
+
 
+def _log_judgements(
+    subject: str,
+    judgements: Sequence[Union[Match, RejectReason]],
+) -> None:
+    reasons = Counter(j for j in judgements if isinstance(j, RejectReason))
     logger.debug(
-        f"evaluated the match between request {req.id} and ride {ride.id}. "
-        f"pick_up_distance={dist_origin}, drop_off_distance={dist_destination}, "
-        f"pick_up_location=({pick_up_loc.x}, {pick_up_loc.y}), drop_off_location=({drop_off_loc.x}, {drop_off_loc.y}), "
-        f"pick_up_time={pick_up_time_lb}, drop_off_time={drop_off_time_ub}"
+        f"evaluated {subject}: "
+        f"{len(judgements) - sum(reasons.values())} accepted, "
+        f"{reasons[RejectReason.LATE]} late, "
+        f"{reasons[RejectReason.LONG_WALK]} with long walking time, "
+        f"{reasons[RejectReason.WRONG_WAY]} going the wrong way"
+    )
+
+
+def judge_matches(
+    rides: Sequence[MatchableRide],
+    req: RequestsModel,
+) -> List[Union[Match, RejectReason]]:
+    """
+    Evaluate a batch of candidate rides against one request.
+
+    Routes come from the route cache as `RouteTimeline`s and are evaluated
+    all at once.
+
+    :param rides: candidate rides.
+    :param req: the passenger's request.
+    :return: a `Match` or the reason of rejection for each ride, in the order
+        of `rides`.
+    """
+    if not rides:
+        return []
+    origin, destination = load_request_points(req)
+    judgements = _judge_pairs(
+        [route_cache.get(ride).timeline for ride in rides],
+        [req] * len(rides),
+        np.broadcast_to([origin.x, origin.y], (len(rides), 2)),
+        np.broadcast_to([destination.x, destination.y], (len(rides), 2)),
     )
+    _log_judgements(f"{len(rides)} rides for request {req.id}", judgements)
+    return judgements
+
+
+def evaluate_matches(
+    rides: Sequence[MatchableRide],
+    req: RequestsModel,
+) -> List[Optional[Match]]:
+    """
+    Evaluate a batch of candidate rides against one request.
+
+    :return: a `Match` or None (rejected) for each ride, in the order of `rides`.
+    """
+    return [
+        judgement if isinstance(judgement, Match) else None
+        for judgement in judge_matches(rides, req)
+    ]
+
+
+def evaluate_match(
+    ride: MatchableRide,
+    req: RequestsModel,
+) -> Optional[Match]:
+    return evaluate_matches([ride], req)[0]
+
+
+def evaluate_requests(
+    ride: MatchableRide,
+    reqs: Sequence[RequestsModel],
+) -> List[Optional[Match]]:
+    """
+    Evaluate one ride against a batch of requests.
+
+    The ride's route is decoded once through the route cache, and the
+    origins and destinations of all requests are located on it together.
 
-    return Match(
-        pick_up_location=pick_up_loc,
-        drop_off_location=drop_off_loc,
-        pick_up_time=pick_up_time_lb,
-        drop_off_time=drop_off_time_ub,
-        pick_up_distance=dist_origin,
-        drop_off_distance=dist_destination,
-        estimated_passenger_walking_time=estimated_walking_time,
-        estimated_travel_time=(estimated_arrival_time - req.start_time).seconds,
-        fare=fare,
+    :param ride: the new or changed ride.
+    :param reqs: requests the ride could take.
+    :return: a `Match` or None (rejected) for each request, in the order of `reqs`.
+    """
+    if not reqs:
+        return []
+    timeline = route_cache.get(ride).timeline
+    points = [load_request_points(req) for req in reqs]
+    judgements = _judge_pairs(
+        [timeline] * len(reqs),
+        reqs,
+        np.array([(origin.x, origin.y) for origin, _ in points], dtype=float),
+        np.array(
+            [(destination.x, destination.y) for _, destination in points],
+            dtype=float,
+        ),
     )
+    _log_judgements(f"ride {ride.id} against {len(reqs)} requests", judgements)
+    return [
+        judgement if isinstance(judgement, Match) else None for judgement in judgements
+    ]
@@ -0,0 +1 @@
+"""Decoding, caching and geometry helpers for ride routes."""
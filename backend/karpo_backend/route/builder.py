@@ -0,0 +1,60 @@
+from typing import Sequence, Tuple
+
+import numpy as np
+import numpy.typing as npt
+from pyproj import Geod
+
+_geod = Geod(ellps="WGS84")
+
+
+def build_route(
+    steps: Sequence[Sequence[Tuple[float, float]]],
+    durations: Sequence[float],
+) -> Tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+    """
+    Join the steps of a Google route into one line with a timetable.
+
+    Every step starts where the previous one ended, so only the first point of
+    the first step is taken from a step's head. The duration of a step is
+    shared out among its segments by their geodesic length; the segments of
+    a step that does not move share it equally.
+
+    :param steps: lon/lat points of every step.
+    :param durations: seconds the driver takes for every step.
+    :return: lon/lat of every vertex of the route and seconds from departure
+        at every vertex.
+    :raises ValueError: if the steps and durations do not describe a route.
+    """
+    if len(steps) != len(durations):
+        raise ValueError("Lengths of steps and durations should be equal.")
+    if not steps:
+        raise ValueError("A route needs at least one step.")
+    sizes = np.array([len(step) for step in steps])
+    if np.any(sizes < 2):
+        raise ValueError("Every step should have at least two points.")
+    step_durations = np.asarray(durations, dtype=float)
+    if np.any(step_durations < 0):
+        raise ValueError("Durations should not be negative.")
+
+    points = np.concatenate([np.asarray(step, dtype=float) for step in steps])
+    if points.ndim != 2 or points.shape[1] != 2:
+        raise ValueError("Points should be pairs of longitude and latitude.")
+
+    point_step = np.repeat(np.arange(len(steps)), sizes)
+    # a segment joins two consecutive points of the same step
+    in_step = point_step[:-1] == point_step[1:]
+    segment_step = point_step[:-1][in_step]
+    start, end = points[:-1][in_step], points[1:][in_step]
+    _, _, lengths = _geod.inv(start[:, 0], start[:, 1], end[:, 0], end[:, 1])
+    lengths = np.asarray(lengths, dtype=float)
+
+    step_lengths = np.bincount(segment_step, lengths, minlength=len(steps))
+    num_segments = sizes - 1
+    fractions = np.where(
+        step_lengths[segment_step] > 0,
+        lengths / np.where(step_lengths > 0, step_lengths, 1)[segment_step],
+        1 / num_segments[segment_step],
+    )
+    offsets = np.concatenate(([0], np.cumsum(step_durations[segment_step] * fractions)))
+    coords = np.concatenate((points[:1], end))
+    return coords, offsets
@@ -0,0 +1,125 @@
+import dataclasses
+import datetime
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, List, Tuple
+
+import numpy as np
+from prometheus_client import Counter
+from shapely import LineString, get_coordinates, linestrings, prepare, wkb
+
+from karpo_backend.route.codec import decode_route_data
+from karpo_backend.route.timeline import RouteTimeline
+from karpo_backend.settings import settings
+
+route_cache_events = Counter(
+    "route_cache_events",
+    "Lookups and evictions of the decoded route cache.",
+    ["event"],
+)
+
+
+@dataclasses.dataclass(frozen=True)
+class DecodedRoute:
+    """A ride's route decoded once from WKB, ready for matching and DTOs."""
+
+    line: LineString
+    timeline: RouteTimeline
+    last_update_time: datetime.datetime
+
+    @property
+    def points(self) -> List[Tuple[float, float]]:
+        return [(x, y) for x, y in self.timeline.coords.tolist()]
+
+    @property
+    def timestamps(self) -> List[datetime.datetime]:
+        return [
+            datetime.datetime.fromtimestamp(epoch, tz=datetime.timezone.utc)
+            for epoch in self.timeline.epochs.tolist()
+        ]
+
+
+def decode_route(ride: Any) -> DecodedRoute:
+    """
+    Decode the route of a ride without touching the cache.
+
+    The compact `route_data` is read when the ride has it, which spares
+    loading `route_timestamps` as one datetime per vertex.
+
+    :param ride: anything with `route_data` or `route` and `route_timestamps`,
+        and `last_update_time`, such as `RidesModel`.
+    :return: the decoded route.
+    """
+    route_data = getattr(ride, "route_data", None)
+    if route_data is not None:
+        coords, epochs = decode_route_data(route_data)
+        line = linestrings(coords)
+    else:
+        line = wkb.loads(bytes(ride.route.data))
+        coords = get_coordinates(line)
+        epochs = np.fromiter(
+            (t.timestamp() for t in ride.route_timestamps),
+            dtype=float,
+            count=len(ride.route_timestamps),
+        )
+    prepare(line)
+    coords.flags.writeable = False
+    epochs.flags.writeable = False
+    return DecodedRoute(
+        line=line,
+        timeline=RouteTimeline(coords, epochs),
+        last_update_time=ride.last_update_time,
+    )
+
+
+class RouteCache:
+    """
+    Per-worker LRU cache of decoded routes.
+
+    Entries are keyed by ride id and dropped as soon as the ride's
+    `last_update_time` differs from the one they were decoded at.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[uuid.UUID, DecodedRoute]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, ride: Any) -> DecodedRoute:
+        with self._lock:
+            entry = self._entries.get(ride.id)
+            if entry is not None and entry.last_update_time == ride.last_update_time:
+                self._entries.move_to_end(ride.id)
+                self.hits += 1
+                route_cache_events.labels("hit").inc()
+                return entry
+
+        entry = decode_route(ride)
+        with self._lock:
+            self.misses += 1
+            route_cache_events.labels("miss").inc()
+            self._entries[ride.id] = entry
+            self._entries.move_to_end(ride.id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+                route_cache_events.labels("eviction").inc()
+        return entry
+
+    def invalidate(self, ride_id: uuid.UUID) -> None:
+        with self._lock:
+            self._entries.pop(ride_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+route_cache = RouteCache(maxsize=settings.route_cache_size)
@@ -0,0 +1,94 @@
+import datetime
+import struct
+from typing import Sequence, Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+# magic, number of vertices, epoch of the first vertex in microseconds
+_HEADER = struct.Struct("<4sIq")
+_MAGIC = b"KRT1"
+COORDINATE_SCALE = 1_000_000  # micro-degrees
+OFFSET_SCALE = 1000  # milliseconds
+
+
+def encode_route(
+    coords: npt.ArrayLike,
+    epochs: npt.ArrayLike,
+) -> bytes:
+    """
+    Pack a route and its timestamps into a compact binary blob.
+
+    Coordinates are stored as int32 micro-degrees (about 0.1 meter), each
+    vertex as the difference from the previous one. Timestamps are stored as
+    int32 milliseconds after the first one, which covers routes of 24 days.
+
+    :param coords: lon/lat of every vertex.
+    :param epochs: epoch seconds of every vertex.
+    :return: the encoded route.
+    """
+    coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+    epochs = np.asarray(epochs, dtype=float)
+    if len(coords) != len(epochs):
+        raise ValueError("a route needs exactly one timestamp per vertex")
+    if not len(epochs):
+        raise ValueError("a route needs at least one vertex")
+
+    micro_degrees = np.rint(coords * COORDINATE_SCALE).astype(np.int64)
+    deltas = np.diff(micro_degrees, axis=0, prepend=0)
+    base_us = int(round(epochs[0] * 1_000_000))
+    offsets = np.rint((epochs - base_us / 1_000_000) * OFFSET_SCALE)
+    if np.abs(offsets).max() > np.iinfo(np.int32).max:
+        raise ValueError("route too long in time to encode")
+    return b"".join(
+        (
+            _HEADER.pack(_MAGIC, len(epochs), base_us),
+            deltas.astype("<i4").tobytes(),
+            offsets.astype("<i4").tobytes(),
+        ),
+    )
+
+
+def decode_route_data(
+    data: bytes,
+) -> Tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+    """
+    Unpack a blob from `encode_route`.
+
+    The int32 arrays are read in place with `np.frombuffer`, only the running
+    sums and the conversion to floats allocate.
+
+    :return: lon/lat of every vertex and epoch seconds of every vertex.
+    :raises ValueError: if `data` is not an encoded route.
+    """
+    buffer = memoryview(data)
+    if len(buffer) < _HEADER.size:
+        raise ValueError("not an encoded route")
+    magic, count, base_us = _HEADER.unpack_from(buffer)
+    if magic != _MAGIC or len(buffer) != _HEADER.size + 12 * count:
+        raise ValueError("not an encoded route")
+    deltas = np.frombuffer(buffer, dtype="<i4", count=2 * count, offset=_HEADER.size)
+    offsets = np.frombuffer(
+        buffer,
+        dtype="<i4",
+        count=count,
+        offset=_HEADER.size + 8 * count,
+    )
+    coords = np.cumsum(deltas.reshape(-1, 2), axis=0, dtype=np.int64) / COORDINATE_SCALE
+    epochs = base_us / 1_000_000 + offsets / OFFSET_SCALE
+    return coords, epochs
+
+
+def encode_route_points(
+    route: Sequence[Tuple[float, float]],
+    route_timestamps: Sequence[datetime.datetime],
+) -> bytes:
+    """Encode a route given as points and datetimes, as the API receives it."""
+    return encode_route(
+        np.array(route, dtype=float),
+        np.fromiter(
+            (t.timestamp() for t in route_timestamps),
+            dtype=float,
+            count=len(route_timestamps),
+        ),
+    )
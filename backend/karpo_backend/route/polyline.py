@@ -0,0 +1,58 @@
+import numpy as np
+import numpy.typing as npt
+
+POLYLINE_SCALE = 100_000  # 5 decimal places, as Google Maps does
+
+
+def encode_polyline(coords: npt.NDArray[np.float64]) -> str:
+    """
+    Encode a route in Google's encoded polyline format.
+
+    Every vertex is the difference from the previous one in 1e-5 degrees,
+    latitude first, each value zigzag-encoded and written as 5-bit groups of
+    printable ASCII. All vertices are encoded at once with numpy.
+
+    :param coords: lon/lat of every vertex.
+    :return: the encoded polyline.
+    """
+    coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+    scaled = np.rint(coords[:, ::-1] * POLYLINE_SCALE).astype(np.int64)
+    deltas = np.diff(scaled, axis=0, prepend=0).ravel()
+    values = (deltas << 1) ^ (deltas >> 63)
+    if not len(values):
+        return ""
+
+    num_groups = 1
+    while (int(values.max()) >> (5 * num_groups)) > 0:
+        num_groups += 1
+    shifts = 5 * np.arange(num_groups)
+    groups = (values[:, None] >> shifts) & 0x1F
+    # a value takes as many groups as it has bits, at least one
+    lengths = np.maximum((values[:, None] >> shifts > 0).sum(axis=1), 1)
+    index = np.arange(num_groups)
+    groups = np.where(index < lengths[:, None] - 1, groups | 0x20, groups) + 63
+    return groups[index < lengths[:, None]].astype(np.uint8).tobytes().decode("ascii")
+
+
+def decode_polyline(polyline: str) -> npt.NDArray[np.float64]:
+    """
+    Decode a polyline from `encode_polyline`.
+
+    :return: lon/lat of every vertex.
+    :raises ValueError: if `polyline` is not an encoded polyline.
+    """
+    values = []
+    value, shift = 0, 0
+    for char in polyline.encode("ascii"):
+        group = char - 63
+        if not 0 <= group < 64:
+            raise ValueError("not an encoded polyline")
+        value |= (group & 0x1F) << shift
+        shift += 5
+        if group < 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value, shift = 0, 0
+    if shift or len(values) % 2:
+        raise ValueError("not an encoded polyline")
+    scaled = np.cumsum(np.array(values, dtype=np.int64).reshape(-1, 2), axis=0)
+    return scaled[:, ::-1] / POLYLINE_SCALE
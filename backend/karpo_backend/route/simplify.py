@@ -0,0 +1,80 @@
+import math
+
+import numpy as np
+import numpy.typing as npt
+
+METERS_PER_DEGREE = 111_320
+
+
+def _to_meters(coords: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    """Project lon/lat onto a local plane, good enough within a city."""
+    lon_scale = math.cos(math.radians(float(coords[:, 1].mean())))
+    return (coords - coords[0]) * (METERS_PER_DEGREE * lon_scale, METERS_PER_DEGREE)
+
+
+def _relative(
+    error: npt.NDArray[np.float64],
+    tolerance: float,
+) -> npt.NDArray[np.float64]:
+    """:return: `error` in units of `tolerance`, a tolerance of 0 allowing no error."""
+    if tolerance > 0:
+        return error / tolerance
+    return np.where(error > 0, np.inf, 0.0)
+
+
+def simplify_route(  # noqa: WPS210
+    coords: npt.NDArray[np.float64],
+    epochs: npt.NDArray[np.float64],
+    tolerance: float,
+    time_tolerance: float,
+) -> npt.NDArray[np.intp]:
+    """
+    Drop the vertices of a route that matching would not miss.
+
+    Douglas-Peucker, with the driver's timetable as a second dimension: a
+    vertex is dropped only if it lies within `tolerance` meters of the
+    simplified segment and the time interpolated along that segment at its
+    projection is off by at most `time_tolerance` seconds. Kept vertices keep
+    their own timestamps, so the timestamps stay monotone.
+
+    :param coords: lon/lat of every vertex.
+    :param epochs: epoch seconds of every vertex.
+    :param tolerance: meters a dropped vertex may be off the simplified route,
+        0 for none at all.
+    :param time_tolerance: seconds a dropped vertex may be off its timestamp,
+        0 for none at all.
+    :return: indices of the kept vertices in ascending order, the first and
+        the last always among them.
+    """
+    coords = np.asarray(coords, dtype=float)
+    epochs = np.asarray(epochs, dtype=float)
+    if len(coords) <= 2:
+        return np.arange(len(coords))
+
+    xy = _to_meters(coords)
+    keep = np.zeros(len(coords), dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, len(coords) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        start, delta = xy[first], xy[last] - xy[first]
+        points = xy[first + 1 : last] - start
+        norm = float(delta @ delta)
+        fraction = np.clip(points @ delta / norm, 0, 1) if norm > 0 else 0
+        offset = points - np.multiply.outer(fraction, delta)
+        distance = np.hypot(offset[..., 0], offset[..., 1])
+        interpolated = epochs[first] + fraction * (epochs[last] - epochs[first])
+        lag = np.abs(epochs[first + 1 : last] - interpolated)
+        error = np.maximum(
+            _relative(distance, tolerance),
+            _relative(lag, time_tolerance),
+        )
+        worst = int(np.argmax(error))
+        if error[worst] > 1:
+            split = first + 1 + worst
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return np.flatnonzero(keep)
@@ -0,0 +1,155 @@
+from typing import Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+from karpo_backend.route.simplify import METERS_PER_DEGREE
+
+
+def locate_on_routes(
+    coords: npt.NDArray[np.float64],
+    owner: npt.NDArray[np.intp],
+    offsets: npt.NDArray[np.intp],
+    points_xy: npt.NDArray[np.float64],
+) -> Tuple[npt.NDArray[np.intp], npt.NDArray[np.float64]]:
+    """
+    Find the nearest point of each route to a point, for many routes at once.
+
+    `coords` holds the vertices of all routes back to back, `owner` the route
+    of each vertex, `offsets` the first vertex of each route and `points_xy`
+    one point per route. Distances are planar in degrees, the same as
+    shapely's `nearest_points`.
+
+    :return: the segment each nearest point lies on (the first one on ties, and
+        segment `k - 1` for vertex `k`) and the nearest points themselves.
+    """
+    seg_owner = owner[:-1]
+    is_segment = seg_owner == owner[1:]
+    start, delta = coords[:-1], coords[1:] - coords[:-1]
+    norm = np.einsum("ij,ij->i", delta, delta)
+    along = np.einsum("ij,ij->i", points_xy[seg_owner] - start, delta)
+    fraction = np.clip(along / np.where(norm > 0, norm, 1), 0, 1)
+    nearest = start + fraction[:, None] * delta
+    offset = nearest - points_xy[seg_owner]
+    dist2 = np.where(is_segment, np.einsum("ij,ij->i", offset, offset), np.inf)
+
+    min_dist2 = np.minimum.reduceat(np.append(dist2, np.inf), offsets)
+    not_found = len(dist2)
+    candidates = np.where(
+        dist2 <= min_dist2[seg_owner],
+        np.arange(len(dist2)),
+        not_found,
+    )
+    segments = np.minimum.reduceat(np.append(candidates, not_found), offsets)
+    return segments - offsets, nearest[segments]
+
+
+def _meters(
+    deltas: npt.NDArray[np.float64],
+    lat: npt.NDArray[np.float64],
+) -> npt.NDArray[np.float64]:
+    """:return: lengths of lon/lat `deltas` at latitudes `lat`, in meters."""
+    lengths = np.hypot(deltas[..., 0] * np.cos(np.radians(lat)), deltas[..., 1])
+    return lengths * float(METERS_PER_DEGREE)
+
+
+class RouteTimeline:
+    """
+    A route together with when the driver is expected at every point of it.
+
+    Built once per route. Cumulative distances and epoch seconds are kept as
+    sorted arrays, so looking up a time or a position is a binary search.
+    Distances are in meters, each segment measured on a plane at its own
+    latitude, which is close enough for segments of a road route.
+    """
+
+    __slots__ = ("coords", "epochs", "distances")
+
+    def __init__(
+        self,
+        coords: npt.NDArray[np.float64],
+        epochs: npt.NDArray[np.float64],
+    ):
+        if len(coords) != len(epochs):
+            raise ValueError("a route needs exactly one timestamp per vertex")
+        if len(coords) < 2:
+            raise ValueError("a route needs at least two vertices")
+        self.coords = coords
+        self.epochs = epochs
+        mid_lat = (coords[:-1, 1] + coords[1:, 1]) / 2
+        self.distances: npt.NDArray[np.float64] = np.concatenate(
+            (np.zeros(1), np.cumsum(_meters(np.diff(coords, axis=0), mid_lat))),
+        )
+
+    def __len__(self) -> int:
+        return len(self.epochs)
+
+    @property
+    def length(self) -> float:
+        return float(self.distances[-1])
+
+    def index_at_time(self, epoch: float) -> int:
+        """
+        Find the first vertex the driver reaches at or after `epoch`.
+
+        :raises ValueError: if the route ends before `epoch`.
+        """
+        i = int(np.searchsorted(self.epochs, epoch, side="left"))
+        if i == len(self.epochs):
+            raise ValueError("start_time higher than route ending time")
+        return i
+
+    def point_at_time(self, epoch: float) -> npt.NDArray[np.float64]:
+        i = self.index_at_time(epoch)
+        if i == 0 or self.epochs[i] == epoch:
+            return self.coords[i]
+        fraction = (epoch - self.epochs[i - 1]) / (self.epochs[i] - self.epochs[i - 1])
+        return self.coords[i - 1] + fraction * (self.coords[i] - self.coords[i - 1])
+
+    def clip(
+        self,
+        epoch: float,
+    ) -> Tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+        """
+        Cut off the part of the route driven before `epoch`.
+
+        :return: coordinates and epochs of the remaining route, starting with
+            the interpolated position at `epoch` when it falls mid-segment.
+        """
+        i = self.index_at_time(epoch)
+        if i == 0 or self.epochs[i] == epoch:
+            return self.coords[i:], self.epochs[i:]
+        return (
+            np.concatenate((self.point_at_time(epoch)[None], self.coords[i:])),
+            np.concatenate((np.array([epoch]), self.epochs[i:])),
+        )
+
+    def locate(
+        self,
+        point_xy: npt.ArrayLike,
+    ) -> Tuple[int, npt.NDArray[np.float64], float]:
+        """
+        Project a point onto the route.
+
+        :return: the segment of the nearest point, the nearest point and its
+            distance along the route in meters.
+        """
+        segments, nearest = locate_on_routes(
+            self.coords,
+            np.zeros(len(self.coords), dtype=np.intp),
+            np.zeros(1, dtype=np.intp),
+            np.asarray(point_xy, dtype=float).reshape(1, 2),
+        )
+        segment = int(segments[0])
+        start = self.coords[segment]
+        distance = self.distances[segment] + _meters(
+            nearest[0] - start,
+            (start[1] + nearest[0][1]) / 2,
+        )
+        return segment, nearest[0], float(distance)
+
+    def time_at_distance(self, distance: float) -> float:
+        return float(np.interp(distance, self.distances, self.epochs))
+
+    def time_at_fraction(self, fraction: float) -> float:
+        return self.time_at_distance(fraction * self.length)
@@ -0,0 +1 @@
+"""Chat service."""
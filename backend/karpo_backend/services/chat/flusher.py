@@ -0,0 +1,75 @@
+import asyncio
+import dataclasses
+import os
+import socket
+
+from loguru import logger
+from redis.asyncio import ConnectionPool
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from karpo_backend.db.dao.messages_dao import MessagesDAO
+from karpo_backend.services.chat.streams import ChatStreams
+from karpo_backend.settings import settings
+
+# messages taken by a worker this long ago are taken back from it
+RECLAIM_IDLE_MS = 60 * 1000
+
+CONSUMER = f"{socket.gethostname()}-{os.getpid()}"
+
+
+async def flush_chat_messages(
+    session_factory: async_sessionmaker[AsyncSession],
+    redis_pool: ConnectionPool,
+) -> int:
+    """
+    Write messages from the chat outbox to the `messages` table.
+
+    Messages left behind by a worker that died are taken first. A message is
+    acknowledged only after it is committed, inserting is idempotent, so a
+    message may be written twice but never lost. A message that can never be
+    written, e.g. of a join deleted meanwhile, is dropped.
+
+    :param session_factory: factory of database sessions.
+    :param redis_pool: redis connection pool.
+    :return: number of messages taken from the outbox.
+    """
+    streams = ChatStreams(redis_pool)
+    batch_size = settings.chat_flush_batch_size
+    entries = await streams.read_outbox(CONSUMER, batch_size, RECLAIM_IDLE_MS)
+    if not entries:
+        entries = await streams.read_outbox(CONSUMER, batch_size)
+    if not entries:
+        return 0
+
+    rows = [dataclasses.asdict(message) for _, message in entries]
+    try:
+        async with session_factory() as session:
+            await MessagesDAO(session).create_message_models(rows)
+            await session.commit()
+    except IntegrityError:
+        for row in rows:
+            try:
+                async with session_factory() as session:
+                    await MessagesDAO(session).create_message_models([row])
+                    await session.commit()
+            except IntegrityError:
+                logger.warning(
+                    f"dropped chat message {row['id']} of join {row['join_id']}"
+                )
+    await streams.ack_outbox([entry_id for entry_id, _ in entries])
+    return len(entries)
+
+
+async def chat_flush_loop(
+    session_factory: async_sessionmaker[AsyncSession],
+    redis_pool: ConnectionPool,
+) -> None:
+    """Run `flush_chat_messages` every `chat_flush_interval` seconds."""
+    while True:
+        await asyncio.sleep(settings.chat_flush_interval)
+        try:
+            while await flush_chat_messages(session_factory, redis_pool) > 0:
+                pass  # noqa: WPS420
+        except Exception:
+            logger.exception("flushing chat messages failed")
@@ -0,0 +1,36 @@
+import asyncio
+import contextlib
+
+from fastapi import FastAPI
+from loguru import logger
+
+from karpo_backend.services.chat.flusher import chat_flush_loop, flush_chat_messages
+
+
+def start_chat_flusher(app: FastAPI) -> None:  # pragma: no cover
+    """
+    Starts writing chat messages to the database in the background.
+
+    :param app: current fastapi application.
+    """
+    app.state.chat_flush_task = asyncio.create_task(
+        chat_flush_loop(app.state.db_session_factory, app.state.redis_pool),
+    )
+
+
+async def stop_chat_flusher(app: FastAPI) -> None:  # pragma: no cover
+    """
+    Stops the flusher and writes the messages it can still take.
+
+    :param app: current FastAPI app.
+    """
+    app.state.chat_flush_task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await app.state.chat_flush_task
+    try:
+        while await flush_chat_messages(
+            app.state.db_session_factory, app.state.redis_pool
+        ):
+            pass  # noqa: WPS420
+    except Exception:
+        logger.exception("flushing chat messages failed")
@@ -0,0 +1,189 @@
+import dataclasses
+import datetime
+import uuid
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from fastapi import Depends
+from redis.asyncio import ConnectionPool, Redis
+from redis.exceptions import ResponseError
+
+from karpo_backend.datetimes import as_utc
+from karpo_backend.services.redis.dependency import get_redis_pool
+from karpo_backend.settings import settings
+
+# every message posted, until the flusher has written it to the database
+CHAT_OUTBOX = "chat:outbox"
+CHAT_OUTBOX_GROUP = "messages"
+
+
+@dataclasses.dataclass
+class ChatMessage:
+    """A message in the chat of a join."""
+
+    id: uuid.UUID
+    join_id: uuid.UUID
+    user_id: uuid.UUID
+    content: str
+    created_at: datetime.datetime
+
+
+def _dump_message(message: ChatMessage) -> Dict[str, str]:
+    return {
+        "id": str(message.id),
+        "join_id": str(message.join_id),
+        "user_id": str(message.user_id),
+        "content": message.content,
+        "created_at": message.created_at.isoformat(),
+    }
+
+
+def _load_message(fields: Dict[str, str]) -> ChatMessage:
+    return ChatMessage(
+        id=uuid.UUID(fields["id"]),
+        join_id=uuid.UUID(fields["join_id"]),
+        user_id=uuid.UUID(fields["user_id"]),
+        content=fields["content"],
+        created_at=datetime.datetime.fromisoformat(fields["created_at"]),
+    )
+
+
+class ChatStreams:
+    """
+    Chat messages in redis streams.
+
+    Every join has a stream of its latest `chat_stream_maxlen` messages that
+    websockets read from. A message also goes to `CHAT_OUTBOX`, which the
+    flusher reads as a consumer group and acknowledges once the message is
+    in the `messages` table, so a message is written even if the worker that
+    took it dies.
+    """
+
+    def __init__(self, redis_pool: ConnectionPool = Depends(get_redis_pool)):
+        self.redis_pool = redis_pool
+
+    @staticmethod
+    def _key(join_id: uuid.UUID) -> str:
+        return f"chat:{join_id}"
+
+    async def post(
+        self,
+        join_id: uuid.UUID,
+        user_id: uuid.UUID,
+        content: str,
+        created_at: datetime.datetime,
+    ) -> ChatMessage:
+        """
+        Send a message to the chat of a join.
+
+        :return: the message.
+        """
+        message = ChatMessage(
+            id=uuid.uuid4(),
+            join_id=join_id,
+            user_id=user_id,
+            content=content,
+            created_at=as_utc(created_at),
+        )
+        fields = _dump_message(message)
+        async with Redis(connection_pool=self.redis_pool) as redis:
+            async with redis.pipeline(transaction=True) as pipe:
+                pipe.xadd(
+                    self._key(join_id),
+                    fields,
+                    maxlen=settings.chat_stream_maxlen,
+                    approximate=True,
+                )
+                pipe.expire(self._key(join_id), settings.chat_stream_ttl)
+                pipe.xadd(CHAT_OUTBOX, fields)
+                await pipe.execute()
+        return message
+
+    async def get_recent(self, join_id: uuid.UUID) -> List[ChatMessage]:
+        """:return: the messages still in the stream of a join, oldest first."""
+        async with Redis(connection_pool=self.redis_pool) as redis:
+            entries = await redis.xrange(self._key(join_id))
+        return [_load_message(fields) for _, fields in entries]
+
+    async def read(
+        self,
+        join_id: uuid.UUID,
+        last_id: str,
+        block: int,
+    ) -> List[Tuple[str, ChatMessage]]:
+        """
+        Wait for messages of a join.
+
+        :param join_id: id of the join.
+        :param last_id: stream id of the last message read, "$" for only
+            messages posted from now on.
+        :param block: milliseconds to wait for a message.
+        :return: stream id and message of each new message, oldest first.
+        """
+        async with Redis(connection_pool=self.redis_pool) as redis:
+            response = await redis.xread({self._key(join_id): last_id}, block=block)
+        return [
+            (entry_id, _load_message(fields))
+            for _, entries in response
+            for entry_id, fields in entries
+        ]
+
+    async def last_id(self, join_id: uuid.UUID) -> str:
+        """:return: stream id of the latest message of a join, "0" if none."""
+        async with Redis(connection_pool=self.redis_pool) as redis:
+            entries = await redis.xrevrange(self._key(join_id), count=1)
+        return entries[0][0] if entries else "0"
+
+    async def read_outbox(
+        self,
+        consumer: str,
+        count: int,
+        min_idle_time: Optional[int] = None,
+    ) -> List[Tuple[str, ChatMessage]]:
+        """
+        Take messages that are not in the database yet.
+
+        :param consumer: name of the taking worker.
+        :param count: max number of messages.
+        :param min_idle_time: take back messages another worker took this
+            many milliseconds ago without acknowledging, instead of new ones.
+        :return: outbox id and message of each message taken.
+        """
+        async with Redis(connection_pool=self.redis_pool) as redis:
+            try:
+                await redis.xgroup_create(
+                    CHAT_OUTBOX, CHAT_OUTBOX_GROUP, id="0", mkstream=True
+                )
+            except ResponseError as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+            if min_idle_time is None:
+                response = await redis.xreadgroup(
+                    CHAT_OUTBOX_GROUP,
+                    consumer,
+                    {CHAT_OUTBOX: ">"},
+                    count=count,
+                )
+                entries = [entry for _, stream in response for entry in stream]
+            else:
+                _, entries, *_ = await redis.xautoclaim(
+                    CHAT_OUTBOX,
+                    CHAT_OUTBOX_GROUP,
+                    consumer,
+                    min_idle_time=min_idle_time,
+                    count=count,
+                )
+        return [
+            (entry_id, _load_message(fields))
+            for entry_id, fields in entries
+            if fields is not None
+        ]
+
+    async def ack_outbox(self, entry_ids: Sequence[str]) -> None:
+        """Drop messages written to the database from the outbox."""
+        if not entry_ids:
+            return
+        async with Redis(connection_pool=self.redis_pool) as redis:
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.xack(CHAT_OUTBOX, CHAT_OUTBOX_GROUP, *entry_ids)
+                pipe.xdel(CHAT_OUTBOX, *entry_ids)
+                await pipe.execute()
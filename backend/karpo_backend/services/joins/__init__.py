@@ -0,0 +1 @@
+"""Joins service."""
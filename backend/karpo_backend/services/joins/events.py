@@ -0,0 +1,114 @@
+import dataclasses
+import datetime
+import uuid
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from fastapi import Depends
+from redis.asyncio import ConnectionPool, Redis
+
+from karpo_backend.services.redis.dependency import get_redis_pool
+from karpo_backend.settings import settings
+
+
+@dataclasses.dataclass
+class JoinEvent:
+    """A change of a join, as its driver and passenger are told of it."""
+
+    id: uuid.UUID
+    join_id: uuid.UUID
+    ride_id: uuid.UUID
+    request_id: uuid.UUID
+    event: str
+    created_at: datetime.datetime
+
+
+def _dump_event(event: JoinEvent) -> Dict[str, str]:
+    return {
+        "id": str(event.id),
+        "join_id": str(event.join_id),
+        "ride_id": str(event.ride_id),
+        "request_id": str(event.request_id),
+        "event": event.event,
+        "created_at": event.created_at.isoformat(),
+    }
+
+
+def _load_event(fields: Dict[str, str]) -> JoinEvent:
+    return JoinEvent(
+        id=uuid.UUID(fields["id"]),
+        join_id=uuid.UUID(fields["join_id"]),
+        ride_id=uuid.UUID(fields["ride_id"]),
+        request_id=uuid.UUID(fields["request_id"]),
+        event=fields["event"],
+        created_at=datetime.datetime.fromisoformat(fields["created_at"]),
+    )
+
+
+class JoinEventStreams:
+    """
+    Join events of each user in a redis stream.
+
+    A user's stream keeps their latest `join_events_stream_maxlen` events, so
+    a client that reconnects can resume from the last stream id it saw.
+    """
+
+    def __init__(self, redis_pool: ConnectionPool = Depends(get_redis_pool)):
+        self.redis_pool = redis_pool
+
+    @staticmethod
+    def _key(user_id: uuid.UUID) -> str:
+        return f"join_events:{user_id}"
+
+    async def publish(
+        self,
+        events: Sequence[Tuple[Sequence[uuid.UUID], JoinEvent]],
+    ) -> None:
+        """
+        Append events to the streams of their users, in the order given.
+
+        :param events: ids of the users to tell and the event, for each event.
+        """
+        if not events:
+            return
+        async with Redis(connection_pool=self.redis_pool) as redis:
+            async with redis.pipeline(transaction=False) as pipe:
+                for user_ids, event in events:
+                    fields = _dump_event(event)
+                    for user_id in user_ids:
+                        pipe.xadd(
+                            self._key(user_id),
+                            fields,
+                            maxlen=settings.join_events_stream_maxlen,
+                            approximate=True,
+                        )
+                        pipe.expire(self._key(user_id), settings.join_events_stream_ttl)
+                await pipe.execute()
+
+    async def read(
+        self,
+        user_id: uuid.UUID,
+        last_id: str,
+        block: Optional[int] = None,
+    ) -> List[Tuple[str, JoinEvent]]:
+        """
+        Wait for events of a user.
+
+        :param user_id: id of the user.
+        :param last_id: stream id of the last event read, "$" for only events
+            from now on.
+        :param block: milliseconds to wait for an event, None not to wait.
+        :return: stream id and event of each new event, oldest first.
+        """
+        async with Redis(connection_pool=self.redis_pool) as redis:
+            response = await redis.xread({self._key(user_id): last_id}, block=block)
+        return [
+            (entry_id, _load_event(fields))
+            for _, entries in response
+            for entry_id, fields in entries
+        ]
+
+    async def last_id(self, user_id: uuid.UUID) -> str:
+        """:return: stream id of the latest event of a user, "0" if none."""
+        async with Redis(connection_pool=self.redis_pool) as redis:
+            entries = await redis.xrevrange(self._key(user_id), count=1)
+        return entries[0][0] if entries else "0"
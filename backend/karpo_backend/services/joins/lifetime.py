@@ -0,0 +1,28 @@
+import asyncio
+import contextlib
+
+from fastapi import FastAPI
+
+from karpo_backend.services.joins.relay import join_events_relay_loop
+
+
+def start_join_events_relay(app: FastAPI) -> None:  # pragma: no cover
+    """
+    Starts pushing join events to the streams of users in the background.
+
+    :param app: current fastapi application.
+    """
+    app.state.join_events_relay_task = asyncio.create_task(
+        join_events_relay_loop(app.state.db_session_factory, app.state.redis_pool),
+    )
+
+
+async def stop_join_events_relay(app: FastAPI) -> None:  # pragma: no cover
+    """
+    Stops the relay, events left in the database go out with the next start.
+
+    :param app: current FastAPI app.
+    """
+    app.state.join_events_relay_task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await app.state.join_events_relay_task
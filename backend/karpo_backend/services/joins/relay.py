@@ -0,0 +1,123 @@
+import asyncio
+import uuid
+
+from loguru import logger
+from redis.asyncio import ConnectionPool, Redis
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from karpo_backend.datetimes import as_utc
+from karpo_backend.db.dao.join_events_dao import JoinEventsDAO
+from karpo_backend.services.joins.events import JoinEvent, JoinEventStreams
+from karpo_backend.settings import settings
+
+JOIN_EVENTS_RELAY_LOCK = "join_events:lock"
+# seconds the lock outlives a worker that died while relaying
+JOIN_EVENTS_RELAY_LOCK_TTL = 60
+# touch the lock only if it still holds the token of the worker, not if it
+# expired and another worker took it since
+RENEW_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("expire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+async def relay_join_events(
+    session_factory: async_sessionmaker[AsyncSession],
+    redis_pool: ConnectionPool,
+) -> int:
+    """
+    Move join events from the `join_events` table to the streams of their users.
+
+    The events are written to the table in the transaction that changes the
+    join, so none is published for a change rolled back, and none is lost if
+    the worker dies before publishing. Rows are deleted only after they are
+    published, so an event may be published twice; clients drop repeats
+    by the id of the event.
+
+    :param session_factory: factory of database sessions.
+    :param redis_pool: redis connection pool.
+    :return: number of events relayed.
+    """
+    async with session_factory() as session:
+        join_events_dao = JoinEventsDAO(session)
+        rows = await join_events_dao.get_oldest_join_event_models(
+            settings.join_events_relay_batch_size,
+        )
+        if not rows:
+            return 0
+        await JoinEventStreams(redis_pool).publish(
+            [
+                (
+                    (row.ride_user_id, row.request_user_id),
+                    JoinEvent(
+                        id=row.id,
+                        join_id=row.join_id,
+                        ride_id=row.ride_id,
+                        request_id=row.request_id,
+                        event=row.event,
+                        created_at=as_utc(row.created_at),
+                    ),
+                )
+                for row in rows
+            ],
+        )
+        await join_events_dao.delete_by_ids([row.id for row in rows])
+        await session.commit()
+    return len(rows)
+
+
+async def join_events_relay_loop(
+    session_factory: async_sessionmaker[AsyncSession],
+    redis_pool: ConnectionPool,
+) -> None:
+    """
+    Relay all pending join events every `join_events_relay_interval` seconds.
+
+    Only the worker holding the lock relays, so the events of every join
+    reach the streams in the order they were made. The lock is renewed after
+    every batch, so a long backlog does not outlive it.
+    """
+    while True:
+        await asyncio.sleep(settings.join_events_relay_interval)
+        try:
+            token = uuid.uuid4().hex
+            async with Redis(connection_pool=redis_pool) as redis:
+                locked = await redis.set(
+                    JOIN_EVENTS_RELAY_LOCK,
+                    token,
+                    nx=True,
+                    ex=JOIN_EVENTS_RELAY_LOCK_TTL,
+                )
+            if not locked:
+                continue
+            try:
+                while await relay_join_events(session_factory, redis_pool) > 0:
+                    async with Redis(connection_pool=redis_pool) as redis:
+                        renewed = await redis.eval(
+                            RENEW_LOCK_SCRIPT,
+                            1,
+                            JOIN_EVENTS_RELAY_LOCK,
+                            token,
+                            JOIN_EVENTS_RELAY_LOCK_TTL,
+                        )
+                    if not renewed:
+                        logger.warning("lost the join events relay lock")
+                        break
+            finally:
+                async with Redis(connection_pool=redis_pool) as redis:
+                    await redis.eval(
+                        RELEASE_LOCK_SCRIPT,
+                        1,
+                        JOIN_EVENTS_RELAY_LOCK,
+                        token,
+                    )
+        except Exception:
+            logger.exception("relaying join events failed")
@@ -0,0 +1 @@
+"""Matching service."""
@@ -0,0 +1,112 @@
+import heapq
+from typing import Dict, List, Sequence, Tuple
+
+INF = float("inf")
+
+
+class _FlowGraph:
+    """Residual graph for successive shortest path min-cost flow."""
+
+    def __init__(self, num_nodes: int):
+        self.heads: List[List[int]] = [[] for _ in range(num_nodes)]
+        self.to: List[int] = []
+        self.cap: List[int] = []
+        self.cost: List[float] = []
+
+    def add_edge(self, u: int, v: int, cap: int, cost: float) -> int:
+        """Add an edge and its residual twin, returning the edge's index."""
+        for a, b, c, w in ((u, v, cap, cost), (v, u, 0, -cost)):  # noqa: WPS440
+            self.heads[a].append(len(self.to))
+            self.to.append(b)
+            self.cap.append(c)
+            self.cost.append(w)
+        return len(self.to) - 2
+
+    def min_cost_max_flow(self, source: int, sink: int) -> None:
+        """
+        Push as much unit flow as possible, always along the cheapest path.
+
+        Dijkstra with Johnson potentials, so edge costs must start non-negative.
+        """
+        num_nodes = len(self.heads)
+        potential = [0.0] * num_nodes
+        while True:
+            dist = [INF] * num_nodes
+            via = [-1] * num_nodes
+            dist[source] = 0
+            heap = [(0.0, source)]
+            while heap:
+                d, u = heapq.heappop(heap)
+                if d > dist[u]:
+                    continue
+                for e in self.heads[u]:
+                    if self.cap[e] <= 0:
+                        continue
+                    v = self.to[e]
+                    nd = d + self.cost[e] + potential[u] - potential[v]
+                    if nd < dist[v] - 1e-9:
+                        dist[v] = nd
+                        via[v] = e
+                        heapq.heappush(heap, (nd, v))
+            if dist[sink] == INF:
+                return
+            for v in range(num_nodes):
+                if dist[v] < INF:
+                    potential[v] += dist[v]
+            v = sink
+            while v != source:
+                e = via[v]
+                self.cap[e] -= 1
+                self.cap[e ^ 1] += 1
+                v = self.to[e ^ 1]
+
+
+def assign_seats(  # noqa: WPS210
+    pairs: Sequence[Tuple[int, int, float]],
+    demands: Sequence[int],
+    capacities: Sequence[int],
+) -> Dict[int, int]:
+    """
+    Assign requests to rides, sharing out scarce seats.
+
+    First as many passengers as possible get a seat, then the total cost is
+    minimized. Single passengers are assigned exactly by min-cost max-flow.
+    Keeping a group in one car makes the problem NP-hard, so groups are
+    seated greedily by cost before that, on the rides with room for them.
+
+    :param pairs: feasible (request, ride, cost) triples, by index.
+    :param demands: seats each request needs.
+    :param capacities: seats left in each ride.
+    :return: the assigned ride of each assigned request.
+    """
+    seats_left = list(capacities)
+    assigned: Dict[int, int] = {}
+    for request, ride, _ in sorted(pairs, key=lambda pair: pair[2]):
+        demand = demands[request]
+        if demand > 1 and request not in assigned and seats_left[ride] >= demand:
+            assigned[request] = ride
+            seats_left[ride] -= demand
+
+    singles = [pair for pair in pairs if demands[pair[0]] == 1]
+    requests = sorted({request for request, _, _ in singles})
+    rides = sorted({ride for _, ride, _ in singles if seats_left[ride] > 0})
+    request_node = {request: i + 1 for i, request in enumerate(requests)}
+    ride_node = {ride: len(requests) + i + 1 for i, ride in enumerate(rides)}
+    source, sink = 0, len(requests) + len(rides) + 1
+
+    graph = _FlowGraph(sink + 1)
+    for request in requests:
+        graph.add_edge(source, request_node[request], 1, 0)
+    pair_edges = [
+        (request, ride, graph.add_edge(request_node[request], ride_node[ride], 1, cost))
+        for request, ride, cost in singles
+        if ride in ride_node
+    ]
+    for ride in rides:
+        graph.add_edge(ride_node[ride], sink, seats_left[ride], 0)
+
+    graph.min_cost_max_flow(source, sink)
+    for request, ride, edge in pair_edges:
+        if graph.cap[edge] == 0:
+            assigned[request] = ride
+    return assigned
@@ -0,0 +1,131 @@
+import asyncio
+import datetime
+import uuid
+from concurrent.futures import Executor
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+from redis.asyncio import ConnectionPool, Redis
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from karpo_backend.db.dao.matches_dao import MatchesDAO
+from karpo_backend.db.models.matches import RANK_ASSIGNED, RANK_CONTESTED, RANK_DEFAULT
+from karpo_backend.services.matching.assignment import assign_seats
+from karpo_backend.settings import settings
+
+BATCH_MATCHING_LOCK = "batch_matching:lock"
+
+
+async def run_batch_matching(  # noqa: WPS210
+    session_factory: async_sessionmaker[AsyncSession],
+    redis_pool: ConnectionPool,
+    executor: Optional[Executor] = None,
+) -> bool:
+    """
+    Share out seats among requests that arrived within the last window.
+
+    The stored matches of all recent requests are read in one query and the
+    best `batch_matching_candidates` of each become a sparse cost matrix of
+    travel times. `assign_seats` picks one ride per request so that as many
+    passengers as possible get a seat, and the matches are ranked with it:
+    the assigned ride first, rides whose seats went to other requests last.
+
+    Matches of inactive requests and of rides that ended or departed are
+    deleted first.
+
+    Only one worker runs a batch per interval.
+
+    :param session_factory: factory of database sessions.
+    :param redis_pool: redis connection pool, for the lock.
+    :param executor: executor to solve the assignment on, None to run inline.
+    :return: whether this worker ran the batch.
+    """
+    async with Redis(connection_pool=redis_pool) as redis:
+        locked = await redis.set(
+            BATCH_MATCHING_LOCK,
+            "1",
+            nx=True,
+            ex=max(int(settings.batch_matching_interval), 1),
+        )
+    if not locked:
+        return False
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    async with session_factory() as session:
+        await MatchesDAO(session).delete_stale(now)
+        await session.commit()
+
+    created_after = now - datetime.timedelta(seconds=settings.batch_matching_window)
+    async with session_factory() as session:
+        matches_dao = MatchesDAO(session)
+        rows = await matches_dao.get_batch_candidates(created_after)
+        if not rows:
+            return True
+
+        request_index: Dict[uuid.UUID, int] = {}
+        ride_index: Dict[uuid.UUID, int] = {}
+        demands: List[int] = []
+        capacities: List[int] = []
+        pairs: List[Tuple[int, int, float]] = []
+        num_candidates: Dict[int, int] = {}
+        for row in rows:
+            if row.request_id not in request_index:
+                request_index[row.request_id] = len(demands)
+                demands.append(row.num_passengers)
+            if row.ride_id not in ride_index:
+                ride_index[row.ride_id] = len(capacities)
+                capacities.append(row.num_seats_left)
+            request = request_index[row.request_id]
+            # rows come ordered by travel time within each request
+            if num_candidates.get(request, 0) < settings.batch_matching_candidates:
+                num_candidates[request] = num_candidates.get(request, 0) + 1
+                pairs.append(
+                    (request, ride_index[row.ride_id], row.estimated_travel_time)
+                )
+
+        loop = asyncio.get_running_loop()
+        assigned = await loop.run_in_executor(
+            executor,
+            assign_seats,
+            pairs,
+            demands,
+            capacities,
+        )
+
+        seats_left = list(capacities)
+        for request, ride in assigned.items():
+            seats_left[ride] -= demands[request]
+        ranks: List[Tuple[uuid.UUID, uuid.UUID, int]] = []
+        for row in rows:
+            request = request_index[row.request_id]
+            ride = ride_index[row.ride_id]
+            if assigned.get(request) == ride:
+                rank = RANK_ASSIGNED
+            elif seats_left[ride] < demands[request]:
+                rank = RANK_CONTESTED
+            else:
+                rank = RANK_DEFAULT
+            ranks.append((row.request_id, row.ride_id, rank))
+
+        await matches_dao.put_ranks(ranks)
+        await session.commit()
+
+    logger.info(
+        f"batch matching seated {len(assigned)} of {len(demands)} requests "
+        f"on {len(capacities)} rides",
+    )
+    return True
+
+
+async def batch_matching_loop(
+    session_factory: async_sessionmaker[AsyncSession],
+    redis_pool: ConnectionPool,
+    executor: Optional[Executor] = None,
+) -> None:
+    """Run `run_batch_matching` every `batch_matching_interval` seconds."""
+    while True:
+        await asyncio.sleep(settings.batch_matching_interval)
+        try:
+            await run_batch_matching(session_factory, redis_pool, executor)
+        except Exception:
+            logger.exception("batch matching failed")
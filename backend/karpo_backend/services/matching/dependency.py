@@ -0,0 +1,19 @@
+from concurrent.futures import Executor
+from typing import Optional
+
+from starlette.requests import Request
+
+
+def get_matching_executor(
+    request: Request,
+) -> Optional[Executor]:  # pragma: no cover
+    """
+    Returns the executor that runs CPU-bound matching.
+
+    Pass it to `evaluate_matches_in_executor`, so that evaluating candidates
+    does not block other requests handled by the same worker.
+
+    :param request: current request.
+    :returns: the executor, or None if matching runs on the event loop.
+    """
+    return request.app.state.matching_executor
@@ -0,0 +1,138 @@
+import asyncio
+import dataclasses
+import datetime
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, List, Optional, Sequence, Tuple, Union
+
+from geoalchemy2 import WKBElement
+
+from karpo_backend.db.models.requests import RequestsModel
+from karpo_backend.matching import (
+    Match,
+    RejectReason,
+    evaluate_requests,
+    judge_matches,
+    load_request_points,
+)
+
+
+@dataclasses.dataclass
+class _PicklableRide:
+    id: uuid.UUID
+    route: Optional[WKBElement]
+    route_timestamps: Optional[List[datetime.datetime]]
+    route_data: Optional[bytes]
+    last_update_time: datetime.datetime
+
+
+@dataclasses.dataclass
+class _PicklableRequest:
+    id: uuid.UUID
+    origin: str
+    destination: str
+    start_time: datetime.datetime
+
+
+def _picklable_ride(ride: Any) -> _PicklableRide:
+    route_data = getattr(ride, "route_data", None)
+    if route_data is not None:
+        return _PicklableRide(
+            id=ride.id,
+            route=None,
+            route_timestamps=None,
+            route_data=bytes(route_data),
+            last_update_time=ride.last_update_time,
+        )
+    return _PicklableRide(
+        id=ride.id,
+        route=WKBElement(bytes(ride.route.data)),
+        route_timestamps=list(ride.route_timestamps),
+        route_data=None,
+        last_update_time=ride.last_update_time,
+    )
+
+
+def _picklable_request(req: RequestsModel) -> _PicklableRequest:
+    origin, destination = load_request_points(req)
+    return _PicklableRequest(
+        id=req.id,
+        origin=origin.wkt,
+        destination=destination.wkt,
+        start_time=req.start_time,
+    )
+
+
+def _to_picklable(
+    rides: Sequence[Any],
+    req: RequestsModel,
+) -> Tuple[List[_PicklableRide], _PicklableRequest]:
+    return [_picklable_ride(ride) for ride in rides], _picklable_request(req)
+
+
+async def judge_matches_in_executor(
+    executor: Optional[Executor],
+    rides: Sequence[Any],
+    req: RequestsModel,
+) -> List[Union[Match, RejectReason]]:
+    """
+    Run `judge_matches` on the matching executor.
+
+    The event loop keeps serving other requests while a batch is evaluated.
+    Rides are stripped down to their routes before being sent to a process pool.
+
+    :param executor: executor from `get_matching_executor`, None to run inline.
+    :param rides: candidate rides.
+    :param req: the passenger's request.
+    :return: the same as `judge_matches`.
+    """
+    if executor is None or not rides:
+        return judge_matches(rides, req)
+    job_rides: Sequence[Any] = rides
+    job_req: Any = req
+    if isinstance(executor, ProcessPoolExecutor):
+        job_rides, job_req = _to_picklable(rides, req)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, judge_matches, job_rides, job_req)
+
+
+async def evaluate_matches_in_executor(
+    executor: Optional[Executor],
+    rides: Sequence[Any],
+    req: RequestsModel,
+) -> List[Optional[Match]]:
+    """
+    Run `evaluate_matches` on the matching executor.
+
+    :param executor: executor from `get_matching_executor`, None to run inline.
+    :param rides: candidate rides.
+    :param req: the passenger's request.
+    :return: the same as `evaluate_matches`.
+    """
+    judgements = await judge_matches_in_executor(executor, rides, req)
+    return [
+        judgement if isinstance(judgement, Match) else None for judgement in judgements
+    ]
+
+
+async def evaluate_requests_in_executor(
+    executor: Optional[Executor],
+    ride: Any,
+    reqs: Sequence[RequestsModel],
+) -> List[Optional[Match]]:
+    """
+    Run `evaluate_requests` on the matching executor.
+
+    :param executor: executor from `get_matching_executor`, None to run inline.
+    :param ride: the new or changed ride.
+    :param reqs: requests the ride could take.
+    :return: the same as `evaluate_requests`.
+    """
+    if executor is None or not reqs:
+        return evaluate_requests(ride, reqs)
+    job_reqs: Sequence[Any] = reqs
+    if isinstance(executor, ProcessPoolExecutor):
+        ride = _picklable_ride(ride)
+        job_reqs = [_picklable_request(req) for req in reqs]
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, evaluate_requests, ride, job_reqs)
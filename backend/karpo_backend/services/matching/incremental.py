@@ -0,0 +1,151 @@
+import uuid
+from concurrent.futures import Executor
+from typing import List, Optional, Tuple
+
+from fastapi import Depends
+from loguru import logger
+
+from karpo_backend.db.dao.matches_dao import MatchesDAO
+from karpo_backend.db.dao.requests_dao import RequestsDAO
+from karpo_backend.db.dao.rides_dao import RidesDAO
+from karpo_backend.db.models.requests import RequestsModel
+from karpo_backend.matching import Match
+from karpo_backend.services.matching.dependency import get_matching_executor
+from karpo_backend.services.matching.executor import evaluate_requests_in_executor
+from karpo_backend.services.matching.memo import MatchMemo
+from karpo_backend.settings import settings
+
+
+class IncrementalMatcher:
+    """
+    Keeps the matches table up to date as rides and requests change.
+
+    Every ride or request is evaluated once when it is created, in the same
+    transaction, so reading the matches of a request is a single indexed
+    query. Changes that can only remove matches just delete rows, matches of
+    inactive requests and of rides that can take no one anymore are pruned
+    by the batch matcher. Reads top the stored matches up when they run low.
+    """
+
+    def __init__(
+        self,
+        rides_dao: RidesDAO = Depends(),
+        requests_dao: RequestsDAO = Depends(),
+        matches_dao: MatchesDAO = Depends(),
+        match_memo: MatchMemo = Depends(),
+        executor: Optional[Executor] = Depends(get_matching_executor),
+    ):
+        self.rides_dao = rides_dao
+        self.requests_dao = requests_dao
+        self.matches_dao = matches_dao
+        self.match_memo = match_memo
+        self.executor = executor
+
+    async def _find_request_matches(
+        self,
+        request: RequestsModel,
+        limit: int,
+    ) -> List[Tuple[uuid.UUID, Match]]:
+        """:return: ride ids and matches of the best rides for a request."""
+        evaled_matches = await self.requests_dao.get_request_matches(
+            request,
+            max(limit, settings.matches_per_request),
+            self.executor,
+            self.match_memo,
+        )
+        return [(ride.id, match) for ride, match in evaled_matches]
+
+    async def on_request_created(self, request: RequestsModel, limit: int = 0) -> None:
+        """
+        Store the best matches of a new request.
+
+        :param limit: number of matches the caller reads right away, stored
+            even if more than `matches_per_request`.
+        """
+        await self.matches_dao.put_request_matches(
+            request.id,
+            await self._find_request_matches(request, limit),
+        )
+
+    async def _evaluate_ride(self, ride_id: uuid.UUID) -> List[Tuple[uuid.UUID, Match]]:
+        """:return: request ids and matches of the active requests a ride can take."""
+        ride = await self.rides_dao.get_candidate_ride_by_id(ride_id)
+        if ride is None:
+            return []
+        requests = await self.requests_dao.get_active_requests_near_ride(ride_id)
+
+        matches: List[Tuple[uuid.UUID, Match]] = []
+        batch_size = settings.matching_batch_size
+        for start in range(0, len(requests), batch_size):
+            batch = requests[start : start + batch_size]
+            batch_matches = await evaluate_requests_in_executor(
+                self.executor,
+                ride,
+                batch,
+            )
+            matches.extend(
+                (request.id, match)
+                for request, match in zip(batch, batch_matches)
+                if match is not None
+            )
+
+        logger.debug(
+            f"ride {ride_id} matched {len(matches)} of {len(requests)} nearby requests"
+        )
+        return matches
+
+    async def on_ride_created(self, ride_id: uuid.UUID) -> None:
+        """Match a new ride against all active requests nearby."""
+        await self.matches_dao.put_ride_matches(
+            ride_id,
+            await self._evaluate_ride(ride_id),
+        )
+
+    async def on_ride_seats_changed(
+        self,
+        ride_id: uuid.UUID,
+        num_seats_left: int,
+        previous_num_seats_left: int,
+    ) -> None:
+        """
+        Keep the matches of a ride in line with the seats it has left.
+
+        Fewer seats drop matches with requests that no longer fit. More seats
+        match the ride again against requests nearby, adding the ones that
+        fit now and keeping the ranks of the others.
+        """
+        if num_seats_left < previous_num_seats_left:
+            await self.matches_dao.delete_over_capacity_by_ride_id(
+                ride_id,
+                num_seats_left,
+            )
+        elif num_seats_left > previous_num_seats_left:
+            await self.matches_dao.upsert_ride_matches(
+                ride_id,
+                await self._evaluate_ride(ride_id),
+            )
+
+    async def on_request_read(self, request: RequestsModel, limit: int) -> None:
+        """
+        Make sure an active request has `limit` matches to read if it can.
+
+        Stored matches run out as their rides are asked, fill up or depart,
+        and requests created before the matches table have none. When fewer
+        than `limit` are left, rides are scanned again and the ones without a
+        stored match are added, so a passenger sees every ride the scan would
+        find. A request with fewer matches than that is scanned on every
+        read, as every request was before the table.
+        """
+        if not request.is_active:
+            return
+        if await self.matches_dao.count_request_matches(request, limit) >= limit:
+            return
+        await self.matches_dao.add_request_matches(
+            request.id,
+            await self._find_request_matches(request, limit),
+        )
+
+    async def on_ride_phase_changed(self, ride_id: uuid.UUID, phase: int) -> None:
+        """Drop all matches of a ride once it departs."""
+        if phase >= 0:
+            await self.matches_dao.delete_by_ride_id(ride_id)
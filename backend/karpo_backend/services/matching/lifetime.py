@@ -0,0 +1,80 @@
+import asyncio
+import contextlib
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+from fastapi import FastAPI
+
+from karpo_backend.services.matching.batch import batch_matching_loop
+from karpo_backend.settings import MatchingExecutorType, settings
+
+
+def create_matching_executor() -> Optional[Executor]:
+    """
+    Create the pool configured for matching.
+
+    :return: the pool, or None if matching should run on the event loop.
+    """
+    if settings.matching_executor_workers <= 0:
+        return None
+    if settings.matching_executor_type == MatchingExecutorType.PROCESS:
+        return ProcessPoolExecutor(
+            max_workers=settings.matching_executor_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return ThreadPoolExecutor(
+        max_workers=settings.matching_executor_workers,
+        thread_name_prefix="matching",
+    )
+
+
+def init_matching_executor(app: FastAPI) -> None:  # pragma: no cover
+    """
+    Creates the matching executor.
+
+    :param app: current fastapi application.
+    """
+    app.state.matching_executor = create_matching_executor()
+
+
+def shutdown_matching_executor(app: FastAPI) -> None:  # pragma: no cover
+    """
+    Waits for running evaluations and shuts the matching executor down.
+
+    :param app: current FastAPI app.
+    """
+    if app.state.matching_executor is not None:
+        app.state.matching_executor.shutdown(wait=True, cancel_futures=True)
+
+
+def start_batch_matching(app: FastAPI) -> None:  # pragma: no cover
+    """
+    Starts the batch matcher in the background.
+
+    :param app: current fastapi application.
+    """
+    app.state.batch_matching_task = None
+    if settings.batch_matching_interval <= 0:
+        return
+    app.state.batch_matching_task = asyncio.create_task(
+        batch_matching_loop(
+            app.state.db_session_factory,
+            app.state.redis_pool,
+            app.state.matching_executor,
+        ),
+    )
+
+
+async def stop_batch_matching(app: FastAPI) -> None:  # pragma: no cover
+    """
+    Stops the batch matcher.
+
+    :param app: current FastAPI app.
+    """
+    task = app.state.batch_matching_task
+    if task is None:
+        return
+    task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await task
@@ -0,0 +1,190 @@
+import datetime
+import json
+import uuid
+from concurrent.futures import Executor
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from fastapi import Depends
+from prometheus_client import Counter
+from redis.asyncio import ConnectionPool, Redis
+from shapely import Point
+
+from karpo_backend.db.models.requests import RequestsModel
+from karpo_backend.matching import Match, RejectReason
+from karpo_backend.services.matching.executor import judge_matches_in_executor
+from karpo_backend.services.redis.dependency import get_redis_pool
+from karpo_backend.settings import settings
+
+match_memo_events = Counter(
+    "match_memo_events",
+    "Lookups of memoized match evaluations.",
+    ["event"],
+)
+
+
+def dump_judgement(
+    judgement: Union[Match, RejectReason],
+    version: datetime.datetime,
+) -> str:
+    """
+    Serialize the evaluation of a ride against a request.
+
+    :param judgement: a `Match` or the reason of rejection.
+    :param version: `last_update_time` of the evaluated ride.
+    :return: JSON string.
+    """
+    entry: Dict[str, Any] = {"version": version.isoformat()}
+    if isinstance(judgement, RejectReason):
+        entry["reject"] = judgement.value
+        return json.dumps(entry)
+
+    entry["match"] = {
+        "pick_up_location": [
+            judgement.pick_up_location.x,
+            judgement.pick_up_location.y,
+        ],
+        "drop_off_location": [
+            judgement.drop_off_location.x,
+            judgement.drop_off_location.y,
+        ],
+        "pick_up_time": judgement.pick_up_time.isoformat(),
+        "drop_off_time": judgement.drop_off_time.isoformat(),
+        "pick_up_distance": judgement.pick_up_distance,
+        "drop_off_distance": judgement.drop_off_distance,
+        "estimated_passenger_walking_time": judgement.estimated_passenger_walking_time,
+        "estimated_travel_time": judgement.estimated_travel_time,
+        "fare": judgement.fare,
+    }
+    return json.dumps(entry)
+
+
+def load_judgement(
+    value: Optional[str],
+    version: datetime.datetime,
+) -> Optional[Union[Match, RejectReason]]:
+    """
+    Deserialize the evaluation of a ride against a request.
+
+    :param value: string from `dump_judgement`, or None if there is none.
+    :param version: current `last_update_time` of the ride.
+    :return: the judgement, or None if missing or made for another version.
+    """
+    if value is None:
+        return None
+    entry = json.loads(value)
+    if datetime.datetime.fromisoformat(entry["version"]) != version:
+        return None
+    if "reject" in entry:
+        return RejectReason(entry["reject"])
+
+    match = entry["match"]
+    return Match(
+        pick_up_location=Point(match["pick_up_location"]),
+        drop_off_location=Point(match["drop_off_location"]),
+        pick_up_time=datetime.datetime.fromisoformat(match["pick_up_time"]),
+        drop_off_time=datetime.datetime.fromisoformat(match["drop_off_time"]),
+        pick_up_distance=match["pick_up_distance"],
+        drop_off_distance=match["drop_off_distance"],
+        estimated_passenger_walking_time=match["estimated_passenger_walking_time"],
+        estimated_travel_time=match["estimated_travel_time"],
+        fare=match["fare"],
+    )
+
+
+class MatchMemo:
+    """
+    Evaluated matches and rejections of each request, stored in redis.
+
+    Entries of a request live in one hash keyed by ride id and remember the
+    ride's `last_update_time`, so a ride is evaluated again only after it
+    changes. The hash expires `match_memo_ttl` seconds after the last write.
+    """
+
+    def __init__(self, redis_pool: ConnectionPool = Depends(get_redis_pool)):
+        self.redis_pool = redis_pool
+
+    @staticmethod
+    def _key(request_id: uuid.UUID) -> str:
+        return f"match_memo:{request_id}"
+
+    async def get_judgements(
+        self,
+        request_id: uuid.UUID,
+        rides: Sequence[Any],
+    ) -> List[Optional[Union[Match, RejectReason]]]:
+        """
+        Look up memoized judgements of rides.
+
+        :param request_id: id of the request.
+        :param rides: rides with `id` and `last_update_time`.
+        :return: the judgement of each ride, None if it has to be evaluated.
+        """
+        if not rides:
+            return []
+        async with Redis(connection_pool=self.redis_pool) as redis:
+            values = await redis.hmget(
+                self._key(request_id),
+                [str(ride.id) for ride in rides],
+            )
+        return [
+            load_judgement(value, ride.last_update_time)
+            for value, ride in zip(values, rides)
+        ]
+
+    async def put_judgements(
+        self,
+        request_id: uuid.UUID,
+        rides: Sequence[Any],
+        judgements: Sequence[Union[Match, RejectReason]],
+    ) -> None:
+        """
+        Memoize judgements of rides.
+
+        :param request_id: id of the request.
+        :param rides: rides with `id` and `last_update_time`.
+        :param judgements: the judgement of each ride.
+        """
+        if not rides:
+            return
+        key = self._key(request_id)
+        async with Redis(connection_pool=self.redis_pool) as redis:
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.hset(
+                    key,
+                    mapping={
+                        str(ride.id): dump_judgement(judgement, ride.last_update_time)
+                        for ride, judgement in zip(rides, judgements)
+                    },
+                )
+                pipe.expire(key, settings.match_memo_ttl)
+                await pipe.execute()
+
+    async def evaluate_matches(
+        self,
+        executor: Optional[Executor],
+        rides: Sequence[Any],
+        req: RequestsModel,
+    ) -> List[Optional[Match]]:
+        """
+        `evaluate_matches_in_executor`, evaluating only rides not memoized yet.
+
+        :param executor: executor from `get_matching_executor`, None to run inline.
+        :param rides: candidate rides.
+        :param req: the passenger's request.
+        :return: a `Match` or None (rejected) for each ride, in the order of `rides`.
+        """
+        judgements = await self.get_judgements(req.id, rides)
+        missing = [i for i, judgement in enumerate(judgements) if judgement is None]
+        match_memo_events.labels("hit").inc(len(rides) - len(missing))
+        match_memo_events.labels("miss").inc(len(missing))
+        if missing:
+            missing_rides = [rides[i] for i in missing]
+            evaluated = await judge_matches_in_executor(executor, missing_rides, req)
+            await self.put_judgements(req.id, missing_rides, evaluated)
+            for i, judgement in zip(missing, evaluated):
+                judgements[i] = judgement
+
+        return [
+            judgement if isinstance(judgement, Match) else None
+            for judgement in judgements
+        ]
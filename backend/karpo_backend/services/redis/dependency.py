@@ -1,11 +1,13 @@
 from typing import AsyncGenerator
 
 from redis.asyncio import ConnectionPool
-from starlette.requests import Request
+from starlette.requests import HTTPConnection
+
+from karpo_backend.services.redis.pubsub import PubSubHub
 
 
 async def get_redis_pool(
-    request: Request,
+    request: HTTPConnection,
 ) -> AsyncGenerator[ConnectionPool, None]:  # pragma: no cover
     """
     Returns connection pool.
@@ -20,7 +22,17 @@ async def get_redis_pool(
 
     I use pools, so you don't acquire connection till the end of the handler.
 
-    :param request: current request.
+    :param request: current request or websocket.
     :returns:  redis connection pool.
     """
     return request.app.state.redis_pool
+
+
+def get_pubsub_hub(connection: HTTPConnection) -> PubSubHub:  # pragma: no cover
+    """
+    Returns the pub/sub hub of the worker.
+
+    :param connection: current request or websocket.
+    :returns: the hub made by `init_redis`.
+    """
+    return connection.app.state.pubsub_hub
@@ -1,6 +1,7 @@
 from fastapi import FastAPI
 from redis.asyncio import ConnectionPool
 
+from karpo_backend.services.redis.pubsub import PubSubHub
 from karpo_backend.settings import settings
 
 
@@ -14,6 +15,7 @@ def init_redis(app: FastAPI) -> None:  # pragma: no cover
         str(settings.redis_url),
         decode_responses=True,
     )
+    app.state.pubsub_hub = PubSubHub(app.state.redis_pool)
 
 
 async def shutdown_redis(app: FastAPI) -> None:  # pragma: no cover
@@ -22,4 +24,5 @@ async def shutdown_redis(app: FastAPI) -> None:  # pragma: no cover
 
     :param app: current FastAPI app.
     """
+    await app.state.pubsub_hub.close()
     await app.state.redis_pool.disconnect()
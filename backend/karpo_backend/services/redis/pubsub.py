@@ -0,0 +1,123 @@
+import asyncio
+import contextlib
+from typing import AsyncIterator, Dict, Optional, Set
+
+from loguru import logger
+from prometheus_client import Counter
+from redis.asyncio import ConnectionPool, Redis
+from redis.asyncio.client import PubSub
+
+pubsub_dropped_messages = Counter(
+    "pubsub_dropped_messages",
+    "Messages dropped because a subscriber fell behind.",
+)
+
+
+class Subscription:
+    """
+    Messages of a channel waiting for one subscriber.
+
+    At most `maxsize` messages wait, when a slow subscriber falls further
+    behind the oldest ones are dropped, so it skips to recent messages
+    instead of holding up the others or growing without bound.
+    """
+
+    def __init__(self, maxsize: int):
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize)
+
+    def push(self, message: str) -> None:
+        """Queue a message, dropping the oldest one if the queue is full."""
+        if self._queue.full():
+            self._queue.get_nowait()
+            pubsub_dropped_messages.inc()
+        self._queue.put_nowait(message)
+
+    async def get(self) -> str:
+        """:return: the next message, waiting for one if there is none."""
+        return await self._queue.get()
+
+
+class PubSubHub:
+    """
+    Redis pub/sub shared by everything of one worker that listens.
+
+    The worker holds one redis connection for all its subscriptions and
+    subscribes to a channel once, however many websockets listen to it.
+    Messages are published through redis, so they reach the listeners of
+    every worker and every pod.
+    """
+
+    def __init__(self, redis_pool: ConnectionPool):
+        self.redis_pool = redis_pool
+        self._pubsub: Optional[PubSub] = None
+        self._reader: Optional["asyncio.Task[None]"] = None
+        self._subscriptions: Dict[str, Set[Subscription]] = {}
+        self._lock = asyncio.Lock()
+
+    async def publish(self, channel: str, message: str) -> None:
+        """Send a message to the listeners of a channel."""
+        async with Redis(connection_pool=self.redis_pool) as redis:
+            await redis.publish(channel, message)
+
+    @contextlib.asynccontextmanager
+    async def subscribe(
+        self,
+        channel: str,
+        maxsize: int,
+    ) -> AsyncIterator[Subscription]:
+        """
+        Listen to a channel.
+
+        :param channel: name of the channel.
+        :param maxsize: messages kept for the subscriber, see `Subscription`.
+        :yield: the messages published while the context is open.
+        """
+        subscription = Subscription(maxsize)
+        async with self._lock:
+            pubsub = await self._connect()
+            subscriptions = self._subscriptions.setdefault(channel, set())
+            if not subscriptions:
+                await pubsub.subscribe(channel)
+            subscriptions.add(subscription)
+        try:
+            yield subscription
+        finally:
+            async with self._lock:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[channel]
+                    await pubsub.unsubscribe(channel)
+
+    async def _connect(self) -> PubSub:
+        if self._pubsub is None:
+            self._pubsub = Redis(connection_pool=self.redis_pool).pubsub()
+            await self._pubsub.connect()
+            self._reader = asyncio.create_task(self._read(self._pubsub))
+        return self._pubsub
+
+    async def _read(self, pubsub: PubSub) -> None:
+        while True:
+            try:
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True,
+                    timeout=1.0,
+                )
+            except Exception:
+                logger.exception("reading redis pub/sub failed")
+                await asyncio.sleep(1)
+                continue
+            if message is None:
+                continue
+            for subscription in self._subscriptions.get(message["channel"], ()):
+                subscription.push(message["data"])
+
+    async def close(self) -> None:
+        """Stop listening to every channel."""
+        if self._reader is not None:
+            self._reader.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._reader
+            self._reader = None
+        if self._pubsub is not None:
+            await self._pubsub.close()
+            self._pubsub = None
@@ -0,0 +1 @@
+"""Ride state service."""
@@ -0,0 +1,57 @@
+import asyncio
+
+from loguru import logger
+from redis.asyncio import ConnectionPool
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from karpo_backend.db.dao.rides_dao import RidesDAO
+from karpo_backend.services.rides.state import RideStateStore
+from karpo_backend.settings import settings
+
+
+async def flush_ride_states(
+    session_factory: async_sessionmaker[AsyncSession],
+    redis_pool: ConnectionPool,
+) -> int:
+    """
+    Write the driver positions of dirty rides back to their rows.
+
+    Every worker may flush at the same time, each pops its own rides from
+    the dirty set. Rides whose flush fails are marked dirty again.
+
+    :param session_factory: factory of database sessions.
+    :param redis_pool: redis connection pool.
+    :return: number of rides written.
+    """
+    store = RideStateStore(redis_pool)
+    ride_ids = await store.pop_dirty(settings.ride_state_flush_batch_size)
+    if not ride_ids:
+        return 0
+    try:
+        states = await store.get_many(ride_ids)
+        async with session_factory() as session:
+            await RidesDAO(session).put_positions_by_ids(
+                {
+                    ride_id: (state.longitude, state.latitude, state.last_update_time)
+                    for ride_id, state in states.items()
+                },
+            )
+            await session.commit()
+    except Exception:
+        await store.mark_dirty(ride_ids)
+        raise
+    return len(states)
+
+
+async def ride_state_flush_loop(
+    session_factory: async_sessionmaker[AsyncSession],
+    redis_pool: ConnectionPool,
+) -> None:
+    """Run `flush_ride_states` every `ride_state_flush_interval` seconds."""
+    while True:
+        await asyncio.sleep(settings.ride_state_flush_interval)
+        try:
+            while await flush_ride_states(session_factory, redis_pool) > 0:
+                pass  # noqa: WPS420
+        except Exception:
+            logger.exception("flushing ride states failed")
@@ -0,0 +1,46 @@
+import asyncio
+import contextlib
+
+from fastapi import FastAPI
+from loguru import logger
+
+from karpo_backend.services.rides.flusher import (
+    flush_ride_states,
+    ride_state_flush_loop,
+)
+from karpo_backend.settings import settings
+
+
+def start_ride_state_flusher(app: FastAPI) -> None:  # pragma: no cover
+    """
+    Starts writing ride states in redis back to the database in the background.
+
+    :param app: current fastapi application.
+    """
+    app.state.ride_state_flush_task = None
+    if settings.ride_state_flush_interval <= 0:
+        return
+    app.state.ride_state_flush_task = asyncio.create_task(
+        ride_state_flush_loop(app.state.db_session_factory, app.state.redis_pool),
+    )
+
+
+async def stop_ride_state_flusher(app: FastAPI) -> None:  # pragma: no cover
+    """
+    Stops the flusher and writes what is still dirty.
+
+    :param app: current FastAPI app.
+    """
+    task = app.state.ride_state_flush_task
+    if task is None:
+        return
+    task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await task
+    try:
+        while await flush_ride_states(
+            app.state.db_session_factory, app.state.redis_pool
+        ):
+            pass  # noqa: WPS420
+    except Exception:
+        logger.exception("flushing ride states failed")
@@ -0,0 +1,163 @@
+import dataclasses
+import datetime
+import uuid
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+from fastapi import Depends
+from redis.asyncio import ConnectionPool, Redis
+from shapely import Point, wkb
+
+from karpo_backend.db.dao.rides_dao import RidesDAO
+from karpo_backend.services.redis.dependency import get_redis_pool
+from karpo_backend.settings import settings
+
+# ids of rides whose state in redis is newer than their row
+RIDE_STATE_DIRTY = "ride_state:dirty"
+
+_FIELDS = ("user_id", "longitude", "latitude", "phase", "last_update_time")
+
+
+@dataclasses.dataclass
+class RideState:
+    """What changes while a ride is in progress."""
+
+    user_id: uuid.UUID
+    longitude: float
+    latitude: float
+    phase: int
+    last_update_time: datetime.datetime
+
+
+def ride_status_channel(ride_id: uuid.UUID) -> str:
+    """:return: the pub/sub channel of the status updates of a ride."""
+    return f"ride_status:{ride_id}"
+
+
+def _dump_state(state: RideState) -> Dict[str, str]:
+    return {
+        "user_id": str(state.user_id),
+        "longitude": repr(state.longitude),
+        "latitude": repr(state.latitude),
+        "phase": str(state.phase),
+        "last_update_time": state.last_update_time.isoformat(),
+    }
+
+
+def _decode(value: Union[bytes, str]) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _load_state(values: Sequence[Union[bytes, str, None]]) -> Optional[RideState]:
+    strings: List[str] = []
+    for value in values:
+        if value is None:
+            return None
+        strings.append(_decode(value))
+    user_id, longitude, latitude, phase, last_update_time = strings
+    return RideState(
+        user_id=uuid.UUID(user_id),
+        longitude=float(longitude),
+        latitude=float(latitude),
+        phase=int(phase),
+        last_update_time=datetime.datetime.fromisoformat(last_update_time),
+    )
+
+
+class RideStateStore:
+    """
+    Driver position and phase of rides, stored in redis.
+
+    While a ride is in progress its hash is the source of truth: position
+    updates only mark the ride dirty, and `flush_ride_states` writes dirty
+    rides back to the `rides` table in batches. Phase changes are written to
+    the table right away as well, since matching and the schedule read it
+    from there.
+    """
+
+    def __init__(self, redis_pool: ConnectionPool = Depends(get_redis_pool)):
+        self.redis_pool = redis_pool
+
+    @staticmethod
+    def _key(ride_id: uuid.UUID) -> str:
+        return f"ride_state:{ride_id}"
+
+    async def get_many(
+        self,
+        ride_ids: Iterable[uuid.UUID],
+    ) -> Dict[uuid.UUID, RideState]:
+        """:return: the state of each ride found in redis."""
+        ride_ids = list(ride_ids)
+        if not ride_ids:
+            return {}
+        async with Redis(connection_pool=self.redis_pool) as redis:
+            async with redis.pipeline(transaction=False) as pipe:
+                for ride_id in ride_ids:
+                    pipe.hmget(self._key(ride_id), _FIELDS)
+                rows = await pipe.execute()
+        states = {}
+        for ride_id, values in zip(ride_ids, rows):
+            state = _load_state(values)
+            if state is not None:
+                states[ride_id] = state
+        return states
+
+    async def put(self, ride_id: uuid.UUID, state: RideState, dirty: bool) -> None:
+        """
+        Store the state of a ride.
+
+        :param ride_id: id of the ride.
+        :param state: its new state.
+        :param dirty: whether the row of the ride has to be updated later.
+        """
+        key = self._key(ride_id)
+        async with Redis(connection_pool=self.redis_pool) as redis:
+            async with redis.pipeline(transaction=True) as pipe:
+                pipe.hset(key, mapping=_dump_state(state))
+                pipe.expire(key, settings.ride_state_ttl)
+                if dirty:
+                    pipe.sadd(RIDE_STATE_DIRTY, str(ride_id))
+                await pipe.execute()
+
+    async def load(
+        self,
+        ride_id: uuid.UUID,
+        rides_dao: RidesDAO,
+    ) -> Optional[RideState]:
+        """
+        Get the state of a ride, from its row if redis does not have it.
+
+        :param ride_id: id of the ride.
+        :param rides_dao: DAO to read the row with.
+        :return: the state, None for a nonexistent ride.
+        """
+        states = await self.get_many([ride_id])
+        if ride_id in states:
+            return states[ride_id]
+
+        ride = await rides_dao.get_phase_position_by_id(ride_id)
+        if ride is None:
+            return None
+        driver_position: Point = wkb.loads(bytes(ride.driver_position.data))
+        state = RideState(
+            user_id=ride.user_id,
+            longitude=driver_position.x,
+            latitude=driver_position.y,
+            phase=ride.phase,
+            last_update_time=ride.last_update_time,
+        )
+        await self.put(ride_id, state, dirty=False)
+        return state
+
+    async def pop_dirty(self, count: int) -> List[uuid.UUID]:
+        """:return: up to `count` dirty rides, which are no longer dirty."""
+        async with Redis(connection_pool=self.redis_pool) as redis:
+            ride_ids = await redis.spop(RIDE_STATE_DIRTY, count)
+        return [uuid.UUID(_decode(ride_id)) for ride_id in ride_ids or []]
+
+    async def mark_dirty(self, ride_ids: Iterable[uuid.UUID]) -> None:
+        """Mark rides dirty again, e.g. after their flush failed."""
+        members = [str(ride_id) for ride_id in ride_ids]
+        if not members:
+            return
+        async with Redis(connection_pool=self.redis_pool) as redis:
+            await redis.sadd(RIDE_STATE_DIRTY, *members)
@@ -0,0 +1 @@
+"""User profile service."""
@@ -0,0 +1,73 @@
+import uuid
+from typing import Dict, Iterable, Mapping, Union
+
+from fastapi import Depends
+from prometheus_client import Counter
+from redis.asyncio import ConnectionPool, Redis
+
+from karpo_backend.services.redis.dependency import get_redis_pool
+from karpo_backend.settings import settings
+
+profile_cache_events = Counter(
+    "profile_cache_events",
+    "Lookups of cached user profiles.",
+    ["event"],
+)
+
+
+class ProfileCache:
+    """
+    What others may see of each user, as JSON, stored in redis.
+
+    Entries are dropped whenever the profile, the rating or the number of
+    rides or requests of the user changes, and expire after
+    `profile_cache_ttl` seconds in case a reader wrote one back between the
+    change and its commit.
+    """
+
+    def __init__(self, redis_pool: ConnectionPool = Depends(get_redis_pool)):
+        self.redis_pool = redis_pool
+
+    @staticmethod
+    def _key(user_id: uuid.UUID) -> str:
+        return f"profile:{user_id}"
+
+    async def get_many(self, user_ids: Iterable[uuid.UUID]) -> Dict[uuid.UUID, bytes]:
+        """
+        Look up cached profiles.
+
+        :param user_ids: ids of the users.
+        :return: the cached profile of each user found in the cache.
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        if not user_ids:
+            return {}
+        async with Redis(connection_pool=self.redis_pool) as redis:
+            values = await redis.mget([self._key(user_id) for user_id in user_ids])
+        profiles = {
+            user_id: value
+            for user_id, value in zip(user_ids, values)
+            if value is not None
+        }
+        profile_cache_events.labels("hit").inc(len(profiles))
+        profile_cache_events.labels("miss").inc(len(user_ids) - len(profiles))
+        return profiles
+
+    async def put_many(self, profiles: Mapping[uuid.UUID, Union[str, bytes]]) -> None:
+        """
+        Cache profiles.
+
+        :param profiles: the profile of each user as JSON.
+        """
+        if not profiles:
+            return
+        async with Redis(connection_pool=self.redis_pool) as redis:
+            async with redis.pipeline(transaction=False) as pipe:
+                for user_id, profile in profiles.items():
+                    pipe.set(self._key(user_id), profile, ex=settings.profile_cache_ttl)
+                await pipe.execute()
+
+    async def invalidate(self, user_id: uuid.UUID) -> None:
+        """Drop the cached profile of a user."""
+        async with Redis(connection_pool=self.redis_pool) as redis:
+            await redis.delete(self._key(user_id))
@@ -21,6 +21,13 @@ class LogLevel(str, enum.Enum):  # noqa: WPS600
     FATAL = "FATAL"
 
 
+class MatchingExecutorType(str, enum.Enum):  # noqa: WPS600
+    """Pools that can run CPU-bound matching off the event loop."""
+
+    THREAD = "thread"
+    PROCESS = "process"
+
+
 class Settings(BaseSettings):
     """
     Application settings.
@@ -56,6 +63,69 @@ class Settings(BaseSettings):
     redis_pass: Optional[str] = None
     redis_base: Optional[int] = None
 
+    # Max number of decoded routes kept by each worker
+    route_cache_size: int = 4096
+    # Meters and seconds a dropped vertex may be off the route matching uses,
+    # route_simplify_tolerance 0 keeps every vertex, route_simplify_time_tolerance 0
+    # keeps every vertex off its interpolated time
+    route_simplify_tolerance: float = 5.0
+    route_simplify_time_tolerance: float = 5.0
+    # Store every vertex in route and route_timestamps for display,
+    # otherwise they hold the simplified route too
+    route_keep_full: bool = True
+
+    # Pool used by each worker to evaluate matches.
+    # Shapely and NumPy release the GIL, so threads are usually enough.
+    # Set matching_executor_workers to 0 to evaluate on the event loop.
+    matching_executor_type: MatchingExecutorType = MatchingExecutorType.THREAD
+    matching_executor_workers: int = 2
+    # Number of candidate rides evaluated per executor call
+    matching_batch_size: int = 100
+    # Seconds to keep evaluated matches of a request after its last evaluation
+    match_memo_ttl: int = 60 * 60
+    # Matches stored for a new request, rides created later are added on top
+    matches_per_request: int = 50
+    # Seconds between runs of the batch matcher, which shares out seats among
+    # requests arriving together, 0 to disable it
+    batch_matching_interval: float = 5.0
+    # Requests created within this many seconds are matched together
+    batch_matching_window: int = 60
+    # Best candidates of each request the batch matcher chooses from
+    batch_matching_candidates: int = 10
+    # Seconds a cached user profile lives at most,
+    # it is dropped earlier whenever the user changes
+    profile_cache_ttl: int = 5 * 60
+    # Seconds between writes of driver positions kept in redis back to rides,
+    # 0 to write every position to the database right away
+    ride_state_flush_interval: float = 5.0
+    # Rides written back per statement
+    ride_state_flush_batch_size: int = 500
+    # Seconds the state of a ride stays in redis after its last update
+    ride_state_ttl: int = 60 * 60
+    # Messages waiting for a websocket client that reads slowly,
+    # the oldest are dropped beyond that
+    websocket_queue_size: int = 16
+    # Latest messages of each chat kept in its redis stream
+    chat_stream_maxlen: int = 500
+    # Seconds a chat stream stays in redis after its last message
+    chat_stream_ttl: int = 24 * 60 * 60
+    # Seconds between writes of new chat messages to the database
+    chat_flush_interval: float = 1.0
+    # Messages written per statement
+    chat_flush_batch_size: int = 500
+    # Milliseconds a chat websocket waits on its stream per read
+    chat_read_block: int = 10 * 1000
+    # Seconds between moves of join events from the database to redis
+    join_events_relay_interval: float = 0.5
+    # Join events moved per statement
+    join_events_relay_batch_size: int = 500
+    # Latest join events of each user kept in their redis stream
+    join_events_stream_maxlen: int = 100
+    # Seconds the join events of a user stay in redis after the last one
+    join_events_stream_ttl: int = 24 * 60 * 60
+    # Milliseconds a join events websocket waits on its stream per read
+    join_events_read_block: int = 10 * 1000
+
     # This variable is used to define
     # multiproc_dir. It's required for [uvi|guni]corn projects.
     prometheus_dir: Path = TEMP_DIR / "prom"
@@ -0,0 +1,164 @@
+import datetime
+import uuid
+from itertools import islice
+from typing import Any, AsyncGenerator, Callable, Iterator, List
+
+import pytest
+from geoalchemy2.shape import to_shape
+from loguru import logger
+from shapely import Point
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from karpo_backend.db.dao.requests_dao import RequestsDAO
+from karpo_backend.db.models.requests import RequestsModel
+from karpo_backend.db.models.rides import RidesModel
+from karpo_backend.db.models.users import User  # type: ignore
+from karpo_backend.matching import (
+    clip_route_by_start_time,
+    evaluate_match,
+    evaluate_matches,
+)
+from karpo_backend.route.cache import route_cache
+from karpo_backend.route.codec import encode_route_points
+from karpo_backend.settings import settings
+from karpo_backend.tests.benchmarks.utils import Stopwatch, check_baseline
+
+pytestmark = pytest.mark.benchmark
+
+SEED = 2023
+CITY_SIZES = [1_000, 10_000, 100_000]
+NUM_REQUESTS = 5
+
+CityRides = Callable[[int, int], Iterator[RidesModel]]
+CityRequest = Callable[[int, int, int], RequestsModel]
+
+
+@pytest.fixture(autouse=True)
+def _cold_matching() -> Iterator[None]:
+    """Start every benchmark with an empty route cache and no debug logs."""
+    route_cache.clear()
+    logger.disable("karpo_backend.matching")
+    yield
+    logger.enable("karpo_backend.matching")
+
+
+def batched(rides: Iterator[Any], size: int) -> Iterator[List[Any]]:
+    while True:
+        batch = list(islice(rides, size))
+        if not batch:
+            return
+        yield batch
+
+
+@pytest.mark.parametrize("num_rides", CITY_SIZES)
+def test_evaluate_match(
+    num_rides: int,
+    city_rides: CityRides,
+    city_request: CityRequest,
+) -> None:
+    requests = [city_request(SEED, i, num_rides) for i in range(NUM_REQUESTS)]
+    stopwatch = Stopwatch()
+    for i, ride in enumerate(city_rides(SEED, num_rides)):
+        req = requests[i % NUM_REQUESTS]
+        stopwatch.measure(lambda: evaluate_match(ride, req))  # noqa: B023
+
+    check_baseline(f"evaluate_match[{num_rides}]", stopwatch.summary())
+
+
+@pytest.mark.parametrize("num_rides", CITY_SIZES)
+def test_evaluate_matches(
+    num_rides: int,
+    city_rides: CityRides,
+    city_request: CityRequest,
+) -> None:
+    requests = [city_request(SEED, i, num_rides) for i in range(NUM_REQUESTS)]
+    stopwatch = Stopwatch()
+    for batch in batched(city_rides(SEED, num_rides), settings.matching_batch_size):
+        for req in requests:
+            stopwatch.measure(
+                lambda: evaluate_matches(batch, req),  # noqa: B023
+                count=len(batch),
+            )
+
+    check_baseline(f"evaluate_matches[{num_rides}]", stopwatch.summary())
+
+
+@pytest.mark.parametrize("num_rides", CITY_SIZES)
+def test_clip_route_by_start_time(num_rides: int, city_rides: CityRides) -> None:
+    stopwatch = Stopwatch()
+    for ride in city_rides(SEED, num_rides):
+        route = to_shape(ride.route)
+        ts = ride.route_timestamps
+        start_time = ts[len(ts) // 2] + datetime.timedelta(seconds=1)
+        stopwatch.measure(
+            lambda: clip_route_by_start_time(route, ts, start_time),  # noqa: B023
+        )
+
+    check_baseline(f"clip_route_by_start_time[{num_rides}]", stopwatch.summary())
+
+
+def to_rides_model(ride: RidesModel, user_id: uuid.UUID) -> RidesModel:
+    route = to_shape(ride.route)
+    origin, destination = Point(route.coords[0]).wkt, Point(route.coords[-1]).wkt
+    return RidesModel(
+        user_id=user_id,
+        label="",
+        origin=origin,
+        origin_description="",
+        destination=destination,
+        destination_description="",
+        route=route.wkt,
+        route_timestamps=ride.route_timestamps,
+        route_data=encode_route_points(route.coords, ride.route_timestamps),
+        route_start_time=ride.route_start_time,
+        route_end_time=ride.route_end_time,
+        intermediates=[],
+        intermediate_descriptions=[],
+        departure_time=ride.departure_time,
+        num_seats=ride.num_seats,
+        num_seats_left=ride.num_seats,
+        phase=ride.phase,
+        schedule=[],
+        driver_position=origin,
+        last_update_time=ride.last_update_time,
+    )
+
+
+@pytest.fixture
+async def driver(dbsession: AsyncSession) -> AsyncGenerator[User, None]:
+    user = User(
+        email="benchmark@karpo.com",
+        hashed_password="",  # noqa: S106
+        name="Benchmark",
+        is_active=True,
+        is_superuser=False,
+        is_verified=False,
+    )
+    dbsession.add(user)
+    await dbsession.flush()
+    yield user
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("num_rides", CITY_SIZES)
+async def test_get_request_matches(
+    num_rides: int,
+    city_rides: CityRides,
+    city_request: CityRequest,
+    dbsession: AsyncSession,
+    driver: User,
+) -> None:
+    for batch in batched(city_rides(SEED, num_rides), 1000):
+        dbsession.add_all([to_rides_model(ride, driver.id) for ride in batch])
+        await dbsession.flush()
+        dbsession.expunge_all()
+
+    requests_dao = RequestsDAO(dbsession)
+    stopwatch = Stopwatch()
+    for i in range(NUM_REQUESTS * 4):
+        req = city_request(SEED, i, num_rides)
+        await stopwatch.ameasure(
+            lambda: requests_dao.get_request_matches(req, 10),  # noqa: B023
+        )
+
+    check_baseline(f"get_request_matches[{num_rides}]", stopwatch.summary())
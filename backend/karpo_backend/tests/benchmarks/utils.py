@@ -0,0 +1,85 @@
+import json
+import os
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List
+
+import numpy as np
+from loguru import logger
+
+BASELINES_PATH = Path(__file__).parent / "baselines.json"
+# how much slower than its baseline a benchmark may get before failing
+TOLERANCE = float(os.environ.get("KARPO_BENCHMARK_TOLERANCE", "1.5"))
+# rewrite the baselines with the numbers of this run
+UPDATE_BASELINES = os.environ.get("KARPO_BENCHMARK_UPDATE", "") not in ("", "0")
+
+
+class Stopwatch:
+    """Collects the latency of every measured operation."""
+
+    def __init__(self) -> None:
+        self.latencies: List[float] = []
+        self.count = 0
+
+    def measure(self, operation: Callable[[], object], count: int = 1) -> None:
+        """
+        Time one call of `operation` that processes `count` items.
+
+        :param operation: the code to time.
+        :param count: number of items it processes, for throughput.
+        """
+        start = time.perf_counter()
+        operation()
+        self.latencies.append(time.perf_counter() - start)
+        self.count += count
+
+    async def ameasure(
+        self,
+        operation: Callable[[], Awaitable[object]],
+        count: int = 1,
+    ) -> None:
+        """Time one call of a coroutine function, like `measure`."""
+        start = time.perf_counter()
+        await operation()
+        self.latencies.append(time.perf_counter() - start)
+        self.count += count
+
+    def summary(self) -> Dict[str, float]:
+        latencies_ms = np.array(self.latencies) * 1000
+        p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+        return {
+            "count": self.count,
+            "throughput": self.count / (latencies_ms.sum() / 1000),
+            "p50_ms": round(float(p50), 4),
+            "p95_ms": round(float(p95), 4),
+            "p99_ms": round(float(p99), 4),
+        }
+
+
+def check_baseline(name: str, summary: Dict[str, float]) -> None:
+    """
+    Report a benchmark and compare it with its stored baseline.
+
+    A benchmark without a baseline records one. Set KARPO_BENCHMARK_UPDATE=1
+    to overwrite baselines, e.g. after an intended change in performance.
+
+    :raises AssertionError: if the median latency regressed by more than
+        KARPO_BENCHMARK_TOLERANCE times.
+    """
+    summary["throughput"] = round(summary["throughput"], 1)
+    logger.info(f"benchmark {name}: {summary}")
+    baselines: Dict[str, Dict[str, float]] = {}
+    if BASELINES_PATH.exists():
+        baselines = json.loads(BASELINES_PATH.read_text())
+    baseline = baselines.get(name)
+    if baseline is None or UPDATE_BASELINES:
+        baselines[name] = summary
+        BASELINES_PATH.write_text(
+            json.dumps(baselines, indent=2, sort_keys=True) + "\n",
+        )
+        return
+
+    assert summary["p50_ms"] <= baseline["p50_ms"] * TOLERANCE, (
+        f"{name} regressed: median {summary['p50_ms']} ms, "
+        f"baseline {baseline['p50_ms']} ms"
+    )
@@ -0,0 +1,144 @@
+import datetime
+import math
+import uuid
+from typing import Callable, Iterator, List
+
+import numpy as np
+import numpy.typing as npt
+import pytest
+from geoalchemy2.shape import from_shape
+from shapely import LineString, Point
+
+from karpo_backend.db.models.requests import RequestsModel
+from karpo_backend.db.models.rides import RidesModel
+
+# lon/lat box around Taipei
+TAIPEI_BOUNDS = (121.45, 24.98, 121.62, 25.10)
+METERS_PER_DEGREE = 111_320
+DRIVING_SPEED = 8.0  # meters per second
+TIME_BASE = datetime.datetime(2023, 12, 8, 8, tzinfo=datetime.timezone.utc)
+
+
+def _rng(seed: int, kind: int, index: int) -> np.random.Generator:
+    return np.random.default_rng([seed, kind, index])
+
+
+def _reflect(
+    values: npt.NDArray[np.float64],
+    low: float,
+    high: float,
+) -> npt.NDArray[np.float64]:
+    """Fold values back into [low, high] as if they bounced off its ends."""
+    width = high - low
+    folded = np.mod(values - low, 2 * width)
+    return low + width - np.abs(folded - width)
+
+
+def generate_route(seed: int, index: int) -> npt.NDArray[np.float64]:
+    """
+    Drive a random walk through the city.
+
+    The heading drifts a little at every vertex and sometimes turns by a
+    right angle, like a car on a street grid. Vertices are 20-60 meters
+    apart, a route has 50-300 of them and bounces off the edges of the city.
+
+    :return: lon/lat coordinates of the route.
+    """
+    rng = _rng(seed, 0, index)
+    min_lon, min_lat, max_lon, max_lat = TAIPEI_BOUNDS
+    num_steps = int(rng.integers(50, 300)) - 1
+    start = rng.uniform((min_lon, min_lat), (max_lon, max_lat))
+    turns = (rng.random(num_steps) < 0.05) * rng.choice((-1, 1), num_steps)
+    headings = rng.uniform(0, 2 * math.pi) + np.cumsum(
+        rng.normal(0, 0.1, num_steps) + turns * math.pi / 2,
+    )
+    steps = rng.uniform(20, 60, num_steps) / METERS_PER_DEGREE
+    lon_scale = math.cos(math.radians(start[1]))
+    offsets = np.cumsum(
+        np.stack(
+            (steps * np.cos(headings) / lon_scale, steps * np.sin(headings)),
+            axis=1,
+        ),
+        axis=0,
+    )
+    coords = np.concatenate(([start], start + offsets))
+    coords[:, 0] = _reflect(coords[:, 0], min_lon, max_lon)
+    coords[:, 1] = _reflect(coords[:, 1], min_lat, max_lat)
+    return coords
+
+
+def generate_ride(seed: int, index: int) -> RidesModel:
+    """
+    Generate the `index`-th ride of a city, the same for the same `seed`.
+
+    Only the columns that matching reads are set.
+    """
+    rng = _rng(seed, 1, index)
+    coords = generate_route(seed, index)
+    segment_lengths = (
+        np.hypot(*np.diff(coords, axis=0).T) * METERS_PER_DEGREE
+    )  # rough, good enough for timing
+    offsets = np.concatenate(([0], np.cumsum(segment_lengths / DRIVING_SPEED)))
+    departure_time = TIME_BASE + datetime.timedelta(seconds=rng.uniform(0, 4 * 3600))
+    route_timestamps: List[datetime.datetime] = [
+        departure_time + datetime.timedelta(seconds=offset) for offset in offsets
+    ]
+    return RidesModel(
+        id=uuid.UUID(bytes=rng.bytes(16), version=4),
+        route=from_shape(LineString(coords), srid=4326),
+        route_timestamps=route_timestamps,
+        route_start_time=route_timestamps[0],
+        route_end_time=route_timestamps[-1],
+        departure_time=departure_time,
+        num_seats=int(rng.integers(1, 5)),
+        phase=-1,
+        last_update_time=departure_time,
+    )
+
+
+def generate_request(seed: int, index: int, num_rides: int) -> RequestsModel:
+    """
+    Generate the `index`-th request of a city with `num_rides` rides.
+
+    Origin and destination are a few hundred meters off two points along a
+    random ride, and the passenger is ready a few minutes before that ride
+    passes by, so most requests have some matches.
+
+    Only the columns that matching reads are set.
+    """
+    rng = _rng(seed, 2, index)
+    ride_index = int(rng.integers(num_rides))
+    ride = generate_ride(seed, ride_index)
+    coords = generate_route(seed, ride_index)
+    pick_up, drop_off = sorted(rng.choice(len(coords), size=2, replace=False))
+    origin, destination = coords[[pick_up, drop_off]] + rng.normal(
+        0,
+        200 / METERS_PER_DEGREE,
+        size=(2, 2),
+    )
+    start_time = ride.route_timestamps[pick_up] - datetime.timedelta(
+        seconds=rng.uniform(0, 15 * 60),
+    )
+    return RequestsModel(
+        id=uuid.UUID(bytes=rng.bytes(16), version=4),
+        origin=Point(origin).wkt,
+        destination=Point(destination).wkt,
+        num_passengers=1,
+        start_time=start_time,
+    )
+
+
+def iter_rides(seed: int, num_rides: int) -> Iterator[RidesModel]:
+    """Generate the rides of a city one by one, to keep big cities out of memory."""
+    for index in range(num_rides):
+        yield generate_ride(seed, index)
+
+
+@pytest.fixture
+def city_rides() -> Callable[[int, int], Iterator[RidesModel]]:
+    return iter_rides
+
+
+@pytest.fixture
+def city_request() -> Callable[[int, int, int], RequestsModel]:
+    return generate_request
@@ -0,0 +1,38 @@
+import asyncio
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from redis.asyncio import ConnectionPool
+
+from karpo_backend.services.chat.streams import ChatStreams
+
+
+@pytest.mark.anyio
+async def test_chat_streams(fake_redis_pool: ConnectionPool) -> None:
+    streams = ChatStreams(fake_redis_pool)
+    join_id, user_id = uuid.uuid4(), uuid.uuid4()
+    assert await streams.last_id(join_id) == "0"
+
+    first = await streams.post(join_id, user_id, "hi", datetime(2023, 12, 8, 2, 56))
+    assert first.created_at.tzinfo == timezone.utc
+    last_id = await streams.last_id(join_id)
+
+    reading = asyncio.ensure_future(streams.read(join_id, last_id, block=1000))
+    await asyncio.sleep(0.01)
+    second = await streams.post(
+        join_id, user_id, "on my way", datetime.now(timezone.utc)
+    )
+    [(_, read)] = await reading
+    assert read == second
+    assert await streams.get_recent(join_id) == [first, second]
+    assert await streams.get_recent(uuid.uuid4()) == []
+
+    taken = await streams.read_outbox("worker-1", 10)
+    assert [message for _, message in taken] == [first, second]
+    assert await streams.read_outbox("worker-2", 10) == []
+    retaken = await streams.read_outbox("worker-2", 10, min_idle_time=0)
+    assert [entry_id for entry_id, _ in retaken] == [entry_id for entry_id, _ in taken]
+
+    await streams.ack_outbox([entry_id for entry_id, _ in retaken])
+    assert await streams.read_outbox("worker-2", 10, min_idle_time=0) == []
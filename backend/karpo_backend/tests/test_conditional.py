@@ -0,0 +1,62 @@
+import datetime
+from typing import Dict
+
+from starlette.requests import Request
+
+from karpo_backend.web.api.conditional import cache_headers, is_not_modified, weak_etag
+
+LAST_UPDATE_TIME = datetime.datetime.fromisoformat("2023-12-08T02:56:30.250+00:00")
+
+
+def _request(headers: Dict[str, str]) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "headers": [
+                (key.lower().encode(), value.encode()) for key, value in headers.items()
+            ],
+        },
+    )
+
+
+def test_weak_etag() -> None:
+    etag = weak_etag(LAST_UPDATE_TIME)
+    assert etag.startswith('W/"')
+    assert etag == weak_etag(LAST_UPDATE_TIME)
+    assert etag != weak_etag(LAST_UPDATE_TIME + datetime.timedelta(microseconds=1))
+
+
+def test_is_not_modified() -> None:
+    etag = weak_etag(LAST_UPDATE_TIME)
+    headers = cache_headers(etag, LAST_UPDATE_TIME)
+    assert headers["Last-Modified"] == "Fri, 08 Dec 2023 02:56:30 GMT"
+
+    assert not is_not_modified(_request({}), etag, LAST_UPDATE_TIME)
+    assert is_not_modified(_request({"If-None-Match": etag}), etag, LAST_UPDATE_TIME)
+    assert is_not_modified(
+        _request({"If-None-Match": f'"x", {etag[2:]}'}),
+        etag,
+        LAST_UPDATE_TIME,
+    )
+    assert is_not_modified(_request({"If-None-Match": "*"}), etag, LAST_UPDATE_TIME)
+    assert not is_not_modified(
+        _request({"If-None-Match": 'W/"x"'}),
+        etag,
+        LAST_UPDATE_TIME,
+    )
+
+    since = {"If-Modified-Since": headers["Last-Modified"]}
+    assert is_not_modified(_request(since), etag, LAST_UPDATE_TIME)
+    later = LAST_UPDATE_TIME + datetime.timedelta(seconds=1)
+    assert not is_not_modified(_request(since), weak_etag(later), later)
+    assert not is_not_modified(
+        _request({**since, "If-None-Match": 'W/"x"'}),
+        etag,
+        LAST_UPDATE_TIME,
+    )
+    assert not is_not_modified(
+        _request({"If-Modified-Since": "yesterday"}),
+        etag,
+        LAST_UPDATE_TIME,
+    )
@@ -0,0 +1,41 @@
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from redis.asyncio import ConnectionPool
+
+from karpo_backend.services.joins.events import JoinEvent, JoinEventStreams
+
+
+def _event(join_id: uuid.UUID, event: str) -> JoinEvent:
+    return JoinEvent(
+        id=uuid.uuid4(),
+        join_id=join_id,
+        ride_id=uuid.uuid4(),
+        request_id=uuid.uuid4(),
+        event=event,
+        created_at=datetime.now(timezone.utc),
+    )
+
+
+@pytest.mark.anyio
+async def test_join_event_streams(fake_redis_pool: ConnectionPool) -> None:
+    streams = JoinEventStreams(fake_redis_pool)
+    driver_id, passenger_id, other_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    join_id = uuid.uuid4()
+    assert await streams.last_id(driver_id) == "0"
+
+    created = _event(join_id, "created")
+    await streams.publish([((driver_id, passenger_id), created)])
+    last_id = await streams.last_id(passenger_id)
+
+    accepted, canceled = _event(join_id, "accepted"), _event(uuid.uuid4(), "canceled")
+    await streams.publish(
+        [((driver_id, passenger_id), accepted), ((driver_id, other_id), canceled)],
+    )
+    driver_events = await streams.read(driver_id, "0")
+    assert [event for _, event in driver_events] == [created, accepted, canceled]
+    [(stream_id, event)] = await streams.read(passenger_id, last_id)
+    assert event == accepted
+    assert await streams.read(passenger_id, stream_id) == []
+    assert [event for _, event in await streams.read(other_id, "0")] == [canceled]
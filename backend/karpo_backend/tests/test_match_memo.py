@@ -0,0 +1,53 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+import pytest
+from redis.asyncio import ConnectionPool
+from shapely import Point
+
+from karpo_backend.db.models.requests import RequestsModel
+from karpo_backend.matching import Match, RejectReason, judge_matches
+from karpo_backend.services.matching import memo as memo_module
+from karpo_backend.services.matching.memo import MatchMemo
+from karpo_backend.tests.test_matching import make_ride
+
+
+@pytest.mark.anyio
+async def test_match_memo(
+    fake_redis_pool: ConnectionPool,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    time_base = datetime(year=2023, month=1, day=1, tzinfo=timezone.utc)
+    ts = [time_base + timedelta(minutes=m) for m in range(5)]
+    along = make_ride([(0, 0), (0.001, 0), (0.002, 0), (0.003, 0), (0.004, 0)], ts)
+    far_away = make_ride([(1, 1), (1.001, 1), (1.002, 1), (1.003, 1), (1.004, 1)], ts)
+    req = RequestsModel(
+        id=uuid.uuid4(),
+        origin=Point(0.0011, 0.0001).wkt,
+        destination=Point(0.0035, -0.0001).wkt,
+        start_time=time_base + timedelta(seconds=30),
+    )
+
+    evaluated: List[uuid.UUID] = []
+
+    async def judge_matches_inline(executor, rides, req):  # type: ignore
+        evaluated.extend(ride.id for ride in rides)
+        return judge_matches(rides, req)
+
+    monkeypatch.setattr(memo_module, "judge_matches_in_executor", judge_matches_inline)
+    memo = MatchMemo(fake_redis_pool)
+
+    first = await memo.evaluate_matches(None, [along, far_away], req)
+    assert isinstance(first[0], Match)
+    assert first[1] is None
+    assert evaluated == [along.id, far_away.id]
+
+    second = await memo.evaluate_matches(None, [along, far_away], req)
+    assert second == first
+    assert evaluated == [along.id, far_away.id]
+    assert await memo.get_judgements(req.id, [far_away]) == [RejectReason.LONG_WALK]
+
+    along.last_update_time += timedelta(seconds=1)
+    assert await memo.evaluate_matches(None, [along, far_away], req) == first
+    assert evaluated == [along.id, far_away.id, along.id]
@@ -1,14 +1,26 @@
 import math
-from datetime import datetime, timedelta
-from typing import List, Tuple
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List, Sequence, Tuple
 
 import pytest
+from geoalchemy2.shape import from_shape
 from shapely import LineString, Point
 
+from karpo_backend.db.models.requests import RequestsModel
+from karpo_backend.db.models.rides import RidesModel
 from karpo_backend.matching import (
+    CandidateRide,
+    RejectReason,
     clip_route_by_start_time,
+    evaluate_match,
+    evaluate_matches,
+    evaluate_requests,
     find_point_idx_on_linestring,
+    judge_matches,
+    travel_time_lower_bound,
 )
+from karpo_backend.route.codec import encode_route_points
 
 
 @pytest.mark.parametrize(
@@ -82,3 +94,124 @@ def test_find_point_idx_on_linestring(
     l: LineString = LineString(line)
     idx = find_point_idx_on_linestring(p, l)
     assert idx == ans_idx
+
+
+def make_ride(
+    route: Sequence[Tuple[float, float]],
+    ts: List[datetime],
+) -> RidesModel:
+    return RidesModel(
+        id=uuid.uuid4(),
+        route=from_shape(LineString(route), srid=4326),
+        route_timestamps=ts,
+        last_update_time=ts[0],
+    )
+
+
+def test_evaluate_matches() -> None:
+    time_base = datetime(year=2023, month=1, day=1, tzinfo=timezone.utc)
+    ts = [time_base + timedelta(minutes=m) for m in range(5)]
+    along = make_ride([(0, 0), (0.001, 0), (0.002, 0), (0.003, 0), (0.004, 0)], ts)
+    far_away = make_ride([(1, 1), (1.001, 1), (1.002, 1), (1.003, 1), (1.004, 1)], ts)
+    backwards = make_ride([(0.004, 0), (0.003, 0), (0.002, 0), (0.001, 0), (0, 0)], ts)
+    finished = make_ride(
+        [(0, 0), (0.004, 0)],
+        [time_base - timedelta(minutes=10), time_base - timedelta(minutes=1)],
+    )
+    req = RequestsModel(
+        id=uuid.uuid4(),
+        origin=Point(0.0011, 0.0001).wkt,
+        destination=Point(0.0035, -0.0001).wkt,
+        start_time=time_base + timedelta(seconds=30),
+    )
+
+    rides = [along, far_away, finished, backwards]
+    matches = evaluate_matches(rides, req)
+    assert [m is not None for m in matches] == [True, False, False, False]
+    for ride, match in zip(rides, matches):
+        assert match == evaluate_match(ride, req)
+    assert judge_matches(rides, req)[1:] == [
+        RejectReason.LONG_WALK,
+        RejectReason.FINISHED,
+        RejectReason.WRONG_WAY,
+    ]
+
+    match = matches[0]
+    assert match is not None
+    assert match.pick_up_location.equals_exact(Point(0.0011, 0), 1e-9)
+    assert match.drop_off_location.equals_exact(Point(0.0035, 0), 1e-9)
+    assert match.pick_up_time == ts[1]
+    assert match.drop_off_time == ts[4]
+    assert math.isclose(match.pick_up_distance, 11.06, abs_tol=0.1)
+    assert match.fare == 50
+
+
+def test_evaluate_requests() -> None:
+    time_base = datetime(year=2023, month=1, day=1, tzinfo=timezone.utc)
+    ts = [time_base + timedelta(minutes=m) for m in range(5)]
+    ride = make_ride([(0, 0), (0.001, 0), (0.002, 0), (0.003, 0), (0.004, 0)], ts)
+
+    def make_request(
+        origin_x: float, destination_x: float, start: float
+    ) -> RequestsModel:
+        return RequestsModel(
+            id=uuid.uuid4(),
+            origin=Point(origin_x, 0.0001).wkt,
+            destination=Point(destination_x, -0.0001).wkt,
+            start_time=time_base + timedelta(seconds=start),
+        )
+
+    reqs = [
+        make_request(0.0011, 0.0035, 30),
+        make_request(0.0035, 0.0011, 30),  # wrong way
+        make_request(0.0031, 0.0039, 150),  # starts mid-route
+        make_request(0.0011, 0.0035, 600),  # after the ride ends
+        make_request(0.0021, 0.0001, 0),  # wrong way
+        make_request(0.0011, 0.0021, 0),
+    ]
+    matches = evaluate_requests(ride, reqs)
+    assert [m is not None for m in matches] == [True, False, True, False, False, True]
+    assert matches == [evaluate_match(ride, req) for req in reqs]
+    assert evaluate_requests(ride, []) == []
+
+
+def test_travel_time_lower_bound() -> None:
+    time_base = datetime(year=2023, month=1, day=1, tzinfo=timezone.utc)
+    ts = [time_base + timedelta(minutes=10 * m) for m in range(5)]
+    ride = make_ride([(0, 0), (0.001, 0), (0.002, 0), (0.003, 0), (0.004, 0)], ts)
+    req = RequestsModel(
+        id=uuid.uuid4(),
+        origin=Point(0.0015, 0.002).wkt,
+        destination=Point(0.0035, -0.002).wkt,
+        start_time=time_base,
+    )
+
+    (match,) = evaluate_matches([ride], req)
+    assert match is not None
+    walking_distance = match.pick_up_distance + match.drop_off_distance
+    assert 0 < travel_time_lower_bound(walking_distance) <= match.estimated_travel_time
+    assert travel_time_lower_bound(0) == 0
+
+
+def test_evaluate_candidate_rides() -> None:
+    time_base = datetime(year=2023, month=1, day=1, tzinfo=timezone.utc)
+    ts = [time_base + timedelta(minutes=m) for m in range(5)]
+    route = [(0, 0), (0.001, 0), (0.002, 0), (0.003, 0), (0.004, 0)]
+    ride = make_ride(route, ts)
+    candidate = CandidateRide(
+        id=uuid.uuid4(),
+        user_id=uuid.uuid4(),
+        route_data=encode_route_points(route, ts),
+        last_update_time=ts[0],
+        num_seats=3,
+        num_seats_left=3,
+    )
+    req = RequestsModel(
+        id=uuid.uuid4(),
+        origin=Point(0.0011, 0.0001).wkt,
+        destination=Point(0.0035, -0.0001).wkt,
+        start_time=time_base + timedelta(seconds=30),
+    )
+    assert evaluate_matches([candidate], req) == evaluate_matches([ride], req)
+    with pytest.raises(AttributeError):
+        candidate.route = None  # type: ignore[attr-defined]
@@ -0,0 +1,35 @@
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from redis.asyncio import ConnectionPool, Redis
+
+from karpo_backend.services.users.profile_cache import ProfileCache
+from karpo_backend.settings import settings
+from karpo_backend.web.api.users.schema import UserInfoForOthersDTO
+
+
+@pytest.mark.anyio
+async def test_profile_cache(fake_redis_pool: ConnectionPool) -> None:
+    cache = ProfileCache(fake_redis_pool)
+    info = UserInfoForOthersDTO(
+        id=uuid.uuid4(),
+        name="TestUser",
+        rating=4.5,
+        created_at=datetime(year=2023, month=1, day=1, tzinfo=timezone.utc),
+        num_requests=3,
+        num_rides=1,
+    )
+    unknown_id = uuid.uuid4()
+
+    assert await cache.get_many([info.id, unknown_id]) == {}
+    await cache.put_many({info.id: info.model_dump_json()})
+
+    cached = await cache.get_many([info.id, unknown_id, info.id])
+    assert list(cached) == [info.id]
+    assert UserInfoForOthersDTO.model_validate_json(cached[info.id]) == info
+    async with Redis(connection_pool=fake_redis_pool) as redis:
+        assert 0 < await redis.ttl(f"profile:{info.id}") <= settings.profile_cache_ttl
+
+    await cache.invalidate(info.id)
+    assert await cache.get_many([info.id]) == {}
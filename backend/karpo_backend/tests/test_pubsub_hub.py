@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+from redis.asyncio import ConnectionPool, Redis
+
+from karpo_backend.services.redis.pubsub import PubSubHub, Subscription
+
+
+def test_subscription_drops_oldest() -> None:
+    subscription = Subscription(maxsize=2)
+    for message in ("a", "b", "c"):
+        subscription.push(message)
+    assert asyncio.run(subscription.get()) == "b"
+
+
+@pytest.mark.anyio
+async def test_pubsub_hub(fake_redis_pool: ConnectionPool) -> None:
+    hub = PubSubHub(fake_redis_pool)
+    try:
+        async with hub.subscribe("ride_status:1", maxsize=4) as first:
+            async with hub.subscribe("ride_status:1", maxsize=4) as second:
+                async with Redis(connection_pool=fake_redis_pool) as redis:
+                    assert await redis.pubsub_numsub("ride_status:1") == [
+                        ("ride_status:1", 1),
+                    ]
+                await hub.publish("ride_status:1", "moved")
+                await hub.publish("ride_status:2", "elsewhere")
+                assert await asyncio.wait_for(first.get(), 1) == "moved"
+                assert await asyncio.wait_for(second.get(), 1) == "moved"
+
+        async with Redis(connection_pool=fake_redis_pool) as redis:
+            assert await redis.pubsub_numsub("ride_status:1") == [("ride_status:1", 0)]
+    finally:
+        await hub.close()
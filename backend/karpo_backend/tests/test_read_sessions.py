@@ -0,0 +1,38 @@
+import asyncio
+from typing import Any, List
+
+import pytest
+
+from karpo_backend.db.dependencies import ReadSessions
+
+
+class FakeSession:
+    def __init__(self, opened: List["FakeSession"]):
+        self.closed = False
+        opened.append(self)
+
+    async def __aenter__(self) -> "FakeSession":
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        self.closed = True
+
+
+@pytest.mark.anyio
+async def test_read_sessions_gather() -> None:
+    opened: List[FakeSession] = []
+    running = 0
+    max_running = 0
+
+    async def query(session: Any) -> int:
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return opened.index(session)
+
+    read_sessions = ReadSessions(lambda: FakeSession(opened))  # type: ignore
+    assert await read_sessions.gather(query, query, query) == [0, 1, 2]
+    assert max_running == 3
+    assert all(session.closed for session in opened)
@@ -1,7 +1,7 @@
 import datetime
 import math
 import uuid
-from typing import Tuple
+from typing import Any, Dict, Tuple
 
 import pytest
 from fastapi import FastAPI, status
@@ -166,6 +166,55 @@ async def test_get_request_forbidden(
     assert resp.status_code == status.HTTP_403_FORBIDDEN
 
 
+@pytest.mark.anyio
+async def test_get_matches_of_later_ride(
+    fastapi_app: FastAPI,
+    client_test: AsyncClient,
+    client_test0: AsyncClient,
+    request_data_1: Dict[str, Any],
+    ride_data_1: Dict[str, Any],
+) -> None:
+    resp = await client_test.post(
+        fastapi_app.url_path_for("post_requests"),
+        json=request_data_1,
+    )
+    assert resp.status_code == status.HTTP_200_OK
+    post_requests_resp_obj = PostRequestsResponse.model_validate(resp.json())
+    assert post_requests_resp_obj.matches == []
+
+    # the ride is matched against the waiting request when it is created
+    resp = await client_test0.post(
+        fastapi_app.url_path_for("post_rides"),
+        json=ride_data_1,
+    )
+    assert resp.status_code == status.HTTP_200_OK
+    ride_id = PostRidesResponse.model_validate(resp.json()).ride_id
+
+    get_match_url = fastapi_app.url_path_for(
+        "get_request_id_matches",
+        request_id=post_requests_resp_obj.request_id,
+    )
+    resp = await client_test.get(get_match_url)
+    assert resp.status_code == status.HTTP_200_OK
+    get_match_resp_obj = GetRequestIdMatchesResponse.model_validate(resp.json())
+    assert [match.ride_id for match in get_match_resp_obj.matches] == [ride_id]
+
+    # a departed ride is no longer a match
+    resp = await client_test0.patch(
+        fastapi_app.url_path_for("patch_ride_id_status", ride_id=ride_id),
+        json={
+            "driver_position": {"latitude": 0.001, "longitude": 0},
+            "phase": 0,
+        },
+    )
+    assert resp.status_code == status.HTTP_200_OK
+
+    resp = await client_test.get(get_match_url)
+    assert resp.status_code == status.HTTP_200_OK
+    get_match_resp_obj = GetRequestIdMatchesResponse.model_validate(resp.json())
+    assert get_match_resp_obj.matches == []
+
+
 @pytest.mark.anyio
 @pytest.mark.parametrize(
     ["req_start_time", "req_origin", "matched"],
@@ -0,0 +1,40 @@
+import uuid
+from datetime import datetime
+
+import pytest
+from redis.asyncio import ConnectionPool
+
+from karpo_backend.services.rides.state import RideState, RideStateStore
+
+
+@pytest.mark.anyio
+async def test_ride_state_store(fake_redis_pool: ConnectionPool) -> None:
+    store = RideStateStore(fake_redis_pool)
+    ride_id, unknown_id = uuid.uuid4(), uuid.uuid4()
+    state = RideState(
+        user_id=uuid.uuid4(),
+        longitude=121.5654,
+        latitude=25.033,
+        phase=-1,
+        last_update_time=datetime(2023, 12, 8, 2, 56, 46, 252000),
+    )
+
+    await store.put(ride_id, state, dirty=False)
+    assert await store.get_many([ride_id, unknown_id]) == {ride_id: state}
+    assert await store.pop_dirty(10) == []
+
+    moved = RideState(
+        user_id=state.user_id,
+        longitude=121.5655,
+        latitude=25.0331,
+        phase=-1,
+        last_update_time=datetime(2023, 12, 8, 2, 56, 51),
+    )
+    await store.put(ride_id, moved, dirty=True)
+    await store.put(ride_id, moved, dirty=True)
+    assert await store.get_many([ride_id]) == {ride_id: moved}
+    assert await store.pop_dirty(10) == [ride_id]
+    assert await store.pop_dirty(10) == []
+
+    await store.mark_dirty([ride_id])
+    assert await store.pop_dirty(10) == [ride_id]
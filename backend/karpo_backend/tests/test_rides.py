@@ -777,6 +777,43 @@ async def test_post_and_get_chatroom_messages(
     ].time >= datetime.datetime.fromisoformat(from_time)
 
 
+@pytest.mark.anyio
+async def test_post_chatroom_messages_outsider(
+    ride_data_1: Dict[str, Any],
+    request_data_1: Dict[str, Any],
+    fastapi_app: FastAPI,
+    client_test0: AsyncClient,
+    client_test: AsyncClient,
+    client_test1: AsyncClient,
+) -> None:
+    """Tests that only the driver and the passenger of a join can chat."""
+    join_id = await test_post_joins_and_do_action(
+        ride_data_1, request_data_1, "accept", fastapi_app, client_test0, client_test
+    )
+    if join_id is None:
+        pytest.fail("invalid test case, request_data_1 should match ride_data_1")
+
+    resp = await client_test1.get(url="/api/users/me")
+    assert resp.status_code == status.HTTP_200_OK
+    chat_record = {
+        "user_id": resp.json()["id"],
+        "content": "hi",
+        "time": "2023-12-08T02:55:00.000Z",
+    }
+
+    for post_join_id, status_code in [
+        (join_id, status.HTTP_403_FORBIDDEN),
+        (uuid.uuid4(), status.HTTP_404_NOT_FOUND),
+    ]:
+        resp = await client_test1.post(
+            url=fastapi_app.url_path_for(
+                "post_chatroom_messages", join_id=post_join_id
+            ),
+            json={"chat_record": chat_record},
+        )
+        assert resp.status_code == status_code
+
+
 @pytest.mark.anyio
 @pytest.mark.parametrize(
     "ratings",
@@ -0,0 +1,73 @@
+from typing import List, Sequence, Tuple
+
+import numpy as np
+import pytest
+
+from karpo_backend.route.builder import build_route
+
+
+def test_build_route() -> None:
+    steps = [
+        [(121.5, 25.0), (121.501, 25.0)],
+        [(121.501, 25.0), (121.501, 25.001), (121.501, 25.003)],
+    ]
+    coords, offsets = build_route(steps, [30, 90])
+    assert coords.tolist() == [
+        [121.5, 25.0],
+        [121.501, 25.0],
+        [121.501, 25.001],
+        [121.501, 25.003],
+    ]
+    assert offsets == pytest.approx([0, 30, 60, 120])
+
+
+def test_build_route_geodesic_lengths() -> None:
+    # at 25 degrees north a degree of longitude is shorter than one of latitude
+    steps = [[(121.5, 25.0), (121.501, 25.0), (121.501, 25.001)]]
+    _, offsets = build_route(steps, [100])
+    assert offsets[1] == pytest.approx(100 * 100.9 / (100.9 + 110.8), abs=0.1)
+    assert offsets[2] == pytest.approx(100)
+
+
+def test_build_route_standing_step() -> None:
+    steps = [
+        [(121.5, 25.0), (121.5, 25.0), (121.5, 25.0)],
+        [(121.5, 25.0), (121.6, 25.0)],
+    ]
+    _, offsets = build_route(steps, [10, 20])
+    assert offsets == pytest.approx([0, 5, 10, 30])
+
+
+@pytest.mark.parametrize(
+    ["steps", "durations"],
+    [
+        ([[(0, 0), (0, 1)]], [1, 2]),
+        ([], []),
+        ([[(0, 0)]], [1]),
+        ([[(0, 0), (0, 1)]], [-1]),
+    ],
+)
+def test_build_route_invalid(
+    steps: Sequence[Sequence[Tuple[float, float]]],
+    durations: Sequence[float],
+) -> None:
+    with pytest.raises(ValueError):
+        build_route(steps, durations)
+
+
+def test_build_route_matches_step_durations() -> None:
+    rng = np.random.default_rng(0)
+    point = np.array([121.5, 25.0])
+    steps: List[List[Tuple[float, float]]] = []
+    for _ in range(50):
+        size = int(rng.integers(2, 30))
+        step = point + np.cumsum(rng.normal(0, 1e-4, (size, 2)), axis=0)
+        step[0] = point
+        steps.append(step.tolist())
+        point = step[-1]
+    durations = rng.integers(1, 100, len(steps))
+    _, offsets = build_route(steps, durations.tolist())
+
+    ends = np.cumsum([len(step) - 1 for step in steps])
+    assert offsets[ends] == pytest.approx(np.cumsum(durations))
+    assert np.all(np.diff(offsets) >= 0)
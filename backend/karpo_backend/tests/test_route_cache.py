@@ -0,0 +1,48 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from geoalchemy2.shape import from_shape
+from shapely import LineString
+
+from karpo_backend.route.cache import RouteCache
+
+
+def make_ride(last_update_time: datetime) -> SimpleNamespace:
+    time_base = datetime(year=2023, month=1, day=1, tzinfo=timezone.utc)
+    return SimpleNamespace(
+        id=uuid.uuid4(),
+        route=from_shape(LineString([(0, 0), (1, 0), (1, 1)]), srid=4326),
+        route_timestamps=[time_base + timedelta(seconds=s) for s in range(3)],
+        last_update_time=last_update_time,
+    )
+
+
+def test_route_cache_hit_and_invalidation() -> None:
+    cache = RouteCache(maxsize=2)
+    ride = make_ride(datetime(year=2023, month=1, day=1))
+
+    route = cache.get(ride)
+    assert route.points == [(0, 0), (1, 0), (1, 1)]
+    assert list(route.timeline.epochs - route.timeline.epochs[0]) == [0, 1, 2]
+    assert cache.get(ride) is route
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    ride.last_update_time += timedelta(seconds=1)
+    assert cache.get(ride) is not route
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_route_cache_eviction() -> None:
+    cache = RouteCache(maxsize=2)
+    rides = [make_ride(datetime(year=2023, month=1, day=1)) for _ in range(3)]
+    for ride in rides:
+        cache.get(ride)
+    cache.get(rides[1])
+
+    assert len(cache) == 2
+    assert cache.evictions == 1
+    assert cache.hits == 1
+
+    cache.get(rides[0])
+    assert cache.misses == 4
@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from karpo_backend.route.cache import decode_route
+from karpo_backend.route.codec import (
+    decode_route_data,
+    encode_route,
+    encode_route_points,
+)
+
+
+def test_encode_decode_route() -> None:
+    rng = np.random.default_rng(0)
+    coords = np.cumsum(rng.normal(0, 1e-3, (200, 2)), axis=0) + (121.5, 25.0)
+    epochs = 1.7e9 + np.cumsum(rng.uniform(0, 10, 200))
+    data = encode_route(coords, epochs)
+
+    assert len(data) == 16 + 200 * 12
+    decoded_coords, decoded_epochs = decode_route_data(data)
+    assert np.abs(decoded_coords - coords).max() <= 0.5e-6
+    assert np.abs(decoded_epochs - epochs).max() <= 0.5e-3
+
+
+def test_decode_route_prefers_route_data() -> None:
+    time_base = datetime(year=2023, month=1, day=1, tzinfo=timezone.utc)
+    ride = SimpleNamespace(
+        route_data=encode_route_points(
+            [(121.5, 25.0), (121.501, 25.0), (121.501, 25.002)],
+            [time_base + timedelta(seconds=s) for s in (0, 1.5, 3)],
+        ),
+        last_update_time=time_base,
+    )
+    route = decode_route(ride)
+    assert route.points == [(121.5, 25.0), (121.501, 25.0), (121.501, 25.002)]
+    assert route.timestamps == [time_base + timedelta(seconds=s) for s in (0, 1.5, 3)]
+    assert route.line.length == pytest.approx(0.003)
+
+
+def test_decode_route_data_rejects_garbage() -> None:
+    data = encode_route([(0, 0), (1, 1)], [0, 1])
+    with pytest.raises(ValueError):
+        decode_route_data(data[:-1])
+    with pytest.raises(ValueError):
+        decode_route_data(b"not a route at all")
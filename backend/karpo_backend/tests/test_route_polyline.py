@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import numpy as np
+import pytest
+from starlette.responses import Response
+
+from karpo_backend.route.polyline import decode_polyline, encode_polyline
+from karpo_backend.web.api.utils import (
+    EncodedRouteDTO,
+    RouteDTO,
+    RouteFormat,
+    get_route_format,
+)
+
+
+def test_encode_polyline() -> None:
+    # the example of Google's documentation of the format
+    coords = np.array([(-120.2, 38.5), (-120.95, 40.7), (-126.453, 43.252)])
+    assert encode_polyline(coords) == "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+    assert np.allclose(decode_polyline("_p~iF~ps|U_ulLnnqC_mqNvxq`@"), coords)
+    assert encode_polyline(np.empty((0, 2))) == ""
+
+    rng = np.random.default_rng(0)
+    coords = np.cumsum(rng.normal(0, 1e-3, (500, 2)), axis=0) + (121.5, 25.0)
+    assert np.abs(decode_polyline(encode_polyline(coords)) - coords).max() <= 0.5e-5
+    with pytest.raises(ValueError):
+        decode_polyline("_p~iF")
+
+
+def test_encoded_route_dto() -> None:
+    time_base = datetime(year=2023, month=1, day=1, tzinfo=timezone.utc)
+    route = RouteDTO(
+        route=[(121.5, 25.0), (121.501, 25.0), (121.501, 25.002)],
+        timestamps=[time_base + timedelta(seconds=s) for s in (0, 1.4, 3.2)],
+    )
+    encoded = EncodedRouteDTO.from_coords_and_epochs(
+        np.array(route.route),
+        np.array([t.timestamp() for t in route.timestamps]),
+    )
+    assert encoded.start_time == time_base
+    assert encoded.time_deltas == [0, 1, 2]
+    assert np.allclose(decode_polyline(encoded.polyline), route.route)
+    assert len(encoded.model_dump_json()) < len(route.model_dump_json())
+
+
+@pytest.mark.parametrize(
+    "query, accept, route_format",
+    [
+        (None, None, "full"),
+        (None, "application/json", "full"),
+        (None, "application/json; route=polyline", "polyline"),
+        (None, 'text/html, application/json;q=0.9;route="polyline"', "polyline"),
+        ("full", "application/json; route=polyline", "full"),
+    ],
+)
+def test_get_route_format(
+    query: Optional[RouteFormat],
+    accept: Optional[str],
+    route_format: RouteFormat,
+) -> None:
+    response = Response()
+    assert get_route_format(response, query, accept) == route_format
+    assert response.headers["Vary"] == "Accept"
@@ -0,0 +1,52 @@
+import numpy as np
+
+from karpo_backend.route.simplify import simplify_route
+
+
+def test_simplify_straight_route() -> None:
+    coords = np.column_stack((np.linspace(121.5, 121.51, 101), np.full(101, 25.0)))
+    epochs = np.linspace(0, 100, 101)
+    assert simplify_route(coords, epochs, 5, 5).tolist() == [0, 100]
+
+
+def test_simplify_keeps_corners_and_stops() -> None:
+    coords = np.array(
+        [
+            (121.5, 25.0),
+            (121.501, 25.0),
+            (121.502, 25.0),
+            (121.502, 25.001),
+            (121.502, 25.002),
+        ],
+    )
+    # the driver waits at the second vertex
+    epochs = np.array([0, 10, 80, 90, 100], dtype=float)
+    assert simplify_route(coords, epochs, 5, 5).tolist() == [0, 1, 2, 4]
+    assert simplify_route(coords, epochs, 5, 1000).tolist() == [0, 2, 4]
+
+
+def test_simplify_zero_tolerance() -> None:
+    # the second vertex is a meter off the line, the driver waits at it
+    coords = np.array([(121.5, 25.0), (121.501, 25.00001), (121.502, 25.0)])
+    epochs = np.array([0, 80, 90], dtype=float)
+    assert simplify_route(coords, epochs, 5, 1000).tolist() == [0, 2]
+    assert simplify_route(coords, epochs, 0, 1000).tolist() == [0, 1, 2]
+    assert simplify_route(coords, epochs, 5, 0).tolist() == [0, 1, 2]
+
+
+def test_simplify_error_within_tolerance() -> None:
+    rng = np.random.default_rng(0)
+    coords = np.cumsum(rng.normal(0, 2e-5, (2000, 2)), axis=0) + (121.5, 25.0)
+    epochs = np.cumsum(rng.uniform(0, 3, 2000))
+    kept = simplify_route(coords, epochs, 5, 5)
+    assert len(kept) < len(coords) / 2
+    assert np.all(np.diff(epochs[kept]) >= 0)
+
+    # every dropped vertex is near its simplified segment
+    meters = (coords - coords[0]) * (111_320 * np.cos(np.radians(25)), 111_320)
+    for first, last in zip(kept[:-1], kept[1:]):
+        start, delta = meters[first], meters[last] - meters[first]
+        points = meters[first + 1 : last] - start
+        fraction = np.clip(points @ delta / (delta @ delta), 0, 1)
+        distance = np.hypot(*(points - np.outer(fraction, delta)).T)
+        assert np.all(distance <= 5.01)
@@ -0,0 +1,108 @@
+import math
+from typing import List, Tuple
+
+import numpy as np
+import pytest
+import shapely
+
+from karpo_backend.route.simplify import METERS_PER_DEGREE
+from karpo_backend.route.timeline import RouteTimeline, locate_on_routes
+
+
+@pytest.fixture
+def timeline() -> RouteTimeline:
+    return RouteTimeline(
+        np.array([(0, 0), (1, 0), (1, 1), (3, 1)], dtype=float),
+        np.array([10, 20, 30, 50], dtype=float),
+    )
+
+
+@pytest.mark.parametrize(
+    ["epoch", "ans_coords", "ans_epochs"],
+    [
+        (5, [(0, 0), (1, 0), (1, 1), (3, 1)], [10, 20, 30, 50]),
+        (20, [(1, 0), (1, 1), (3, 1)], [20, 30, 50]),
+        (40, [(2, 1), (3, 1)], [40, 50]),
+    ],
+)
+def test_clip(
+    timeline: RouteTimeline,
+    epoch: float,
+    ans_coords: List[Tuple[float, float]],
+    ans_epochs: List[float],
+) -> None:
+    coords, epochs = timeline.clip(epoch)
+    assert np.allclose(coords, ans_coords)
+    assert np.allclose(epochs, ans_epochs)
+
+
+def test_clip_after_end(timeline: RouteTimeline) -> None:
+    with pytest.raises(ValueError):
+        timeline.clip(51)
+
+
+@pytest.mark.parametrize(
+    ["point", "ans_segment", "ans_nearest", "ans_distance"],
+    [
+        ((0.5, -1), 0, (0.5, 0), 0.5),
+        ((1, 0), 0, (1, 0), 1),
+        ((2, 3), 2, (2, 1), 3),
+        ((5, 1), 2, (3, 1), 4),
+    ],
+)
+def test_locate(
+    timeline: RouteTimeline,
+    point: Tuple[float, float],
+    ans_segment: int,
+    ans_nearest: Tuple[float, float],
+    ans_distance: float,
+) -> None:
+    segment, nearest, distance = timeline.locate(point)
+    assert segment == ans_segment
+    assert np.allclose(nearest, ans_nearest)
+    # near the equator a degree of longitude is about as long as one of latitude
+    assert math.isclose(distance, ans_distance * METERS_PER_DEGREE, rel_tol=1e-3)
+
+
+def test_time_at_fraction(timeline: RouteTimeline) -> None:
+    assert timeline.length == pytest.approx(4 * METERS_PER_DEGREE, rel=1e-3)
+    assert timeline.time_at_fraction(0) == 10
+    assert timeline.time_at_fraction(0.375) == pytest.approx(25, abs=0.01)
+    assert timeline.time_at_fraction(1) == 50
+
+
+def test_distances_in_meters() -> None:
+    # at 60 degrees north a degree of longitude is half as long as one of latitude
+    timeline = RouteTimeline(
+        np.array([(10, 60), (12, 60), (12, 61)], dtype=float),
+        np.array([0, 10, 20], dtype=float),
+    )
+    assert timeline.distances[1] == pytest.approx(timeline.distances[2] / 2)
+    assert timeline.length == pytest.approx(2 * METERS_PER_DEGREE)
+    assert timeline.time_at_fraction(0.5) == pytest.approx(10)
+    _, _, distance = timeline.locate((11, 59))
+    assert distance == pytest.approx(METERS_PER_DEGREE / 2)
+
+
+def test_locate_on_routes_as_shapely() -> None:
+    rng = np.random.default_rng(0)
+    routes = [rng.uniform(-1, 1, (size, 2)) for size in rng.integers(2, 30, 50)]
+    points_xy = rng.uniform(-1.5, 1.5, (len(routes), 2))
+    sizes = np.array([len(route) for route in routes])
+    coords = np.concatenate(routes)
+    owner = np.repeat(np.arange(len(routes)), sizes)
+    offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+
+    segments, nearest = locate_on_routes(coords, owner, offsets, points_xy)
+
+    lines = shapely.linestrings(coords, indices=owner)
+    points = shapely.points(points_xy)
+    ans_nearest = shapely.line_interpolate_point(
+        lines,
+        shapely.line_locate_point(lines, points),
+    )
+    assert np.allclose(nearest, shapely.get_coordinates(ans_nearest))
+    on_segments = shapely.linestrings(
+        [route[segment : segment + 2] for route, segment in zip(routes, segments)],
+    )
+    assert np.allclose(shapely.distance(on_segments, shapely.points(nearest)), 0)
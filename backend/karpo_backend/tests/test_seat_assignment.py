@@ -0,0 +1,56 @@
+import itertools
+
+import numpy as np
+
+from karpo_backend.services.matching.assignment import assign_seats
+
+
+def test_assign_scarce_seats() -> None:
+    # greedily, request 0 takes ride 0 and request 1 is left without a seat
+    pairs = [(0, 0, 10), (0, 1, 12), (1, 0, 11)]
+    assert assign_seats(pairs, [1, 1], [1, 1]) == {0: 1, 1: 0}
+
+
+def test_assign_minimum_cost() -> None:
+    pairs = [(0, 0, 10), (0, 1, 20), (1, 0, 10), (1, 1, 11)]
+    assert assign_seats(pairs, [1, 1], [1, 1]) == {0: 0, 1: 1}
+    assert assign_seats(pairs, [1, 1], [2, 1]) == {0: 0, 1: 0}
+
+
+def test_assign_group() -> None:
+    pairs = [(0, 0, 10), (0, 1, 30), (1, 0, 10), (2, 1, 10)]
+    assigned = assign_seats(pairs, [2, 1, 1], [3, 2])
+    assert assigned == {0: 0, 1: 0, 2: 1}
+    # the group never gets split or squeezed into a ride without room
+    assert assign_seats([(0, 0, 10)], [3], [2]) == {}
+
+
+def test_assign_seats_matches_brute_force() -> None:
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        num_requests, num_rides = 5, 3
+        pairs = [
+            (request, ride, float(rng.integers(1, 20)))
+            for request in range(num_requests)
+            for ride in range(num_rides)
+            if rng.random() < 0.6
+        ]
+        capacities = [int(c) for c in rng.integers(0, 3, num_rides)]
+        assigned = assign_seats(pairs, [1] * num_requests, capacities)
+
+        cost = {(request, ride): c for request, ride, c in pairs}
+        best = (0, 0.0)
+        for choice in itertools.product(range(-1, num_rides), repeat=num_requests):
+            chosen = [(q, r) for q, r in enumerate(choice) if r >= 0]
+            if any((q, r) not in cost for q, r in chosen):
+                continue
+            if any(choice.count(r) > capacities[r] for r in range(num_rides)):
+                continue
+            score = (len(chosen), -sum(cost[pair] for pair in chosen))
+            best = max(best, score)
+
+        assert all(choice in cost for choice in assigned.items())
+        for ride in range(num_rides):
+            assert list(assigned.values()).count(ride) <= capacities[ride]
+        score = (len(assigned), -sum(cost[pair] for pair in assigned.items()))
+        assert score == best
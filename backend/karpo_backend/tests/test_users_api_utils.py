@@ -1,4 +1,5 @@
 import contextlib
+import uuid
 from typing import Any, Dict
 
 import pytest
@@ -6,9 +7,11 @@ from fastapi import FastAPI, status
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from karpo_backend.db.dao.requests_dao import RequestsDAO
+from karpo_backend.db.dao.joins_dao import JoinsDAO
 from karpo_backend.db.dao.rides_dao import RidesDAO
 from karpo_backend.db.models.users import get_user_db
+from karpo_backend.services.users.profile_cache import ProfileCache
+from karpo_backend.web.api.loaders import RelationLoader
 from karpo_backend.web.api.users.utils import get_user_info_for_others
 
 
@@ -41,17 +44,67 @@ async def test_get_user_info_for_others(
     test_user_id = resp.json()["id"]
 
     get_user_db_context = contextlib.asynccontextmanager(get_user_db)
-    requests_dao = RequestsDAO(dbsession)
-    rides_dao = RidesDAO(dbsession)
+    profile_cache = ProfileCache(fastapi_app.state.redis_pool)
 
     async with get_user_db_context(dbsession) as user_db:
         user_info = await get_user_info_for_others(
             test_user_id,
             user_db,
-            requests_dao,
-            rides_dao,
+            profile_cache,
+        )
+        cached_info = await get_user_info_for_others(
+            test_user_id,
+            user_db,
+            profile_cache,
         )
 
     assert user_info.name == "TestUser"
     assert user_info.num_requests == 1
     assert user_info.num_rides == 1
+    assert cached_info == user_info
+
+    await profile_cache.invalidate(test_user_id)
+    assert await profile_cache.get_many([test_user_id]) == {}
+
+
+@pytest.mark.anyio
+async def test_relation_loader_user_infos(
+    fastapi_app: FastAPI,
+    client_test: AsyncClient,
+    dbsession: AsyncSession,
+    ride_data_1: Dict[str, Any],
+) -> None:
+    url_post_ride = fastapi_app.url_path_for("post_rides")
+    resp = await client_test.post(
+        url_post_ride,
+        json=ride_data_1,
+    )
+    assert resp.status_code == status.HTTP_200_OK
+    ride_id = uuid.UUID(resp.json()["ride_id"])
+
+    url_get_user_me = fastapi_app.url_path_for("users:current_user")
+    resp = await client_test.get(url_get_user_me)
+    test_user_id = uuid.UUID(resp.json()["id"])
+    unknown_id = uuid.uuid4()
+
+    loader = RelationLoader(
+        dbsession,
+        RidesDAO(dbsession),
+        JoinsDAO(dbsession),
+        ProfileCache(fastapi_app.state.redis_pool),
+    )
+    user_infos = await loader.get_user_infos([test_user_id, unknown_id, test_user_id])
+    assert list(user_infos) == [test_user_id, unknown_id]
+    user_info = user_infos[test_user_id]
+    assert user_info is not None
+    assert user_info.name == "TestUser"
+    assert user_info.num_requests == 0
+    assert user_info.num_rides == 1
+    assert user_infos[unknown_id] is None
+
+    rides = await loader.get_rides([ride_id, unknown_id])
+    ride = rides[ride_id]
+    assert ride is not None
+    assert ride.user_id == test_user_id
+    assert rides[unknown_id] is None
+    assert await loader.get_accepted_joins([ride_id]) == {ride_id: []}
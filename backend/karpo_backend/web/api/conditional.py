@@ -0,0 +1,61 @@
+import datetime
+import hashlib
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional
+
+from starlette.requests import Request
+
+from karpo_backend.datetimes import as_utc
+
+
+def weak_etag(*versions: object) -> str:
+    """
+    :param versions: whatever the representation changes with, e.g. the
+        `last_update_time` of every ride in it.
+    :return: a weak entity tag of the representation.
+    """
+    digest = hashlib.blake2b("|".join(map(str, versions)).encode(), digest_size=8)
+    return f'W/"{digest.hexdigest()}"'
+
+
+def cache_headers(
+    etag: str,
+    last_modified: Optional[datetime.datetime],
+) -> Dict[str, str]:
+    """
+    :return: headers that let a client revalidate what it got instead of
+        downloading it again.
+    """
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if last_modified is not None:
+        last_modified = as_utc(last_modified).astimezone(datetime.timezone.utc)
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    return headers
+
+
+def is_not_modified(
+    request: Request,
+    etag: str,
+    last_modified: Optional[datetime.datetime],
+) -> bool:
+    """
+    Evaluate `If-None-Match` and `If-Modified-Since` of a GET request.
+
+    Entity tags are compared weakly. `If-Modified-Since` counts only if there
+    is no `If-None-Match`, and to the second as HTTP dates are.
+
+    :return: whether a 304 answers the request.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or etag.removeprefix("W/") in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = as_utc(parsedate_to_datetime(if_modified_since))
+    except (TypeError, ValueError):
+        return False
+    return as_utc(last_modified).replace(microsecond=0) <= since
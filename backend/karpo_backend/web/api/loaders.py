@@ -0,0 +1,103 @@
+import uuid
+from typing import Container, Dict, Iterable, List, Optional
+
+from fastapi import Depends
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from karpo_backend.db.dao.joins_dao import JoinsDAO
+from karpo_backend.db.dao.rides_dao import RidesDAO
+from karpo_backend.db.dependencies import get_db_session
+from karpo_backend.db.models.joins import JoinsModel
+from karpo_backend.db.models.rides import RidesModel
+from karpo_backend.db.models.users import User  # type: ignore
+from karpo_backend.services.users.profile_cache import ProfileCache
+from karpo_backend.web.api.users.schema import UserInfoForOthersDTO
+from karpo_backend.web.api.users.utils import to_user_info_for_others
+
+
+def _missing(
+    ids: Iterable[uuid.UUID],
+    loaded: Container[uuid.UUID],
+) -> List[uuid.UUID]:
+    return list(dict.fromkeys(i for i in ids if i not in loaded))
+
+
+class RelationLoader:
+    """
+    Request-scoped batch loader of what match DTOs refer to.
+
+    Each method loads everything it is asked for that is not loaded yet with
+    one `IN (...)` query per table, and remembers it until the end of the
+    request, so assembling a list of matches takes a fixed number of round
+    trips instead of a few per match. Profiles of users are read from the
+    `ProfileCache` first.
+    """
+
+    def __init__(
+        self,
+        session: AsyncSession = Depends(get_db_session),
+        rides_dao: RidesDAO = Depends(),
+        joins_dao: JoinsDAO = Depends(),
+        profile_cache: ProfileCache = Depends(),
+    ):
+        self.session = session
+        self.rides_dao = rides_dao
+        self.joins_dao = joins_dao
+        self.profile_cache = profile_cache
+        self._rides: Dict[uuid.UUID, Optional[RidesModel]] = {}
+        self._accepted_joins: Dict[uuid.UUID, List[JoinsModel]] = {}
+        self._user_infos: Dict[uuid.UUID, Optional[UserInfoForOthersDTO]] = {}
+
+    async def get_rides(
+        self,
+        ride_ids: Iterable[uuid.UUID],
+    ) -> Dict[uuid.UUID, Optional[RidesModel]]:
+        """:return: the ride of each id, None for nonexistent ones."""
+        ride_ids = list(ride_ids)
+        missing = _missing(ride_ids, self._rides)
+        if missing:
+            rides = await self.rides_dao.get_ride_models_by_ids(missing)
+            self._rides.update(dict.fromkeys(missing))
+            self._rides.update((ride.id, ride) for ride in rides)
+        return {ride_id: self._rides[ride_id] for ride_id in ride_ids}
+
+    async def get_accepted_joins(
+        self,
+        ride_ids: Iterable[uuid.UUID],
+    ) -> Dict[uuid.UUID, List[JoinsModel]]:
+        """:return: the accepted joins of each ride."""
+        ride_ids = list(ride_ids)
+        missing = _missing(ride_ids, self._accepted_joins)
+        if missing:
+            joins = await self.joins_dao.get_accepted_joins_models_by_ride_ids(missing)
+            self._accepted_joins.update((ride_id, []) for ride_id in missing)
+            for join in joins:
+                self._accepted_joins[join.ride_id].append(join)
+        return {ride_id: self._accepted_joins[ride_id] for ride_id in ride_ids}
+
+    async def get_user_infos(
+        self,
+        user_ids: Iterable[uuid.UUID],
+    ) -> Dict[uuid.UUID, Optional[UserInfoForOthersDTO]]:
+        """:return: what others may see of each user, None for nonexistent ones."""
+        user_ids = list(user_ids)
+        missing = _missing(user_ids, self._user_infos)
+        if missing:
+            cached = await self.profile_cache.get_many(missing)
+            self._user_infos.update(
+                (user_id, UserInfoForOthersDTO.model_validate_json(profile))
+                for user_id, profile in cached.items()
+            )
+            missing = _missing(missing, self._user_infos)
+        if missing:
+            result = await self.session.scalars(
+                select(User).where(User.id.in_(missing)),
+            )
+            infos = {user.id: to_user_info_for_others(user) for user in result.all()}
+            await self.profile_cache.put_many(
+                {user_id: info.model_dump_json() for user_id, info in infos.items()},
+            )
+            self._user_infos.update(dict.fromkeys(missing))
+            self._user_infos.update(infos)
+        return {user_id: self._user_infos[user_id] for user_id in user_ids}
@@ -0,0 +1,65 @@
+import asyncio
+import contextlib
+from typing import Awaitable, Callable, Optional
+
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+from karpo_backend.services.redis.pubsub import Subscription
+
+
+async def serve_websocket(
+    websocket: WebSocket,
+    send: Callable[[], Awaitable[None]],
+    on_text: Optional[Callable[[str], Awaitable[None]]] = None,
+) -> None:
+    """
+    Run a sending loop and handle what the client sends until either ends.
+
+    The loop only holds up its own socket if the client reads slowly.
+
+    :param websocket: an accepted websocket.
+    :param send: the sending loop.
+    :param on_text: handler of each text message from the client, None to
+        ignore them.
+    """
+
+    async def receive() -> None:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            text = message.get("text")
+            if on_text is not None and text is not None:
+                await on_text(text)
+
+    tasks = {asyncio.ensure_future(send()), asyncio.ensure_future(receive())}
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            with contextlib.suppress(WebSocketDisconnect):
+                task.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def push_until_disconnect(
+    websocket: WebSocket,
+    subscription: Subscription,
+) -> None:
+    """
+    Send the messages of a subscription to a websocket until the client leaves.
+
+    The client is not expected to send anything, what it sends is ignored.
+    The subscription drops what a slow client cannot keep up with.
+
+    :param websocket: an accepted websocket.
+    :param subscription: the messages to send.
+    """
+
+    async def send() -> None:
+        while True:
+            await websocket.send_text(await subscription.get())
+
+    await serve_websocket(websocket, send)
@@ -1,11 +1,11 @@
 import datetime
 import uuid
-from typing import List, Literal, Optional
+from typing import List, Literal, Optional, Union
 
 from pydantic import BaseModel, NonNegativeFloat, NonNegativeInt, PositiveInt
 
 from karpo_backend.web.api.users.schema import UserInfoForOthersDTO
-from karpo_backend.web.api.utils import LocationWithDescDTO, RouteDTO
+from karpo_backend.web.api.utils import EncodedRouteDTO, LocationWithDescDTO, RouteDTO
 
 
 class MatchDTO(BaseModel):
@@ -24,7 +24,7 @@ class MatchDTO(BaseModel):
     other_passengers: List[uuid.UUID]
     driver_info: UserInfoForOthersDTO
     fare: NonNegativeInt
-    driver_route: RouteDTO
+    driver_route: Union[RouteDTO, EncodedRouteDTO]
     proximity: float
     status: Literal["unasked", "pending", "accepted"]
     join_id: Optional[uuid.UUID] = None
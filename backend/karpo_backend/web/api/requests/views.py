@@ -1,21 +1,22 @@
 import uuid
-from typing import List, Optional
+from typing import List, Sequence, Tuple
 
 from fastapi import APIRouter, HTTPException, status
 from fastapi.param_functions import Depends
-from fastapi_users.db import SQLAlchemyUserDatabase
 from shapely import Point, wkb
 
 from karpo_backend.db.dao.joins_dao import JoinsDAO
+from karpo_backend.db.dao.matches_dao import MatchesDAO
 from karpo_backend.db.dao.requests_dao import RequestsDAO
-from karpo_backend.db.dao.rides_dao import RidesDAO
+from karpo_backend.db.dependencies import ReadSessions, get_db_read_sessions
 from karpo_backend.db.models.joins import JoinsModel
 from karpo_backend.db.models.requests import RequestsModel
-from karpo_backend.db.models.users import (  # type: ignore
-    User,
-    current_active_user,
-    get_user_db,
-)
+from karpo_backend.db.models.rides import RidesModel
+from karpo_backend.db.models.users import User, current_active_user  # type: ignore
+from karpo_backend.matching import Match
+from karpo_backend.services.matching.incremental import IncrementalMatcher
+from karpo_backend.services.users.profile_cache import ProfileCache
+from karpo_backend.web.api.loaders import RelationLoader
 from karpo_backend.web.api.requests.schema import (
     GetRequestIdMatchesResponse,
     GetRequestIdResponse,
@@ -24,11 +25,12 @@ from karpo_backend.web.api.requests.schema import (
     PostRequestsRequest,
     PostRequestsResponse,
 )
-from karpo_backend.web.api.users.utils import get_user_info_for_others
 from karpo_backend.web.api.utils import (
     LocationWithDescDTO,
-    RouteDTO,
+    RouteFormat,
     get_distance_between_wkb_points,
+    get_route_format,
+    route_dto_from_ride,
 )
 
 router = APIRouter()
@@ -37,21 +39,32 @@ router = APIRouter()
 async def get_unasked_match_dtos(
     request: RequestsModel,
     limit: int,
-    requests_dao: RequestsDAO,
-    rides_dao: RidesDAO,
-    joins_dao: JoinsDAO,
-    user_db: SQLAlchemyUserDatabase,
+    matches_dao: MatchesDAO,
+    loader: RelationLoader,
+    route_format: RouteFormat = "full",
 ) -> List[MatchDTO]:
-    evaled_matches = await requests_dao.get_request_matches(request, limit)
+    evaled_matches = await matches_dao.get_request_matches(request, limit)
+    return await get_match_dtos_from_evaled_matches(
+        evaled_matches,
+        loader,
+        route_format,
+    )
+
+
+async def get_match_dtos_from_evaled_matches(
+    evaled_matches: Sequence[Tuple[RidesModel, Match]],
+    loader: RelationLoader,
+    route_format: RouteFormat = "full",
+) -> List[MatchDTO]:
+    accepted_joins = await loader.get_accepted_joins(
+        ride.id for ride, _ in evaled_matches
+    )
+    driver_user_infos = await loader.get_user_infos(
+        ride.user_id for ride, _ in evaled_matches
+    )
     match_dtos: List[MatchDTO] = []
     for ride, evaled_match in evaled_matches:
-        driver_user_info = await get_user_info_for_others(
-            ride.user_id, user_db, requests_dao, rides_dao
-        )
-
-        other_accepted_joins = await joins_dao.get_accepted_joins_model_by_ride_id(
-            ride.id,
-        )
+        other_accepted_joins = accepted_joins[ride.id]
         other_passengers: List[uuid.UUID] = [
             join.request_user_id for join in other_accepted_joins
         ]
@@ -79,11 +92,8 @@ async def get_unasked_match_dtos(
             num_available_seat=ride.num_seats - len(other_accepted_joins),
             other_passengers=other_passengers,
             fare=evaled_match.fare,
-            driver_info=driver_user_info,
-            driver_route=RouteDTO.from_wkb_and_timestamps(
-                ride.route,
-                ride.route_timestamps,
-            ),
+            driver_info=driver_user_infos[ride.user_id],
+            driver_route=route_dto_from_ride(ride, route_format),
             proximity=evaled_match.estimated_travel_time,
             status="unasked",
         )
@@ -92,118 +102,75 @@ async def get_unasked_match_dtos(
     return match_dtos
 
 
-async def get_match_dto_from_request_and_join(
-    request: RequestsModel,
-    join: JoinsModel,
-    requests_dao: RequestsDAO,
-    rides_dao: RidesDAO,
-    joins_dao: JoinsDAO,
-    user_db: SQLAlchemyUserDatabase,
-) -> MatchDTO:
-    pick_up_location = LocationWithDescDTO.from_wkb(
-        join.pick_up_location,
-        join.pick_up_location_description,
-    )
-
-    drop_off_location = LocationWithDescDTO.from_wkb(
-        join.drop_off_location,
-        join.drop_off_location_description,
-    )
-
-    pick_up_distance = get_distance_between_wkb_points(
-        request.origin,
-        join.pick_up_location,
-    )
-    drop_off_distance = get_distance_between_wkb_points(
-        request.destination,
-        join.drop_off_location,
-    )
-
-    ride = await rides_dao.get_ride_model_by_id(join.ride_id)
-    other_accepted_joins = await joins_dao.get_accepted_joins_model_by_ride_id(ride.id)
-    other_passengers: List[uuid.UUID] = [
-        j.request_user_id for j in other_accepted_joins if j.id != join.id
-    ]
-    num_avaiable_seat = ride.num_seats - len(other_passengers)
-    if join.status == "accepted":
-        num_avaiable_seat -= 1
-
-    driver_user_info = await get_user_info_for_others(
-        ride.user_id, user_db, requests_dao, rides_dao
-    )
-
-    return MatchDTO(
-        ride_id=join.ride_id,
-        pick_up_time=join.pick_up_time,
-        drop_off_time=join.drop_off_time,
-        pick_up_location=pick_up_location,
-        drop_off_location=drop_off_location,
-        pick_up_distance=pick_up_distance,
-        drop_off_distance=drop_off_distance,
-        driver_origin=LocationWithDescDTO.from_wkb(
-            ride.origin,
-            ride.origin_description,
-        ),
-        driver_destination=LocationWithDescDTO.from_wkb(
-            ride.destination,
-            ride.destination_description,
-        ),
-        num_available_seat=num_avaiable_seat,
-        other_passengers=other_passengers,
-        driver_info=driver_user_info,
-        fare=join.fare,
-        driver_route=RouteDTO.from_wkb_and_timestamps(
-            ride.route,
-            ride.route_timestamps,
-        ),
-        proximity=join.proximity,
-        status=join.status,
-        join_id=join.id,
-    )
-
-
-async def get_accepted_match_dto(
+async def get_match_dtos_from_request_and_joins(
     request: RequestsModel,
-    requests_dao: RequestsDAO,
-    rides_dao: RidesDAO,
-    joins_dao: JoinsDAO,
-    user_db: SQLAlchemyUserDatabase,
-) -> Optional[MatchDTO]:
-    join = await joins_dao.get_accepted_joins_by_request_id(request.id)
-    if join is None:
-        return None
-
-    return await get_match_dto_from_request_and_join(
-        request,
-        join,
-        requests_dao,
-        rides_dao,
-        joins_dao,
-        user_db,
+    joins: List[JoinsModel],
+    loader: RelationLoader,
+    route_format: RouteFormat = "full",
+) -> List[MatchDTO]:
+    rides = await loader.get_rides(join.ride_id for join in joins)
+    accepted_joins = await loader.get_accepted_joins(join.ride_id for join in joins)
+    driver_user_infos = await loader.get_user_infos(
+        ride.user_id for ride in rides.values() if ride is not None
     )
 
-
-async def get_pending_match_dtos(
-    request: RequestsModel,
-    requests_dao: RequestsDAO,
-    rides_dao: RidesDAO,
-    joins_dao: JoinsDAO,
-    user_db: SQLAlchemyUserDatabase,
-) -> List[MatchDTO]:
-    joins = await joins_dao.get_pending_joins_by_request_id(request.id)
     match_dtos: List[MatchDTO] = []
-
     for join in joins:
-        match_dto = await get_match_dto_from_request_and_join(
-            request,
-            join,
-            requests_dao,
-            rides_dao,
-            joins_dao,
-            user_db,
+        ride = rides[join.ride_id]
+        pick_up_location = LocationWithDescDTO.from_wkb(
+            join.pick_up_location,
+            join.pick_up_location_description,
         )
-        match_dtos.append(match_dto)
 
+        drop_off_location = LocationWithDescDTO.from_wkb(
+            join.drop_off_location,
+            join.drop_off_location_description,
+        )
+
+        pick_up_distance = get_distance_between_wkb_points(
+            request.origin,
+            join.pick_up_location,
+        )
+        drop_off_distance = get_distance_between_wkb_points(
+            request.destination,
+            join.drop_off_location,
+        )
+
+        other_accepted_joins = accepted_joins[ride.id]
+        other_passengers: List[uuid.UUID] = [
+            j.request_user_id for j in other_accepted_joins if j.id != join.id
+        ]
+        num_avaiable_seat = ride.num_seats - len(other_passengers)
+        if join.status == "accepted":
+            num_avaiable_seat -= 1
+
+        match_dtos.append(
+            MatchDTO(
+                ride_id=join.ride_id,
+                pick_up_time=join.pick_up_time,
+                drop_off_time=join.drop_off_time,
+                pick_up_location=pick_up_location,
+                drop_off_location=drop_off_location,
+                pick_up_distance=pick_up_distance,
+                drop_off_distance=drop_off_distance,
+                driver_origin=LocationWithDescDTO.from_wkb(
+                    ride.origin,
+                    ride.origin_description,
+                ),
+                driver_destination=LocationWithDescDTO.from_wkb(
+                    ride.destination,
+                    ride.destination_description,
+                ),
+                num_available_seat=num_avaiable_seat,
+                other_passengers=other_passengers,
+                driver_info=driver_user_infos[ride.user_id],
+                fare=join.fare,
+                driver_route=route_dto_from_ride(ride, route_format),
+                proximity=join.proximity,
+                status=join.status,
+                join_id=join.id,
+            )
+        )
     return match_dtos
 
 
@@ -212,9 +179,11 @@ async def post_requests(
     req: PostRequestsRequest,
     limit: int = 10,
     requests_dao: RequestsDAO = Depends(),
-    rides_dao: RidesDAO = Depends(),
-    joins_dao: JoinsDAO = Depends(),
-    user_db: SQLAlchemyUserDatabase = Depends(get_user_db),
+    matches_dao: MatchesDAO = Depends(),
+    loader: RelationLoader = Depends(),
+    incremental_matcher: IncrementalMatcher = Depends(),
+    profile_cache: ProfileCache = Depends(),
+    route_format: RouteFormat = Depends(get_route_format),
     user: User = Depends(current_active_user),
 ) -> PostRequestsResponse:
     """
@@ -222,6 +191,8 @@ async def post_requests(
 
     #### Query parameters:
     + **limit**: control how many matches in the response.
+    + **route_format**: `"polyline"` for `driver_route` as an encoded polyline,
+      also asked for by `Accept: application/json; route=polyline`.
 
     #### Request body:
     + **time**: the earliest time when the passenger can get on.
@@ -249,13 +220,15 @@ async def post_requests(
             detail="exists a active request for the current user",
         )
 
+    await profile_cache.invalidate(user.id)
+    await incremental_matcher.on_request_created(request, limit)
+
     unasked_matches = await get_unasked_match_dtos(
         request,
         limit,
-        requests_dao,
-        rides_dao,
-        joins_dao,
-        user_db,
+        matches_dao,
+        loader,
+        route_format,
     )
     return PostRequestsResponse(request_id=request.id, matches=unasked_matches)
 
@@ -309,10 +282,11 @@ async def get_request_id(
 async def get_request_id_matches(  # noqa: WPS210
     request_id: uuid.UUID,
     limit: int = 10,
-    requests_dao: RequestsDAO = Depends(),
-    rides_dao: RidesDAO = Depends(),
-    joins_dao: JoinsDAO = Depends(),
-    user_db: SQLAlchemyUserDatabase = Depends(get_user_db),
+    matches_dao: MatchesDAO = Depends(),
+    loader: RelationLoader = Depends(),
+    read_sessions: ReadSessions = Depends(get_db_read_sessions),
+    incremental_matcher: IncrementalMatcher = Depends(),
+    route_format: RouteFormat = Depends(get_route_format),
     user: User = Depends(current_active_user),
 ) -> GetRequestIdMatchesResponse:
     """
@@ -320,42 +294,52 @@ async def get_request_id_matches(  # noqa: WPS210
 
     #### Query parameters:
     + **limit**: control how many matches in the response.
+    + **route_format**: `"polyline"` for `driver_route` as an encoded polyline,
+      also asked for by `Accept: application/json; route=polyline`.
 
     #### Response (an element in the list):
     + **proximity**: the lower the better.
     + **join_id**: the join_id of a sent join request, null if `status` is "unasked".
     """
-    request = await requests_dao.get_requests_model_by_id(request_id)
+    request, accepted_join, pending_joins = await read_sessions.gather(
+        lambda session: RequestsDAO(session).get_requests_model_by_id(request_id),
+        lambda session: JoinsDAO(session).get_accepted_joins_by_request_id(request_id),
+        lambda session: JoinsDAO(session).get_pending_joins_by_request_id(request_id),
+    )
     if request is None:
         raise HTTPException(status_code=404, detail="Item not found")
 
     if request.user_id != user.id:
         raise HTTPException(status_code=403, detail="Permission denied")
 
-    resp = GetRequestIdMatchesResponse(matches=[])
-    accepted_match = await get_accepted_match_dto(
-        request, requests_dao, rides_dao, joins_dao, user_db
-    )
-    if accepted_match is not None:
-        resp.matches.append(accepted_match)
-        return resp
-
-    pending_matches = await get_pending_match_dtos(
-        request, requests_dao, rides_dao, joins_dao, user_db
+    if accepted_join is not None:
+        accepted_matches = await get_match_dtos_from_request_and_joins(
+            request,
+            [accepted_join],
+            loader,
+            route_format,
+        )
+        return GetRequestIdMatchesResponse(matches=accepted_matches)
+
+    await incremental_matcher.on_request_read(request, limit)
+    evaled_matches = await matches_dao.get_request_matches(request, limit)
+    # one round of loading for the rides of both lists
+    await loader.get_accepted_joins(
+        [join.ride_id for join in pending_joins]
+        + [ride.id for ride, _ in evaled_matches],
     )
-    resp.matches.extend(pending_matches)
-
-    unasked_matches = await get_unasked_match_dtos(
+    pending_matches = await get_match_dtos_from_request_and_joins(
         request,
-        limit,
-        requests_dao,
-        rides_dao,
-        joins_dao,
-        user_db,
+        pending_joins,
+        loader,
+        route_format,
     )
-    resp.matches.extend(unasked_matches)
-
-    return resp
+    unasked_matches = await get_match_dtos_from_evaled_matches(
+        evaled_matches,
+        loader,
+        route_format,
+    )
+    return GetRequestIdMatchesResponse(matches=pending_matches + unasked_matches)
 
 
 @router.get(
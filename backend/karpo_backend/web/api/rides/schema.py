@@ -1,11 +1,16 @@
 import datetime
 import uuid
-from typing import List, Literal, Optional, Tuple
+from typing import List, Literal, Optional, Tuple, Union
 
 from pydantic import BaseModel, NonNegativeInt, PositiveInt
 
 from karpo_backend.web.api.users.schema import UserInfoForOthersDTO
-from karpo_backend.web.api.utils import LocationDTO, LocationWithDescDTO, RouteDTO
+from karpo_backend.web.api.utils import (
+    EncodedRouteDTO,
+    LocationDTO,
+    LocationWithDescDTO,
+    RouteDTO,
+)
 
 
 class PostRideIdJoinsRequest(BaseModel):
@@ -34,6 +39,11 @@ class ChatRecordDTO(BaseModel):
     user_id: uuid.UUID
     content: str
     time: datetime.datetime
+    id: Optional[uuid.UUID] = None
+
+
+class ChatInputDTO(BaseModel):
+    content: str
 
 
 class SavedRideItemDTO(BaseModel):
@@ -47,7 +57,7 @@ class SavedRideItemDTO(BaseModel):
 
 
 class RideDTO(SavedRideItemDTO):
-    route_with_time: RouteDTO
+    route_with_time: Union[RouteDTO, EncodedRouteDTO]
 
 
 class GetRideIdResponse(BaseModel):
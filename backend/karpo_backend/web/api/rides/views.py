@@ -1,24 +1,49 @@
 import datetime
 import json
 import uuid
-from typing import List, Literal
+from concurrent.futures import Executor
+from typing import List, Literal, Optional, Type, Union
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Request, Response, WebSocket, status
 from fastapi.param_functions import Depends
 from fastapi_users.db import SQLAlchemyUserDatabase
-from shapely import LineString, Point, wkb, wkt
+from pydantic import ValidationError
+from shapely import Point, wkb, wkt
+from starlette.websockets import WebSocketDisconnect
 
+from karpo_backend.datetimes import as_utc
 from karpo_backend.db.dao.joins_dao import JoinsDAO
+from karpo_backend.db.dao.matches_dao import MatchesDAO
 from karpo_backend.db.dao.messages_dao import MessagesDAO
 from karpo_backend.db.dao.requests_dao import RequestsDAO
 from karpo_backend.db.dao.rides_dao import RidesDAO
+from karpo_backend.db.dependencies import ReadSessions, get_db_read_sessions
+from karpo_backend.db.models.messages import MessagesModel
 from karpo_backend.db.models.users import (  # type: ignore
+    WEBSOCKET_AUTH_SUBPROTOCOL,
     User,
     current_active_user,
     get_user_db,
+    websocket_active_user,
 )
-from karpo_backend.matching import evaluate_match
+from karpo_backend.route.builder import build_route
+from karpo_backend.services.chat.streams import ChatMessage, ChatStreams
+from karpo_backend.services.matching.dependency import get_matching_executor
+from karpo_backend.services.matching.incremental import IncrementalMatcher
+from karpo_backend.services.matching.memo import MatchMemo
+from karpo_backend.services.redis.dependency import get_pubsub_hub
+from karpo_backend.services.redis.pubsub import PubSubHub
+from karpo_backend.services.rides.state import (
+    RideState,
+    RideStateStore,
+    ride_status_channel,
+)
+from karpo_backend.services.users.profile_cache import ProfileCache
+from karpo_backend.settings import settings
+from karpo_backend.web.api.conditional import cache_headers, is_not_modified, weak_etag
+from karpo_backend.web.api.push import push_until_disconnect, serve_websocket
 from karpo_backend.web.api.rides.schema import (  # noqa: WPS235
+    ChatInputDTO,
     ChatRecordDTO,
     GetRideIdJoinIdStatusResponse,
     GetRideIdResponse,
@@ -44,11 +69,28 @@ from karpo_backend.web.api.users.utils import (
     get_user_info_for_others,
     update_user_rating_by_id,
 )
-from karpo_backend.web.api.utils import LocationDTO, LocationWithDescDTO, RouteDTO
+from karpo_backend.web.api.utils import (
+    EncodedRouteDTO,
+    LocationDTO,
+    LocationWithDescDTO,
+    RouteDTO,
+    RouteFormat,
+    get_route_format,
+)
 
 router = APIRouter()
 
 
+def to_ride_status_dto(ride_state: RideState) -> GetRideIdStatusResponse:
+    return GetRideIdStatusResponse(
+        driver_position=LocationDTO(
+            longitude=ride_state.longitude,
+            latitude=ride_state.latitude,
+        ),
+        phase=ride_state.phase,
+    )
+
+
 @router.get(
     "/{ride_id}/status",
     responses={404: {"description": "nonexistent ride_id or wrong permissions"}},
@@ -57,77 +99,71 @@ router = APIRouter()
 async def get_ride_id_status(
     ride_id: uuid.UUID,
     rides_dao: RidesDAO = Depends(),
+    ride_states: RideStateStore = Depends(),
 ) -> GetRideIdStatusResponse:
     """Get the dynamic status (location, phase) of a ride."""
-    ride_status = await rides_dao.get_phase_position_by_id(ride_id)
-    if ride_status is None:
+    ride_state = await ride_states.load(ride_id, rides_dao)
+    if ride_state is None:
         raise HTTPException(status_code=404, detail="Item not found")
-    driver_position: Point = wkb.loads(bytes(ride_status.driver_position.data))
+    return to_ride_status_dto(ride_state)
 
-    return GetRideIdStatusResponse(
-        driver_position=LocationDTO(
-            longitude=driver_position.x,
-            latitude=driver_position.y,
-        ),
-        phase=ride_status.phase,
-    )
+
+@router.websocket("/{ride_id}/status/ws")
+async def ws_ride_id_status(
+    websocket: WebSocket,
+    ride_id: uuid.UUID,
+    read_sessions: ReadSessions = Depends(get_db_read_sessions),
+    ride_states: RideStateStore = Depends(),
+    pubsub_hub: PubSubHub = Depends(get_pubsub_hub),
+) -> None:
+    """
+    Push the dynamic status of a ride whenever the driver updates it.
+
+    Sends the current status as in GET /rides/{ride_id}/status right away,
+    then every update. A client that reads too slowly skips to recent ones.
+    Closes with code 1008 for a nonexistent ride.
+    """
+    channel = ride_status_channel(ride_id)
+    async with pubsub_hub.subscribe(channel, settings.websocket_queue_size) as updates:
+        (ride_state,) = await read_sessions.gather(
+            lambda session: ride_states.load(ride_id, RidesDAO(session)),
+        )
+        if ride_state is None:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+
+        await websocket.accept()
+        await websocket.send_text(to_ride_status_dto(ride_state).model_dump_json())
+        await push_until_disconnect(websocket, updates)
 
 
 @router.post("/", response_model=PostRidesResponse, tags=["driver"])
 async def post_rides(
     req: PostRidesRequest,
     rides_dao: RidesDAO = Depends(),
+    incremental_matcher: IncrementalMatcher = Depends(),
+    profile_cache: ProfileCache = Depends(),
     user: User = Depends(current_active_user),
 ) -> PostRidesResponse:
     """
     司機發起行程.
     `route` 中 `steps` 和 `durations` 數量需相同
     """
-    if len(req.route.steps) != len(req.route.durations):
+    try:
+        coords, offsets = build_route(req.route.steps, req.route.durations)
+    except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Lengths of steps and durations should be equal.",
+            detail=str(e),
         )
 
-    route = []
-    timestamps = []
-
-    t = req.departure_time
-    for step, duration in zip(req.route.steps, req.route.durations):
-        ## Except for the step containing the origin, the first point of each step has been considered by the previous step.
-        if len(timestamps) == 0:
-            route.append((step[0][0], step[0][1]))
-            timestamps.append(req.departure_time)
-
-        distance_to_next_point = []
-        for point_idx in range(1, len(step)):
-            distance_to_next_point.append(
-                (
-                    (step[point_idx][0] - step[point_idx - 1][0]) ** 2
-                    + (step[point_idx][1] - step[point_idx - 1][1]) ** 2
-                )
-                ** 0.5
-            )
-        total_distance = sum(distance_to_next_point)
-        for point_idx in range(1, len(step)):
-            route.append((step[point_idx][0], step[point_idx][1]))
-            timestamps.append(
-                timestamps[-1]
-                + datetime.timedelta(
-                    seconds=duration
-                    * (distance_to_next_point[point_idx - 1] / total_distance)
-                )
-            )
-
-        t += datetime.timedelta(seconds=duration)
-
     ride_id = await rides_dao.create_ride_model(
         user_id=user.id,
         label=req.label,
         origin=req.origin,
         destination=req.destination,
-        route=route,
-        route_timestamps=timestamps,
+        route=coords,
+        route_offsets=offsets,
         intermediates=req.intermediates,
         departure_time=req.departure_time,
         num_seats=req.num_seats,
@@ -135,22 +171,56 @@ async def post_rides(
         driver_position=req.origin,
         last_update_time=datetime.datetime.now(),
     )
+    await profile_cache.invalidate(user.id)
+    await incremental_matcher.on_ride_created(ride_id)
     return PostRidesResponse(ride_id=ride_id)
 
 
-@router.get("/{ride_id}", tags=["driver", "passenger"])
+@router.get(
+    "/{ride_id}",
+    response_model=GetRideIdResponse,
+    responses={status.HTTP_304_NOT_MODIFIED: {"description": "Not modified"}},
+    tags=["driver", "passenger"],
+)
 async def get_ride_id(
     ride_id: uuid.UUID,
+    request: Request,
+    response: Response,
     rides_dao: RidesDAO = Depends(),
-) -> GetRideIdResponse:
-    """Get the ride specified by `ride_id`."""
+    route_format: RouteFormat = Depends(get_route_format),
+) -> Union[GetRideIdResponse, Response]:
+    """
+    Get the ride specified by `ride_id`.
+
+    Answers 304 to `If-None-Match` with the `ETag` of the ride as it is, or
+    to `If-Modified-Since` a time it has not changed since.
+
+    #### Query parameters:
+    + **route_format**: `"polyline"` for `route_with_time` as an encoded
+      polyline, also asked for by `Accept: application/json; route=polyline`.
+    """
+    last_update_time = await rides_dao.get_last_update_time_by_id(ride_id)
+    if last_update_time is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    etag = weak_etag(last_update_time, route_format)
+    if is_not_modified(request, etag, last_update_time):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers={**cache_headers(etag, last_update_time), "Vary": "Accept"},
+        )
+
+    # read after the version, the ride is at least as new as its etag
+    response.headers.update(cache_headers(etag, last_update_time))
+
     ride = await rides_dao.get_ride_model_by_id(ride_id)
     if ride is None:
         raise HTTPException(status_code=404, detail="Item not found")
 
     origin: Point = wkb.loads(bytes(ride.origin.data))
     destination: Point = wkb.loads(bytes(ride.destination.data))
-    route: LineString = wkb.loads(bytes(ride.route.data))
+    route_dto_class: Union[Type[RouteDTO], Type[EncodedRouteDTO]] = RouteDTO
+    if route_format == "polyline":
+        route_dto_class = EncodedRouteDTO
 
     intermediateDTO_list = []
     for intermediate, intermediate_description in zip(
@@ -177,9 +247,9 @@ async def get_ride_id(
                 latitude=destination.y,
                 description=ride.destination_description,
             ),
-            route_with_time=RouteDTO(
-                route=list(route.coords),
-                timestamps=ride.route_timestamps,
+            route_with_time=route_dto_class.from_wkb_and_timestamps(
+                ride.route,
+                ride.route_timestamps,
             ),
             intermediates=intermediateDTO_list,
             departure_time=ride.departure_time,
@@ -190,31 +260,53 @@ async def get_ride_id(
 
 
 @router.get(
-    "/saved_rides/{user_id}", response_model=GetRideSavedRidesResponse, tags=["driver"]
+    "/saved_rides/{user_id}",
+    response_model=GetRideSavedRidesResponse,
+    responses={status.HTTP_304_NOT_MODIFIED: {"description": "Not modified"}},
+    tags=["driver"],
 )
 async def get_saved_rides(
     user_id: uuid.UUID,
+    request: Request,
+    response: Response,
     limit: int = 10,
     rides_dao: RidesDAO = Depends(),
     user: User = Depends(current_active_user),
-) -> GetRideSavedRidesResponse:
+) -> Union[GetRideSavedRidesResponse, Response]:
     """
     Get past ride records
 
+    Answers 304 to `If-None-Match` with the `ETag` of the records as they
+    are, or to `If-Modified-Since` a time none of them has changed since.
+
     #### Query parameters:
     + **limit**: control how many latest rides in the response.
     + **user_id**: user who want to query past rides.
 
     """
-    rides = await rides_dao.get_saved_ride_model_by_user_id(
+    versions = await rides_dao.get_saved_ride_versions_by_user_id(
         user_id=user_id, limit=limit
     )
-    if len(rides) == 0:
+    if len(versions) == 0:
         raise HTTPException(status_code=404, detail="Item not found")
 
     if user_id != user.id:
         raise HTTPException(status_code=403, detail="Permission denied")
 
+    etag = weak_etag(*versions)
+    last_modified = max(last_update_time for _, last_update_time in versions)
+    if is_not_modified(request, etag, last_modified):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers=cache_headers(etag, last_modified),
+        )
+
+    response.headers.update(cache_headers(etag, last_modified))
+
+    rides = await rides_dao.get_saved_ride_model_by_user_id(
+        user_id=user_id, limit=limit
+    )
+
     saved_ride_item_list = []
     for ride in rides:
         origin: Point = wkb.loads(bytes(ride.origin.data))
@@ -264,6 +356,9 @@ async def patch_ride_id_status(
     rides_dao: RidesDAO = Depends(),
     joins_dao: JoinsDAO = Depends(),
     requests_dao: RequestsDAO = Depends(),
+    incremental_matcher: IncrementalMatcher = Depends(),
+    ride_states: RideStateStore = Depends(),
+    pubsub_hub: PubSubHub = Depends(get_pubsub_hub),
     user: User = Depends(current_active_user),
 ) -> None:
     """
@@ -279,27 +374,50 @@ async def patch_ride_id_status(
     + len(schedule): arrive driver's destination.
     """
 
-    ride = await rides_dao.get_ride_model_by_id(ride_id)
-    if ride is None:
+    ride_state = await ride_states.load(ride_id, rides_dao)
+    if ride_state is None:
         raise HTTPException(
             status_code=404, detail="Ride not found, make sure ride_id is correct!"
         )
 
-    if ride.user_id != user.id:
+    if ride_state.user_id != user.id:
         raise HTTPException(status_code=403, detail="Permission denied")
 
-    put_phase = req.phase if req.phase is not None else ride.phase
-    await rides_dao.put_phase_position_by_id(
-        ride_id=ride_id,
-        driver_position=req.driver_position,
-        phase=put_phase,
+    phase_changed = req.phase is not None and req.phase != ride_state.phase
+    moved = (req.driver_position.longitude, req.driver_position.latitude) != (
+        ride_state.longitude,
+        ride_state.latitude,
+    )
+    if not (moved or phase_changed):
+        # last_update_time, and so the ETags of the ride, stay as they are
+        return
+    ride_state = RideState(
+        user_id=ride_state.user_id,
+        longitude=req.driver_position.longitude,
+        latitude=req.driver_position.latitude,
+        phase=req.phase if req.phase is not None else ride_state.phase,
         last_update_time=datetime.datetime.now(),
     )
+    # positions are written back by the ride state flusher
+    write_through = phase_changed or settings.ride_state_flush_interval <= 0
+    if write_through:
+        await rides_dao.put_phase_position_by_id(
+            ride_id=ride_id,
+            driver_position=req.driver_position,
+            phase=ride_state.phase,
+            last_update_time=ride_state.last_update_time,
+        )
+    await ride_states.put(ride_id, ride_state, dirty=not write_through)
+    await pubsub_hub.publish(
+        ride_status_channel(ride_id),
+        to_ride_status_dto(ride_state).model_dump_json(),
+    )
 
-    if req.phase is not None:
+    if phase_changed:
+        await incremental_matcher.on_ride_phase_changed(ride_id, ride_state.phase)
         schedule = await rides_dao.get_schedule_by_id(ride_id=ride_id)
-        if 0 <= req.phase < len(schedule):
-            stopover = json.loads(schedule[req.phase])
+        if 0 <= ride_state.phase < len(schedule):
+            stopover = json.loads(schedule[ride_state.phase])
             if stopover["status"] == "pick_up":
                 await joins_dao.put_joins_model_progress_by_id(
                     stopover["join_id"], "onboard"
@@ -314,15 +432,33 @@ async def patch_ride_id_status(
 @router.get(
     "/{ride_id}/schedule",
     response_model=GetRideIdScheduleResponse,
+    responses={status.HTTP_304_NOT_MODIFIED: {"description": "Not modified"}},
     tags=["driver", "passenger"],
 )
 async def get_ride_id_schedule(
     ride_id: uuid.UUID,
+    request: Request,
+    response: Response,
     requests_dao: RequestsDAO = Depends(),
     rides_dao: RidesDAO = Depends(),
     user_db: SQLAlchemyUserDatabase = Depends(get_user_db),
-) -> GetRideIdScheduleResponse:
-    """Get a list of stopovers specified by `ride_id`."""
+) -> Union[GetRideIdScheduleResponse, Response]:
+    """
+    Get a list of stopovers specified by `ride_id`.
+
+    Answers 304 to `If-None-Match` with the `ETag` of the ride as it is, or
+    to `If-Modified-Since` a time it has not changed since.
+    """
+    last_update_time = await rides_dao.get_last_update_time_by_id(ride_id)
+    if last_update_time is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    etag = weak_etag(last_update_time)
+    if is_not_modified(request, etag, last_update_time):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers=cache_headers(etag, last_update_time),
+        )
+    response.headers.update(cache_headers(etag, last_update_time))
 
     schedule = await rides_dao.get_schedule_by_id(ride_id)
 
@@ -362,6 +498,9 @@ async def post_ride_id_joins(
     joins_dao: JoinsDAO = Depends(),
     rides_dao: RidesDAO = Depends(),
     requests_dao: RequestsDAO = Depends(),
+    matches_dao: MatchesDAO = Depends(),
+    matching_executor: Optional[Executor] = Depends(get_matching_executor),
+    match_memo: MatchMemo = Depends(),
     user: User = Depends(current_active_user),
 ) -> PostRideIdJoinsResponse:
     """
@@ -390,7 +529,9 @@ async def post_ride_id_joins(
     if ride.num_seats_left < request.num_passengers:
         raise HTTPException(status_code=403, detail="No seats left")
 
-    match = evaluate_match(ride=ride, req=request)
+    match = await matches_dao.get_match(request.id, ride_id)
+    if match is None:
+        (match,) = await match_memo.evaluate_matches(matching_executor, [ride], request)
     if match is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="infeasible match"
@@ -438,6 +579,15 @@ async def get_ride_id_join_id_status(
     return GetRideIdJoinIdStatusResponse(driver_response=join.status)
 
 
+def to_chat_record_dto(message: Union[ChatMessage, MessagesModel]) -> ChatRecordDTO:
+    return ChatRecordDTO(
+        id=message.id,
+        user_id=message.user_id,
+        content=message.content,
+        time=message.created_at,
+    )
+
+
 @router.get(
     "/{join_id}/messages",
     response_model=GetRideMessagesResponse,
@@ -446,49 +596,127 @@ async def get_ride_id_join_id_status(
 async def get_chatroom_messages(
     join_id: uuid.UUID,
     from_time: datetime.datetime,
+    after_id: Optional[uuid.UUID] = None,
+    limit: Optional[int] = None,
     messages_dao: MessagesDAO = Depends(),
+    chat_streams: ChatStreams = Depends(),
 ) -> GetRideMessagesResponse:
-    """Get Chatroom messages
+    """Get Chatroom messages, oldest first.
+
+    Every message since `from_time` is returned unless a `limit` is given.
+    To get the next page, pass `time` and `id` of the last message as
+    `from_time` and `after_id`.
 
     :param join_id: id of ride, tpye is uuid.UUID.
     :param from_time: time when the messages need to return from.
+    :param after_id: id of the message at `from_time` to start right after.
+    :param limit: max number of messages, all of them if not given.
     """
-
-    messages = await messages_dao.get_message_model_by_join_id(
-        join_id=join_id, from_time=from_time
+    from_time = as_utc(from_time)
+    messages = await messages_dao.get_message_models_by_join_id(
+        join_id=join_id,
+        from_time=from_time,
+        after_id=after_id,
+        limit=limit,
     )
-    messages_list = []
-    for message in messages:
-        messages_list.append(
-            ChatRecordDTO(
-                user_id=message.user_id,
-                content=message.content,
-                time=message.created_at,
-            )
-        )
-    return GetRideMessagesResponse(chat_records=messages_list)
+    records = {message.id: to_chat_record_dto(message) for message in messages}
+    # the latest messages may not be written to the database yet
+    for message in await chat_streams.get_recent(join_id):
+        if after_id is None:
+            is_after = message.created_at >= from_time
+        else:
+            is_after = (message.created_at, message.id) > (from_time, after_id)
+        if is_after and message.id not in records:
+            records[message.id] = to_chat_record_dto(message)
+
+    chat_records = sorted(records.values(), key=lambda record: (record.time, record.id))
+    return GetRideMessagesResponse(chat_records=chat_records[:limit])
 
 
 @router.post("/{join_id}/messages", tags=["chat"])
 async def post_chatroom_messages(
     join_id: uuid.UUID,
     req: PostRideMessagesRequest,
-    messages_dao: MessagesDAO = Depends(),
+    joins_dao: JoinsDAO = Depends(),
+    chat_streams: ChatStreams = Depends(),
     user: User = Depends(current_active_user),
 ) -> None:
-    """Post Chatroom messages"""
+    """Post Chatroom messages, as the driver or the passenger of the join."""
 
     if req.chat_record.user_id != user.id:
         raise HTTPException(status_code=403, detail="Permission denied")
+    join = await joins_dao.get_joins_model_by_id(join_id)
+    if join is None:
+        raise HTTPException(status_code=404, detail="Join not found")
+    if user.id not in {join.ride_user_id, join.request_user_id}:
+        raise HTTPException(status_code=403, detail="Permission denied")
 
-    message = await messages_dao.create_message_model(
-        user_id=user.id,
+    await chat_streams.post(
         join_id=join_id,
+        user_id=user.id,
         content=req.chat_record.content,
         created_at=req.chat_record.time,
     )
 
 
+@router.websocket("/{join_id}/messages/ws")
+async def ws_chatroom_messages(
+    websocket: WebSocket,
+    join_id: uuid.UUID,
+    read_sessions: ReadSessions = Depends(get_db_read_sessions),
+    chat_streams: ChatStreams = Depends(),
+    user: Optional[User] = Depends(websocket_active_user),
+) -> None:
+    """
+    Chat in real time.
+
+    Sends every message posted to the chat from now on as a `ChatRecordDTO`,
+    the client's own ones included; older ones are at GET
+    /rides/{join_id}/messages. Receives `{"content": ...}` to post as the
+    user.
+
+    Needs the token of the driver or the passenger of the join, offered as
+    the subprotocols `["bearer", token]`, closes with code 1008 otherwise.
+    """
+    if user is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    (join,) = await read_sessions.gather(
+        lambda session: JoinsDAO(session).get_joins_model_by_id(join_id),
+    )
+    if join is None or user.id not in {join.ride_user_id, join.request_user_id}:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    last_id = await chat_streams.last_id(join_id)
+    await websocket.accept(subprotocol=WEBSOCKET_AUTH_SUBPROTOCOL)
+
+    async def send() -> None:
+        nonlocal last_id
+        while True:
+            messages = await chat_streams.read(
+                join_id, last_id, settings.chat_read_block
+            )
+            for entry_id, message in messages:
+                last_id = entry_id
+                await websocket.send_text(to_chat_record_dto(message).model_dump_json())
+
+    async def on_text(text: str) -> None:
+        try:
+            chat_input = ChatInputDTO.model_validate_json(text)
+        except ValidationError:
+            await websocket.close(code=status.WS_1007_INVALID_FRAME_PAYLOAD_DATA)
+            raise WebSocketDisconnect(status.WS_1007_INVALID_FRAME_PAYLOAD_DATA)
+        await chat_streams.post(
+            join_id=join_id,
+            user_id=user.id,
+            content=chat_input.content,
+            created_at=datetime.datetime.now(datetime.timezone.utc),
+        )
+
+    await serve_websocket(websocket, send, on_text)
+
+
 @router.get("/{ride_id}/joins", response_model=GetRideJoinsResponse, tags=["driver"])
 async def get_ride_id_joins(
     ride_id: uuid.UUID,
@@ -548,6 +776,7 @@ async def post_comments(
     req: PostCommentsRequest,
     joins_dao: JoinsDAO = Depends(),
     user_db: SQLAlchemyUserDatabase = Depends(get_user_db),
+    profile_cache: ProfileCache = Depends(),
     user: User = Depends(current_active_user),
 ) -> None:
     """對參與該行程的用戶添加評分"""
@@ -572,6 +801,7 @@ async def post_comments(
         user_id=req.user_id,
         rating=req.rate,
         user_db=user_db,
+        profile_cache=profile_cache,
     )
 
 
@@ -582,6 +812,7 @@ async def put_ride_id_joins_join_id_status(
     req: PutRideIdJoinsJoinIdStatusRequest,
     rides_dao: RidesDAO = Depends(),
     joins_dao: JoinsDAO = Depends(),
+    incremental_matcher: IncrementalMatcher = Depends(),
     user: User = Depends(current_active_user),
 ) -> None:
     """
@@ -636,5 +867,10 @@ async def put_ride_id_joins_join_id_status(
                 num_seats_left=(ride.num_seats_left - join.num_passengers),
                 last_update_time=datetime.datetime.now(),
             )
+            await incremental_matcher.on_ride_seats_changed(
+                ride_id,
+                ride.num_seats_left - join.num_passengers,
+                ride.num_seats_left,
+            )
 
     await rides_dao.update_schedule_by_ride_id(ride_id)
@@ -1,6 +1,6 @@
 import datetime
 import uuid
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic import BaseModel, Field, NonNegativeInt
 
@@ -29,3 +29,15 @@ class PassengerStateDTO(BaseModel):
 class GetUserActiveItemsResponse(BaseModel):
     driver_state: Optional[DriverStateDTO]
     passenger_state: Optional[PassengerStateDTO]
+
+
+class JoinEventDTO(BaseModel):
+    id: uuid.UUID
+    stream_id: str
+    join_id: uuid.UUID
+    ride_id: uuid.UUID
+    request_id: uuid.UUID
+    event: Literal[
+        "created", "accepted", "rejected", "canceled", "onboard", "fulfilled"
+    ]
+    created_at: datetime.datetime
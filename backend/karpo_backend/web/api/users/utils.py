@@ -4,23 +4,29 @@ from typing import Optional
 
 from fastapi_users.db import SQLAlchemyUserDatabase
 
-from karpo_backend.db.dao.requests_dao import RequestsDAO
-from karpo_backend.db.dao.rides_dao import RidesDAO
 from karpo_backend.db.models.users import User
+from karpo_backend.services.users.profile_cache import ProfileCache
 from karpo_backend.web.api.users.schema import UserInfoForOthersDTO
 
 
 async def get_user_info_for_others(
     user_id: uuid.UUID,
     user_db: SQLAlchemyUserDatabase,
-    requests_dao: RequestsDAO,
-    rides_dao: RidesDAO,
+    profile_cache: ProfileCache,
 ) -> Optional[UserInfoForOthersDTO]:
+    cached = await profile_cache.get_many([user_id])
+    if user_id in cached:
+        return UserInfoForOthersDTO.model_validate_json(cached[user_id])
+
     user: User = await user_db.get(user_id)
     if user is None:
         return None
-    num_requests = await requests_dao.get_num_saved_requests_by_user_id(user_id)
-    num_rides = await rides_dao.get_num_saved_rides_by_user_id(user_id)
+    info = to_user_info_for_others(user)
+    await profile_cache.put_many({user_id: info.model_dump_json()})
+    return info
+
+
+def to_user_info_for_others(user: User) -> UserInfoForOthersDTO:
     return UserInfoForOthersDTO(
         id=user.id,
         name=user.name,
@@ -28,8 +34,8 @@ async def get_user_info_for_others(
         phone_number=user.phone_number,
         avatar=user.avatar if user.avatar else None,
         created_at=user.created_at,
-        num_requests=num_requests,
-        num_rides=num_rides,
+        num_requests=user.num_requests,
+        num_rides=user.num_rides,
     )
 
 
@@ -37,6 +43,7 @@ async def update_user_rating_by_id(
     user_id: uuid.UUID,
     rating: int,
     user_db: SQLAlchemyUserDatabase,
+    profile_cache: ProfileCache,
 ) -> None:
     user: User = await user_db.get(user_id)
     old_rating_count = user.rating_count
@@ -55,3 +62,4 @@ async def update_user_rating_by_id(
             "rating_count": new_rating_count,
         },
     )
+    await profile_cache.invalidate(user_id)
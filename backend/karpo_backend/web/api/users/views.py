@@ -1,20 +1,32 @@
+import dataclasses
 import uuid
+from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, status
 from fastapi_users.db import SQLAlchemyUserDatabase
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from karpo_backend.db.dao.joins_dao import JoinsDAO
+from karpo_backend.db.dao.matches_dao import MatchesDAO
 from karpo_backend.db.dao.requests_dao import RequestsDAO
 from karpo_backend.db.dao.rides_dao import RidesDAO
+from karpo_backend.db.dependencies import ReadSessions, get_db_read_sessions
+from karpo_backend.db.models.users import WEBSOCKET_AUTH_SUBPROTOCOL  # type: ignore
 from karpo_backend.db.models.users import UserCreate  # type: ignore
 from karpo_backend.db.models.users import UserRead  # type: ignore
 from karpo_backend.db.models.users import UserUpdate  # type: ignore
 from karpo_backend.db.models.users import api_users  # type: ignore
 from karpo_backend.db.models.users import auth_cookie  # type: ignore
+from karpo_backend.db.models.users import websocket_active_user  # type: ignore
 from karpo_backend.db.models.users import User, current_active_user, get_user_db
+from karpo_backend.services.joins.events import JoinEventStreams
+from karpo_backend.services.users.profile_cache import ProfileCache
+from karpo_backend.settings import settings
+from karpo_backend.web.api.push import serve_websocket
 from karpo_backend.web.api.users.schema import (
     DriverStateDTO,
     GetUserActiveItemsResponse,
+    JoinEventDTO,
     PassengerStateDTO,
     UserInfoForOthersDTO,
 )
@@ -62,9 +74,7 @@ router.include_router(
     tags=["users"],
 )
 async def get_user_me_active_items(
-    requests_dao: RequestsDAO = Depends(),
-    rides_dao: RidesDAO = Depends(),
-    joins_dao: JoinsDAO = Depends(),
+    read_sessions: ReadSessions = Depends(get_db_read_sessions),
     user: User = Depends(current_active_user),
 ) -> GetUserActiveItemsResponse:
     """
@@ -76,29 +86,39 @@ async def get_user_me_active_items(
     If `passenger_state.join_id` is non-null, then there is an *accepted*
     join request, which means `passenger_state.ride_id` is also non-null.
     """
-    resp = GetUserActiveItemsResponse(driver_state=None, passenger_state=None)
-    active_request = await requests_dao.get_active_request_by_user_id(user.id)
-    if active_request is not None:
+
+    async def get_passenger_state(session: AsyncSession) -> Optional[PassengerStateDTO]:
+        active_request = await RequestsDAO(session).get_active_request_by_user_id(
+            user.id
+        )
+        if active_request is None:
+            return None
         state = PassengerStateDTO(
             request_id=active_request.id, join_id=None, ride_id=None
         )
 
-        accepted_join = await joins_dao.get_accepted_joins_by_request_id(
+        accepted_join = await JoinsDAO(session).get_accepted_joins_by_request_id(
             active_request.id
         )
         if accepted_join is not None:
             state.join_id = accepted_join.id
             state.ride_id = accepted_join.ride_id
+        return state
 
-        resp.passenger_state = state
+    async def get_driver_state(session: AsyncSession) -> Optional[DriverStateDTO]:
+        active_ride = await RidesDAO(session).get_active_ride_by_user_id(user.id)
+        if active_ride is None:
+            return None
+        return DriverStateDTO(ride_id=active_ride.id)
 
-    active_ride = await rides_dao.get_active_ride_by_user_id(user.id)
-    if active_ride is not None:
-        resp.driver_state = DriverStateDTO(
-            ride_id=active_ride.id,
-        )
-
-    return resp
+    passenger_state, driver_state = await read_sessions.gather(
+        get_passenger_state,
+        get_driver_state,
+    )
+    return GetUserActiveItemsResponse(
+        driver_state=driver_state,
+        passenger_state=passenger_state,
+    )
 
 
 @router.delete(
@@ -114,12 +134,16 @@ async def delete_user_me_data(
     requests_dao: RequestsDAO = Depends(),
     rides_dao: RidesDAO = Depends(),
     joins_dao: JoinsDAO = Depends(),
+    matches_dao: MatchesDAO = Depends(),
+    profile_cache: ProfileCache = Depends(),
     user: User = Depends(current_active_user),
 ) -> None:
     """Burn everything related to a user except their profile."""
+    await matches_dao.delete_all_by_user_id(user.id)
     await joins_dao.delete_all_by_user_id(user.id)
     await requests_dao.delete_all_by_user_id(user.id)
     await rides_dao.delete_all_by_user_id(user.id)
+    await profile_cache.invalidate(user.id)
 
 
 @router.get(
@@ -133,16 +157,53 @@ async def delete_user_me_data(
 )
 async def get_user_id_profile(
     user_id: uuid.UUID,
-    requests_dao: RequestsDAO = Depends(),
-    rides_dao: RidesDAO = Depends(),
     user_db: SQLAlchemyUserDatabase = Depends(get_user_db),
+    profile_cache: ProfileCache = Depends(),
 ) -> UserInfoForOthersDTO:
-    info = await get_user_info_for_others(
-        user_id,
-        user_db,
-        requests_dao,
-        rides_dao,
-    )
+    info = await get_user_info_for_others(user_id, user_db, profile_cache)
     if info is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
     return info
+
+
+@router.websocket("/users/me/events/ws")
+async def ws_user_me_events(
+    websocket: WebSocket,
+    last_id: Optional[str] = None,
+    join_event_streams: JoinEventStreams = Depends(),
+    user: Optional[User] = Depends(websocket_active_user),
+) -> None:
+    """
+    Follow the joins of the user, as a driver and as a passenger, in real time.
+
+    Sends a `JoinEventDTO` whenever a join of the user is created, accepted,
+    rejected or canceled, and when its passenger is on board or dropped off.
+    An event may be sent twice, with the same `id`.
+
+    Needs the token of the user, offered as the subprotocols
+    `["bearer", token]`, closes with code 1008 otherwise. Pass the `stream_id` of the last event received as `last_id`
+    to get what was missed while disconnected, as long as it is recent.
+    """
+    if user is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    if last_id is None:
+        last_id = await join_event_streams.last_id(user.id)
+    cursor = last_id
+    await websocket.accept(subprotocol=WEBSOCKET_AUTH_SUBPROTOCOL)
+
+    async def send() -> None:
+        nonlocal cursor
+        while True:
+            events = await join_event_streams.read(
+                user.id,
+                cursor,
+                settings.join_events_read_block,
+            )
+            for stream_id, event in events:
+                cursor = stream_id
+                dto = JoinEventDTO(stream_id=stream_id, **dataclasses.asdict(event))
+                await websocket.send_text(dto.model_dump_json())
+
+    await serve_websocket(websocket, send)
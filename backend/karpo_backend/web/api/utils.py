@@ -1,10 +1,20 @@
 import datetime
-from typing import List, Optional, Tuple
+from typing import Any, List, Literal, Optional, Sequence, Tuple, Type, Union
 
+import numpy as np
+import numpy.typing as npt
+from fastapi import Header, Response
 from geoalchemy2 import WKBElement
 from pydantic import BaseModel
 from pyproj import Geod
-from shapely import LineString, Point, wkb
+from shapely import LineString, Point, get_coordinates, wkb
+
+from karpo_backend.route.cache import route_cache
+from karpo_backend.route.polyline import encode_polyline
+from karpo_backend.settings import settings
+
+# "full" for a RouteDTO, "polyline" for an EncodedRouteDTO
+RouteFormat = Literal["full", "polyline"]
 
 
 class LocationDTO(BaseModel):
@@ -60,6 +70,111 @@ class RouteDTO(BaseModel):
             timestamps=list(timestamps),
         )
 
+    @classmethod
+    def from_ride(cls, ride: Any) -> "RouteDTO":
+        route = route_cache.get(ride)
+        return cls(route=route.points, timestamps=route.timestamps)
+
+
+class EncodedRouteDTO(BaseModel):
+    """
+    A route in a tenth of the size of a `RouteDTO`.
+
+    `polyline` is the route in Google's encoded polyline format. The time at
+    the i-th vertex is `start_time` plus the sum of the first i+1
+    `time_deltas`, in whole seconds; the first delta is always 0.
+    """
+
+    polyline: str
+    start_time: datetime.datetime
+    time_deltas: List[int]
+
+    @classmethod
+    def from_coords_and_epochs(
+        cls,
+        coords: npt.NDArray[np.float64],
+        epochs: npt.NDArray[np.float64],
+    ) -> "EncodedRouteDTO":
+        epochs = np.asarray(epochs, dtype=float)
+        # rounded from the start rather than per delta, so errors do not add up
+        offsets = np.rint(epochs - epochs[0]).astype(np.int64)
+        return cls(
+            polyline=encode_polyline(coords),
+            start_time=datetime.datetime.fromtimestamp(
+                epochs[0],
+                tz=datetime.timezone.utc,
+            ),
+            time_deltas=np.diff(offsets, prepend=0).tolist(),
+        )
+
+    @classmethod
+    def from_wkb_and_timestamps(
+        cls,
+        route_wkb: WKBElement,
+        timestamps: Sequence[datetime.datetime],
+    ) -> "EncodedRouteDTO":
+        return cls.from_coords_and_epochs(
+            get_coordinates(wkb.loads(bytes(route_wkb.data))),
+            np.fromiter(
+                (t.timestamp() for t in timestamps),
+                dtype=float,
+                count=len(timestamps),
+            ),
+        )
+
+    @classmethod
+    def from_ride(cls, ride: Any) -> "EncodedRouteDTO":
+        route = route_cache.get(ride)
+        return cls.from_coords_and_epochs(route.timeline.coords, route.timeline.epochs)
+
+
+def get_route_format(
+    response: Response,
+    route_format: Optional[RouteFormat] = None,
+    accept: Optional[str] = Header(None),
+) -> RouteFormat:
+    """
+    Tell how the client wants routes in the response.
+
+    The `route_format` query parameter wins, otherwise a `route=polyline`
+    parameter of any media range in `Accept`, e.g.
+    `Accept: application/json; route=polyline`, asks for encoded routes.
+
+    :return: the format of routes.
+    """
+    response.headers["Vary"] = "Accept"
+    if route_format is not None:
+        return route_format
+    for media_range in (accept or "").split(","):
+        for parameter in media_range.split(";")[1:]:
+            key, _, value = parameter.partition("=")
+            value = value.strip().strip('"').lower()
+            if key.strip().lower() == "route" and value == "polyline":
+                return "polyline"
+    return "full"
+
+
+def route_dto_from_ride(
+    ride: Any,
+    route_format: RouteFormat,
+) -> Union[RouteDTO, EncodedRouteDTO]:
+    """
+    :param ride: a ride with `route` and `route_timestamps` loaded if
+        `route_keep_full` is on, with `route_data` otherwise.
+    :return: the route of a ride in `route_format`, the same one
+        GET /rides/{ride_id} shows.
+    """
+    route_dto_class: Union[Type[RouteDTO], Type[EncodedRouteDTO]] = RouteDTO
+    if route_format == "polyline":
+        route_dto_class = EncodedRouteDTO
+    if settings.route_keep_full:
+        return route_dto_class.from_wkb_and_timestamps(
+            ride.route,
+            ride.route_timestamps,
+        )
+    # route and route_timestamps hold the simplified route as well
+    return route_dto_class.from_ride(ride)
+
 
 def get_distance_between_wkb_points(wkb1: WKBElement, wkb2: WKBElement) -> float:
     p1: Point = wkb.loads(wkb1.data)
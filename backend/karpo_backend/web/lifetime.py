@@ -24,7 +24,22 @@ from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from karpo_backend.db.models.users import UserCreate, get_user_db, get_user_manager
+from karpo_backend.services.chat.lifetime import start_chat_flusher, stop_chat_flusher
+from karpo_backend.services.joins.lifetime import (
+    start_join_events_relay,
+    stop_join_events_relay,
+)
+from karpo_backend.services.matching.lifetime import (
+    init_matching_executor,
+    shutdown_matching_executor,
+    start_batch_matching,
+    stop_batch_matching,
+)
 from karpo_backend.services.redis.lifetime import init_redis, shutdown_redis
+from karpo_backend.services.rides.lifetime import (
+    start_ride_state_flusher,
+    stop_ride_state_flusher,
+)
 from karpo_backend.settings import settings
 
 
@@ -209,6 +224,11 @@ def register_startup_event(
         setup_db(app)
         setup_opentelemetry(app)
         init_redis(app)
+        init_matching_executor(app)
+        start_batch_matching(app)
+        start_ride_state_flusher(app)
+        start_chat_flusher(app)
+        start_join_events_relay(app)
         setup_prometheus(app)
         await setup_test_users(app)
         app.middleware_stack = app.build_middleware_stack()
@@ -229,9 +249,14 @@ def register_shutdown_event(
 
     @app.on_event("shutdown")
     async def _shutdown() -> None:  # noqa: WPS430
+        await stop_batch_matching(app)
+        await stop_ride_state_flusher(app)
+        await stop_chat_flusher(app)
+        await stop_join_events_relay(app)
         await app.state.db_engine.dispose()
 
         await shutdown_redis(app)
+        shutdown_matching_executor(app)
         stop_opentelemetry(app)
         pass  # noqa: WPS420
 